@@ -0,0 +1,153 @@
+# api-docs/artifact_store.py
+import os
+import re
+import time
+import shutil
+import threading
+from typing import Optional, Dict
+from disk_cache import CACHE_DIR, content_hash
+
+# PDFs separados por el workflow, servidos en binario por GET /artifacts/{id}
+ARTIFACT_TTL = int(os.getenv('ARTIFACT_TTL', str(24 * 3600)))
+ARTIFACT_MAX_BYTES = int(os.getenv('ARTIFACT_MAX_BYTES', str(8 * 1024 ** 3)))
+# Frecuencia mínima de las limpiezas por TTL y tamaño
+ARTIFACT_SWEEP_INTERVAL = int(os.getenv('ARTIFACT_SWEEP_INTERVAL', '300'))
+
+_ARTIFACT_ID = re.compile(r"^[0-9a-f]{64}$")
+
+
+class ArtifactStore:
+    """Archivos direccionados por su SHA-256 en CACHE_DIR, compartidos entre workers"""
+
+    def __init__(self, name: str, ttl_seconds: int, max_bytes: int, suffix: str = ".pdf"):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.dir = os.path.join(CACHE_DIR, name)
+
+        self._lock = threading.Lock()
+        self._counters = {"puts": 0, "deduplicated": 0, "bytes_written": 0, "expired": 0, "evictions": 0}
+        self._last_sweep = 0.0
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def _path(self, artifact_id: str) -> str:
+        return os.path.join(self.dir, f"{artifact_id}{self.suffix}")
+
+    def put(self, data: bytes, artifact_id: Optional[str] = None) -> str:
+        """Guardar el contenido y devolver su id; contenidos iguales comparten archivo
+
+        artifact_id permite guardar bajo otro hash (el de los parámetros con que
+        se generó el contenido, por ejemplo); por defecto es el del contenido.
+        """
+        return self._store(artifact_id or content_hash(data), len(data), lambda f: f.write(data))
+
+    def put_file(self, path: str, artifact_id: str) -> str:
+        """Como put, copiando un archivo ya en disco (artifact_id = su SHA-256) sin leerlo en memoria"""
+        def copy(f):
+            with open(path, "rb") as src:
+                shutil.copyfileobj(src, f, 1024 * 1024)
+        return self._store(artifact_id, os.path.getsize(path), copy)
+
+    def _store(self, artifact_id: str, size: int, write) -> str:
+        path = self._path(artifact_id)
+
+        if os.path.exists(path):
+            # Renovar la vigencia del archivo existente
+            os.utime(path)
+            self._count("deduplicated")
+        else:
+            os.makedirs(self.dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+            self._count("bytes_written", size)
+
+        self._count("puts")
+        self._maybe_sweep()
+        return artifact_id
+
+    def path(self, artifact_id: str) -> Optional[str]:
+        """Ruta del artefacto vigente o None"""
+        if not _ARTIFACT_ID.match(artifact_id):
+            return None
+        path = self._path(artifact_id)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                return None
+        except FileNotFoundError:
+            return None
+        return path
+
+    def _maybe_sweep(self):
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < ARTIFACT_SWEEP_INTERVAL:
+                return
+            self._last_sweep = now
+        self.sweep()
+
+    def sweep(self):
+        """Eliminar expirados y, si se excede el límite, los más antiguos"""
+        now = time.time()
+        entries = []
+        try:
+            with os.scandir(self.dir) as it:
+                for entry in it:
+                    if entry.name.endswith(self.suffix):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            return
+
+        expired = 0
+        live = []
+        for mtime, size, path in entries:
+            if now - mtime > self.ttl_seconds:
+                expired += self._remove(path)
+            else:
+                live.append((mtime, size, path))
+
+        total_size = sum(size for _, size, _ in live)
+        evicted = 0
+        for mtime, size, path in sorted(live):
+            if total_size <= self.max_bytes:
+                break
+            evicted += self._remove(path)
+            total_size -= size
+
+        if expired:
+            self._count("expired", expired)
+        if evicted:
+            self._count("evictions", evicted)
+
+    @staticmethod
+    def _remove(path: str) -> int:
+        try:
+            os.remove(path)
+            return 1
+        except FileNotFoundError:
+            return 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+        counters["entries"] = 0
+        counters["bytes"] = 0
+        try:
+            with os.scandir(self.dir) as it:
+                for entry in it:
+                    if entry.name.endswith(self.suffix):
+                        counters["entries"] += 1
+                        counters["bytes"] += entry.stat().st_size
+        except FileNotFoundError:
+            pass
+        counters["ttl_seconds"] = self.ttl_seconds
+        counters["max_bytes"] = self.max_bytes
+        return counters
+
+
+artifact_store = ArtifactStore("artifacts", ttl_seconds=ARTIFACT_TTL, max_bytes=ARTIFACT_MAX_BYTES)
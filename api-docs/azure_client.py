@@ -0,0 +1,263 @@
+# api-docs/azure_client.py
+"""Clientes de Azure Document Intelligence compartidos por todo el servicio
+
+main.py y document_processor.py usan el mismo cliente síncrono, con un pool
+de conexiones HTTP dimensionado para la concurrencia de clasificación y
+extracción (requests abre 10 por host por defecto y descarta el resto) y
+keep-alive TCP para que las conexiones ociosas no se pierdan en el balanceador.
+Al arrancar, warm_up abre las conexiones de antemano: la primera petición
+tras un despliegue ya no paga DNS ni el handshake TLS. El contador
+azure_http_requests_total{connection="new|reused"} muestra cuántas
+peticiones abrieron conexión y cuántas reutilizaron una del pool.
+"""
+import os
+import socket
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.util.retry import Retry
+from azure.ai.formrecognizer import DocumentAnalysisClient
+from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import RequestsTransport
+
+import metrics
+import azure_scheduler
+import azure_recorder
+
+ENDPOINT = os.getenv('AZURE_FORM_RECOGNIZER_ENDPOINT', '')
+API_KEY = os.getenv('AZURE_FORM_RECOGNIZER_KEY', '')
+
+# Intervalo entre consultas del estado de una operación (el SDK usa 1 s)
+AZURE_POLLING_INTERVAL = float(os.getenv('AZURE_POLLING_INTERVAL', '0.5'))
+
+# Cliente asíncrono para los endpoints de un documento (necesita aiohttp)
+AZURE_ASYNC_ENABLED = os.getenv('AZURE_ASYNC_ENABLED', 'true').lower() == 'true'
+
+# Conexiones que el pool mantiene abiertas con Azure: clasificación + extracción en
+# vuelo más los sondeos de los pollers y los endpoints de un documento
+AZURE_POOL_MAXSIZE = int(os.getenv('AZURE_POOL_MAXSIZE', '32'))
+# Segundos de inactividad antes de sondear la conexión (el balanceador de Azure corta a los 4 min)
+AZURE_KEEPALIVE_SECONDS = int(os.getenv('AZURE_KEEPALIVE_SECONDS', '60'))
+AZURE_CONNECT_TIMEOUT = float(os.getenv('AZURE_CONNECT_TIMEOUT', '10'))
+AZURE_READ_TIMEOUT = float(os.getenv('AZURE_READ_TIMEOUT', '300'))
+# Bloques de envío de los PDFs (http.client usa 8 KiB)
+AZURE_UPLOAD_BLOCK_BYTES = int(os.getenv('AZURE_UPLOAD_BLOCK_BYTES', str(4 * 1024 * 1024)))
+
+# Conexiones abiertas al arrancar
+AZURE_WARMUP_ENABLED = os.getenv('AZURE_WARMUP_ENABLED', 'true').lower() == 'true'
+AZURE_WARMUP_CONNECTIONS = int(os.getenv('AZURE_WARMUP_CONNECTIONS', '4'))
+
+SYNC = "sync"
+ASYNC = "async"
+
+
+def _keepalive_options() -> List[Tuple[int, int, int]]:
+    """Opciones de socket para keep-alive TCP (las que existan en esta plataforma)"""
+    options = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    for name, value in (("TCP_KEEPIDLE", AZURE_KEEPALIVE_SECONDS),
+                        ("TCP_KEEPINTVL", max(1, AZURE_KEEPALIVE_SECONDS // 4)),
+                        ("TCP_KEEPCNT", 4)):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+class _CountingConnection:
+    """Cuenta cada petición según viaje por una conexión recién abierta o reutilizada"""
+
+    def connect(self):
+        super().connect()
+        self._reused = False
+
+    def request(self, *args, **kwargs):
+        # HTTPS conecta antes de request; HTTP plano, dentro de request
+        result = super().request(*args, **kwargs)
+        metrics.AZURE_HTTP_REQUESTS.inc(transport=SYNC, connection="reused" if getattr(self, "_reused", False) else "new")
+        self._reused = True
+        return result
+
+
+class _CountingHTTPConnection(_CountingConnection, HTTPConnection):
+    pass
+
+
+class _CountingHTTPSConnection(_CountingConnection, HTTPSConnection):
+    pass
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class PooledAdapter(HTTPAdapter):
+    """Adaptador de requests con keep-alive TCP, bloques de envío grandes y conexiones contadas"""
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs.setdefault("socket_options", HTTPConnection.default_socket_options + _keepalive_options())
+        pool_kwargs.setdefault("blocksize", AZURE_UPLOAD_BLOCK_BYTES)
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+def create_http_session(maxsize: int = AZURE_POOL_MAXSIZE) -> requests.Session:
+    """Sesión de requests para el transporte del SDK"""
+    session = requests.Session()
+    # Los reintentos los hacen la política del SDK y azure_scheduler, no urllib3
+    adapter = PooledAdapter(
+        pool_connections=4,
+        pool_maxsize=maxsize,
+        max_retries=Retry(total=False, redirect=False, raise_on_status=False)
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def create_client(session: Optional[requests.Session] = None):
+    """Cliente síncrono con el transporte compartido, o None si falta configuración"""
+    if azure_recorder.AZURE_RECORD_MODE == azure_recorder.REPLAY:
+        # Respuestas grabadas: sin red ni límite de llamadas por segundo
+        return metrics.instrument_client(azure_recorder.ReplayDocumentAnalysisClient())
+    if not (ENDPOINT and API_KEY):
+        return None
+    transport = RequestsTransport(
+        session=session or http_session,
+        session_owner=False,
+        connection_timeout=AZURE_CONNECT_TIMEOUT,
+        read_timeout=AZURE_READ_TIMEOUT
+    )
+    # Métricas por fuera: la latencia incluye la espera de turno y los reintentos;
+    # la grabación por dentro: sólo se graban las respuestas que llegaron
+    return metrics.instrument_client(azure_scheduler.schedule_client(azure_recorder.record_client(DocumentAnalysisClient(
+        endpoint=ENDPOINT,
+        credential=AzureKeyCredential(API_KEY),
+        polling_interval=AZURE_POLLING_INTERVAL,
+        transport=transport,
+        retry_policy=azure_scheduler.retry_policy()
+    ))))
+
+
+def warm_up(connections: int = AZURE_WARMUP_CONNECTIONS) -> int:
+    """Abrir conexiones con el endpoint antes de la primera petición; devuelve cuántas respondieron
+
+    Basta cualquier respuesta (la raíz del endpoint devuelve 404): la conexión
+    queda en el pool con DNS y TLS resueltos.
+    """
+    if not (ENDPOINT and AZURE_WARMUP_ENABLED and connections > 0):
+        return 0
+    if azure_recorder.AZURE_RECORD_MODE == azure_recorder.REPLAY:
+        return 0
+
+    def touch(_) -> bool:
+        try:
+            response = http_session.get(ENDPOINT, timeout=(AZURE_CONNECT_TIMEOUT, AZURE_CONNECT_TIMEOUT))
+            response.close()
+            return True
+        except requests.RequestException as e:
+            print(f"⚠️ No se pudo abrir una conexión con Azure al arrancar: {e}")
+            return False
+
+    # Todas a la vez: en serie reutilizarían la misma conexión
+    with ThreadPoolExecutor(max_workers=connections, thread_name_prefix="warmup") as executor:
+        opened = sum(executor.map(touch, range(connections)))
+    print(f"🔌 {opened}/{connections} conexiones con Azure abiertas al arrancar")
+    return opened
+
+
+# ==================== CLIENTE ASÍNCRONO ====================
+
+_async_session = None
+
+
+def create_async_client():
+    """Cliente asíncrono con su propio pool de aiohttp, o None si no está configurado o falta aiohttp
+
+    Se llama con el event loop ya corriendo (lifespan), al que queda atada la
+    sesión de aiohttp; cerrar el cliente cierra también la sesión.
+    """
+    global _async_session
+    if azure_recorder.AZURE_RECORD_MODE == azure_recorder.REPLAY:
+        return metrics.instrument_async_client(
+            azure_recorder.replay_async_client(azure_recorder.ReplayDocumentAnalysisClient())
+        )
+    if not (ENDPOINT and API_KEY and AZURE_ASYNC_ENABLED):
+        return None
+    try:
+        import aiohttp
+        from azure.core.pipeline.transport import AioHttpTransport
+        from azure.ai.formrecognizer.aio import DocumentAnalysisClient as AsyncDocumentAnalysisClient
+    except ImportError as e:
+        print(f"⚠️ Cliente asíncrono de Azure no disponible, se usa el síncrono en el threadpool: {e}")
+        return None
+
+    async def on_new(session, context, params):
+        metrics.AZURE_HTTP_REQUESTS.inc(transport=ASYNC, connection="new")
+
+    async def on_reused(session, context, params):
+        metrics.AZURE_HTTP_REQUESTS.inc(transport=ASYNC, connection="reused")
+
+    trace = aiohttp.TraceConfig()
+    trace.on_connection_create_end.append(on_new)
+    trace.on_connection_reuseconn.append(on_reused)
+    _async_session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=AZURE_POOL_MAXSIZE,
+            keepalive_timeout=AZURE_KEEPALIVE_SECONDS,
+            ttl_dns_cache=AZURE_KEEPALIVE_SECONDS
+        ),
+        trace_configs=[trace],
+        # Igual que la sesión que crea el SDK: los cuerpos se descomprimen en la política
+        auto_decompress=False,
+        trust_env=True
+    )
+    client = AsyncDocumentAnalysisClient(
+        endpoint=ENDPOINT,
+        credential=AzureKeyCredential(API_KEY),
+        polling_interval=AZURE_POLLING_INTERVAL,
+        retry_policy=azure_scheduler.retry_policy(asynchronous=True),
+        transport=AioHttpTransport(
+            session=_async_session,
+            connection_timeout=AZURE_CONNECT_TIMEOUT,
+            read_timeout=AZURE_READ_TIMEOUT
+        )
+    )
+    return metrics.instrument_async_client(azure_scheduler.schedule_async_client(azure_recorder.record_async_client(client)))
+
+
+async def warm_up_async(connections: int = AZURE_WARMUP_CONNECTIONS) -> int:
+    """warm_up para el pool del cliente asíncrono"""
+    if _async_session is None or not (AZURE_WARMUP_ENABLED and connections > 0):
+        return 0
+    import aiohttp
+    timeout = aiohttp.ClientTimeout(total=AZURE_CONNECT_TIMEOUT)
+
+    async def touch() -> bool:
+        try:
+            async with _async_session.get(ENDPOINT, timeout=timeout) as response:
+                await response.read()
+            return True
+        except Exception as e:
+            print(f"⚠️ No se pudo abrir una conexión asíncrona con Azure al arrancar: {e}")
+            return False
+
+    opened = sum(await asyncio.gather(*(touch() for _ in range(connections))))
+    print(f"🔌 {opened}/{connections} conexiones asíncronas con Azure abiertas al arrancar")
+    return opened
+
+
+http_session = create_http_session()
+
+# Un solo cliente síncrono para main.py y document_processor.py
+document_analysis_client = create_client()
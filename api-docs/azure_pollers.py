@@ -0,0 +1,86 @@
+# api-docs/azure_pollers.py
+"""Pollers locales con la interfaz de los de Azure Document Intelligence
+
+Los usan los clientes que responden sin red: la reproducción de
+grabaciones (azure_recorder) y el cliente simulado de pruebas y
+benchmarks (fake_azure). El resultado se construye al esperarlo, tras la
+latencia configurada.
+"""
+import time
+import asyncio
+import threading
+from typing import Optional
+
+from azure.ai.formrecognizer import AnalyzeResult
+
+
+class LocalPoller:
+    """Poller síncrono con la latencia configurada"""
+
+    def __init__(self, result_fn, latency: float):
+        self._result_fn = result_fn
+        self._latency = latency
+        self._result = None
+        self._lock = threading.Lock()
+
+    def result(self, timeout: Optional[float] = None) -> AnalyzeResult:
+        with self._lock:
+            if self._result is None:
+                if self._latency:
+                    time.sleep(self._latency)
+                self._result = self._result_fn()
+            return self._result
+
+    def wait(self, timeout: Optional[float] = None):
+        self.result(timeout)
+
+    def done(self) -> bool:
+        return self._result is not None
+
+    def status(self) -> str:
+        return "succeeded" if self._result is not None else "running"
+
+
+class LocalAsyncPoller:
+    """AsyncLROPoller sobre un LocalPoller: la latencia se espera sin bloquear el event loop"""
+
+    def __init__(self, poller: LocalPoller):
+        self._poller = poller
+        self._result = None
+
+    async def result(self) -> AnalyzeResult:
+        if self._result is None:
+            if self._poller._latency:
+                await asyncio.sleep(self._poller._latency)
+            self._result = await asyncio.to_thread(self._poller._result_fn)
+        return self._result
+
+    async def wait(self):
+        await self.result()
+
+    def done(self) -> bool:
+        return self._result is not None
+
+
+class LocalAsyncClient:
+    """Interfaz de azure.ai.formrecognizer.aio.DocumentAnalysisClient sobre un cliente local síncrono
+
+    El cliente envuelto devuelve LocalPoller; la lectura del documento y
+    begin_* se hacen en un hilo y la latencia con asyncio.sleep.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    async def begin_classify_document(self, classifier_id: str, document, **kwargs) -> LocalAsyncPoller:
+        data = document.read() if hasattr(document, "read") else document
+        poller = await asyncio.to_thread(self.client.begin_classify_document, classifier_id, data)
+        return LocalAsyncPoller(poller)
+
+    async def begin_analyze_document(self, model_id: str, document, **kwargs) -> LocalAsyncPoller:
+        data = document.read() if hasattr(document, "read") else document
+        poller = await asyncio.to_thread(self.client.begin_analyze_document, model_id, data)
+        return LocalAsyncPoller(poller)
+
+    async def close(self):
+        pass
@@ -0,0 +1,253 @@
+# api-docs/azure_recorder.py
+"""Grabación y reproducción de respuestas de Azure Document Intelligence
+
+Con AZURE_RECORD_MODE=record cada resultado de begin_classify_document y
+begin_analyze_document se guarda en AZURE_RECORDINGS_DIR/<modelo>/<sha256>.json,
+con el hash del documento tal como se envió. Con AZURE_RECORD_MODE=replay,
+ReplayDocumentAnalysisClient sirve esas respuestas sin red, credenciales ni
+costo: la extracción, el workflow completo y los benchmarks corren contra
+respuestas reales a toda velocidad, o con la latencia de AZURE_REPLAY_LATENCY.
+
+La clave es el documento enviado, después de payload_slimming: una grabación
+sirve mientras no cambien los perfiles de reducción.
+"""
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import tempfile
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from azure.ai.formrecognizer import AnalyzeResult
+from azure.core.exceptions import ResourceNotFoundError
+
+import metrics
+from disk_cache import CACHE_DIR, content_hash
+from azure_pollers import LocalPoller, LocalAsyncClient
+
+# off, record o replay
+AZURE_RECORD_MODE = os.getenv('AZURE_RECORD_MODE', 'off').lower()
+AZURE_RECORDINGS_DIR = os.getenv('AZURE_RECORDINGS_DIR', os.path.join(CACHE_DIR, 'azure-recordings'))
+# Latencia de la reproducción: segundos por llamada o "recorded" para repetir la grabada
+AZURE_REPLAY_LATENCY = os.getenv('AZURE_REPLAY_LATENCY', '0')
+
+RECORD = "record"
+REPLAY = "replay"
+RECORDED_LATENCY = "recorded"
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def document_digest(document) -> str:
+    """Hash del documento enviado; los archivos se leen por bloques y se rebobinan"""
+    if not hasattr(document, "read"):
+        return content_hash(document)
+    start = document.tell()
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: document.read(HASH_CHUNK_BYTES), b""):
+        digest.update(chunk)
+    document.seek(start)
+    return digest.hexdigest()
+
+
+class RecordingStore:
+    """Respuestas grabadas, un JSON por (modelo, hash del documento)"""
+
+    def __init__(self, directory: str = AZURE_RECORDINGS_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._stats = {"grabadas": 0, "reproducidas": 0, "faltantes": 0}
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def path(self, model_id: str, digest: str) -> str:
+        # El id del modelo llega en la URL de /debug/test-model: sin separadores de ruta
+        return os.path.join(self.directory, re.sub(r"[^\w.-]", "_", model_id), f"{digest}.json")
+
+    def save(self, operation: str, model_id: str, digest: str, result: AnalyzeResult, latency: float):
+        path = self.path(model_id, digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        recording = {
+            "operation": operation,
+            "model_id": model_id,
+            "sha256": digest,
+            "recorded_at": datetime.now().isoformat(),
+            "latency_seconds": round(latency, 3),
+            # Igual que la caché de extracción: los valores no JSON se guardan como texto
+            "result": result.to_dict(),
+        }
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(recording, f, default=str, ensure_ascii=False)
+        # Escritura atómica: una reproducción en curso nunca lee un JSON a medias
+        os.replace(tmp_path, path)
+        self._count("grabadas")
+
+    def load(self, model_id: str, digest: str) -> Optional[Dict]:
+        try:
+            with open(self.path(model_id, digest), encoding="utf-8") as f:
+                recording = json.load(f)
+        except FileNotFoundError:
+            self._count("faltantes")
+            return None
+        self._count("reproducidas")
+        return recording
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        por_modelo = {}
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.is_dir():
+                    por_modelo[entry.name] = sum(1 for f in os.scandir(entry.path) if f.name.endswith(".json"))
+        stats.update({
+            "modo": AZURE_RECORD_MODE,
+            "directorio": self.directory,
+            "latencia_reproduccion": AZURE_REPLAY_LATENCY,
+            "por_modelo": por_modelo,
+        })
+        return stats
+
+
+recordings = RecordingStore()
+
+
+# ==================== GRABACIÓN ====================
+
+class RecordingPoller:
+    def __init__(self, poller, store: RecordingStore, operation: str, model_id: str, digest: str, started: float):
+        self._poller = poller
+        self._store = store
+        self._operation = operation
+        self._model_id = model_id
+        self._digest = digest
+        self._started = started
+        self._saved = False
+
+    def result(self, *args, **kwargs):
+        result = self._poller.result(*args, **kwargs)
+        if not self._saved:
+            self._saved = True
+            try:
+                self._store.save(self._operation, self._model_id, self._digest, result,
+                                 time.perf_counter() - self._started)
+            except Exception as e:
+                print(f"   ⚠️ No se pudo grabar la respuesta de {self._model_id}: {e}")
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._poller, name)
+
+
+class RecordingClient:
+    """Cliente síncrono que delega en el real y graba cada resultado obtenido"""
+
+    def __init__(self, client, store: RecordingStore = recordings):
+        self._client = client
+        self._store = store
+
+    def _begin(self, operation: str, begin, model_id: str, document, **kwargs) -> RecordingPoller:
+        digest = document_digest(document)
+        started = time.perf_counter()
+        poller = begin(model_id, document=document, **kwargs)
+        return RecordingPoller(poller, self._store, operation, model_id, digest, started)
+
+    def begin_classify_document(self, classifier_id: str, document, **kwargs):
+        return self._begin(metrics.CLASSIFY, self._client.begin_classify_document, classifier_id, document, **kwargs)
+
+    def begin_analyze_document(self, model_id: str, document, **kwargs):
+        return self._begin(metrics.ANALYZE, self._client.begin_analyze_document, model_id, document, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class RecordingAsyncPoller(RecordingPoller):
+    async def result(self, *args, **kwargs):
+        result = await self._poller.result(*args, **kwargs)
+        if not self._saved:
+            self._saved = True
+            try:
+                await asyncio.to_thread(self._store.save, self._operation, self._model_id, self._digest,
+                                        result, time.perf_counter() - self._started)
+            except Exception as e:
+                print(f"   ⚠️ No se pudo grabar la respuesta de {self._model_id}: {e}")
+        return result
+
+
+class RecordingAsyncClient(RecordingClient):
+    """RecordingClient para azure.ai.formrecognizer.aio.DocumentAnalysisClient"""
+
+    async def _begin(self, operation: str, begin, model_id: str, document, **kwargs) -> RecordingAsyncPoller:
+        digest = await asyncio.to_thread(document_digest, document)
+        started = time.perf_counter()
+        poller = await begin(model_id, document=document, **kwargs)
+        return RecordingAsyncPoller(poller, self._store, operation, model_id, digest, started)
+
+    async def begin_classify_document(self, classifier_id: str, document, **kwargs):
+        return await self._begin(metrics.CLASSIFY, self._client.begin_classify_document, classifier_id, document, **kwargs)
+
+    async def begin_analyze_document(self, model_id: str, document, **kwargs):
+        return await self._begin(metrics.ANALYZE, self._client.begin_analyze_document, model_id, document, **kwargs)
+
+
+# ==================== REPRODUCCIÓN ====================
+
+class ReplayDocumentAnalysisClient:
+    """Sustituto de DocumentAnalysisClient que responde con las grabaciones
+
+    latency: segundos por llamada, o "recorded" para esperar lo que tardó
+    Azure al grabar. Un documento sin grabación falla con ResourceNotFoundError,
+    como un modelo inexistente, y el workflow lo trata como cualquier error.
+    """
+
+    def __init__(self, store: RecordingStore = recordings, latency: str = AZURE_REPLAY_LATENCY):
+        self.store = store
+        self.latency = latency
+        self.calls = {metrics.CLASSIFY: 0, metrics.ANALYZE: 0}
+        self._lock = threading.Lock()
+
+    def _begin(self, operation: str, model_id: str, document) -> LocalPoller:
+        with self._lock:
+            self.calls[operation] += 1
+        digest = document_digest(document)
+        recording = self.store.load(model_id, digest)
+        if recording is None:
+            raise ResourceNotFoundError(
+                message=f"Sin grabación de {model_id} para el documento {digest[:12]} en {self.store.directory}"
+            )
+        if self.latency == RECORDED_LATENCY:
+            latency = recording.get("latency_seconds", 0.0)
+        else:
+            latency = float(self.latency or 0)
+        return LocalPoller(lambda: AnalyzeResult.from_dict(recording["result"]), latency)
+
+    def begin_classify_document(self, classifier_id: str, document, **kwargs) -> LocalPoller:
+        return self._begin(metrics.CLASSIFY, classifier_id, document)
+
+    def begin_analyze_document(self, model_id: str, document, **kwargs) -> LocalPoller:
+        return self._begin(metrics.ANALYZE, model_id, document)
+
+    def close(self):
+        pass
+
+
+def record_client(client):
+    """El cliente real, envuelto para grabar si AZURE_RECORD_MODE=record"""
+    return RecordingClient(client) if AZURE_RECORD_MODE == RECORD and client is not None else client
+
+
+def record_async_client(client):
+    return RecordingAsyncClient(client) if AZURE_RECORD_MODE == RECORD and client is not None else client
+
+
+def replay_async_client(client: ReplayDocumentAnalysisClient) -> LocalAsyncClient:
+    """Versión asíncrona del cliente de reproducción (la latencia no bloquea el event loop)"""
+    return LocalAsyncClient(client)
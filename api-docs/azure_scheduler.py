@@ -0,0 +1,361 @@
+# api-docs/azure_scheduler.py
+"""Planificador de llamadas a Azure: límite por modelo, reintentos ante 429 y prioridades
+
+Cada modelo tiene un token bucket con las transacciones por segundo del
+recurso; una llamada espera su token en una cola ordenada por prioridad, de
+modo que las peticiones interactivas (/process/invoice, /process/transport)
+pasan antes que las páginas de los despachos masivos. Un 429 o 503 pausa el
+modelo durante el Retry-After indicado por Azure (o un backoff exponencial)
+y la llamada se reintenta.
+
+schedule_client / schedule_async_client envuelven el cliente; la prioridad
+se fija con el contexto priority(...) y por defecto es BULK. El cliente se
+crea con retry_policy(): el SDK ya no reintenta por su cuenta los 429/503
+de los envíos, que sólo reintenta el planificador tras esperar su token.
+"""
+import os
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from azure.core.exceptions import HttpResponseError
+from azure.core.pipeline.policies import AsyncRetryPolicy, RetryPolicy
+
+import metrics
+
+AZURE_SCHEDULER_ENABLED = os.getenv('AZURE_SCHEDULER_ENABLED', 'true').lower() == 'true'
+# Transacciones por segundo por modelo (15 es el límite del plan S0) y excepciones "modelo=tps,..."
+AZURE_TPS = float(os.getenv('AZURE_TPS', '15'))
+AZURE_MODEL_TPS = os.getenv('AZURE_MODEL_TPS', '')
+# Reintentos ante 429/503 y backoff exponencial cuando Azure no envía Retry-After
+AZURE_MAX_RETRIES = int(os.getenv('AZURE_MAX_RETRIES', '5'))
+AZURE_BACKOFF_BASE = float(os.getenv('AZURE_BACKOFF_BASE', '1'))
+AZURE_BACKOFF_MAX = float(os.getenv('AZURE_BACKOFF_MAX', '30'))
+
+RETRY_STATUS = (429, 503)
+
+# Prioridades: menor número, antes
+INTERACTIVE = 0
+BULK = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+# Las esperas asíncronas revisan la cola como mínimo con este intervalo
+ASYNC_POLL_SECONDS = 0.05
+
+_priority = contextvars.ContextVar("azure_priority", default=BULK)
+
+
+@contextmanager
+def priority(level: int):
+    """Prioridad de las llamadas a Azure hechas dentro del bloque (también en el threadpool)"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _parse_model_tps(spec: str) -> Dict[str, float]:
+    limits = {}
+    for item in spec.split(","):
+        if "=" in item:
+            model_id, tps = item.split("=", 1)
+            limits[model_id.strip()] = float(tps)
+    return limits
+
+
+class _Bucket:
+    """Token bucket de un modelo con su cola de espera por prioridad"""
+
+    def __init__(self, tps: float):
+        self.tps = tps
+        self.capacity = max(1.0, tps)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        # Azure pidió esperar hasta este instante (Retry-After o backoff)
+        self.paused_until = 0.0
+        self.waiting: List[tuple] = []
+        self.stats = {"concedidas": 0, "reintentos": 0, "espera_segundos": 0.0}
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.tps)
+        self.updated = now
+
+    def try_take(self, ticket: tuple, now: float) -> float:
+        """Tomar un token si el ticket encabeza la cola; si no, segundos sugeridos de espera"""
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.waiting[0] != ticket:
+            return ASYNC_POLL_SECONDS
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.tps
+        self.tokens -= 1
+        heapq.heappop(self.waiting)
+        return 0.0
+
+
+class AzureScheduler:
+    """Token buckets por modelo compartidos por todos los despachos y peticiones del proceso"""
+
+    def __init__(self, tps: float, model_tps: Dict[str, float]):
+        self.tps = tps
+        self.model_tps = model_tps
+        self._buckets: Dict[str, _Bucket] = {}
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    def _bucket(self, model_id: str) -> _Bucket:
+        bucket = self._buckets.get(model_id)
+        if bucket is None:
+            bucket = self._buckets[model_id] = _Bucket(self.model_tps.get(model_id, self.tps))
+        return bucket
+
+    def _enqueue(self, model_id: str, level: int) -> tuple:
+        ticket = (level, next(self._sequence))
+        heapq.heappush(self._bucket(model_id).waiting, ticket)
+        return ticket
+
+    def _granted(self, model_id: str, level: int, started: float):
+        waited = time.monotonic() - started
+        bucket = self._bucket(model_id)
+        bucket.stats["concedidas"] += 1
+        bucket.stats["espera_segundos"] += waited
+        SCHEDULER_WAIT_SECONDS.observe(waited, model_id=model_id, priority=PRIORITY_NAMES[level])
+        self._cond.notify_all()
+
+    def _cancel(self, model_id: str, ticket: tuple):
+        bucket = self._bucket(model_id)
+        if ticket in bucket.waiting:
+            bucket.waiting.remove(ticket)
+            heapq.heapify(bucket.waiting)
+            self._cond.notify_all()
+
+    def acquire(self, model_id: str, level: int):
+        """Esperar un token del modelo respetando la prioridad"""
+        started = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(model_id, level)
+            try:
+                while True:
+                    delay = self._bucket(model_id).try_take(ticket, time.monotonic())
+                    if delay == 0:
+                        self._granted(model_id, level, started)
+                        return
+                    self._cond.wait(delay)
+            except BaseException:
+                self._cancel(model_id, ticket)
+                raise
+
+    async def acquire_async(self, model_id: str, level: int):
+        """Como acquire, esperando con asyncio.sleep en vez de bloquear el event loop"""
+        started = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(model_id, level)
+        try:
+            while True:
+                with self._cond:
+                    delay = self._bucket(model_id).try_take(ticket, time.monotonic())
+                    if delay == 0:
+                        self._granted(model_id, level, started)
+                        return
+                await asyncio.sleep(min(delay, ASYNC_POLL_SECONDS))
+        except BaseException:
+            with self._cond:
+                self._cancel(model_id, ticket)
+            raise
+
+    def backoff(self, model_id: str, error: HttpResponseError, attempt: int) -> float:
+        """Pausar el modelo tras un 429/503 y devolver la pausa aplicada"""
+        delay = _retry_after(error)
+        if delay is None:
+            delay = min(AZURE_BACKOFF_MAX, AZURE_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+        with self._cond:
+            bucket = self._bucket(model_id)
+            bucket.paused_until = max(bucket.paused_until, time.monotonic() + delay)
+            bucket.stats["reintentos"] += 1
+            self._cond.notify_all()
+        SCHEDULER_RETRIES.inc(model_id=model_id, status=str(error.status_code))
+        print(f"   ⏳ Azure respondió {error.status_code} para {model_id}, reintento en {delay:.1f}s")
+        return delay
+
+    def queue_depth(self) -> Dict[tuple, int]:
+        """Llamadas esperando token por (modelo, prioridad)"""
+        with self._cond:
+            depth = {}
+            for model_id, bucket in self._buckets.items():
+                for level, name in PRIORITY_NAMES.items():
+                    depth[(model_id, name)] = sum(1 for ticket in bucket.waiting if ticket[0] == level)
+            return depth
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        with self._cond:
+            models = {}
+            for model_id, bucket in self._buckets.items():
+                bucket._refill(now)
+                stats = dict(bucket.stats)
+                stats["espera_segundos"] = round(stats["espera_segundos"], 3)
+                models[model_id] = {
+                    "tps": bucket.tps,
+                    "tokens": round(bucket.tokens, 2),
+                    "pausa_segundos": round(max(0.0, bucket.paused_until - now), 3),
+                    "en_espera": {
+                        name: sum(1 for ticket in bucket.waiting if ticket[0] == level)
+                        for level, name in PRIORITY_NAMES.items()
+                    },
+                    **stats
+                }
+        return {"habilitado": AZURE_SCHEDULER_ENABLED, "modelos": models}
+
+
+def _retry_after(error: HttpResponseError) -> Optional[float]:
+    """Segundos de Retry-After (o retry-after-ms) de la respuesta de Azure"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("x-ms-retry-after-ms", 0.001), ("Retry-After", 1.0)):
+        value = headers.get(header)
+        if value:
+            try:
+                return float(value) * scale
+            except ValueError:
+                continue
+    return None
+
+
+def _retryable(error: BaseException) -> bool:
+    return isinstance(error, HttpResponseError) and error.status_code in RETRY_STATUS
+
+
+def _rewind(document):
+    """Posición inicial de un archivo para reenviarlo en un reintento (None si son bytes)"""
+    try:
+        return document.tell()
+    except (AttributeError, OSError):
+        return None
+
+
+class _SubmitRetryMixin:
+    """Sin reintentos del SDK ante 429/503 en los POST de análisis y clasificación
+
+    Esos reintentos dormirían dentro del SDK y reenviarían sin token del
+    bucket; el error llega a ScheduledClient, que pausa el modelo con el
+    Retry-After. Los sondeos del estado (GET) y los demás errores siguen
+    con la política del SDK.
+    """
+
+    def is_retry(self, settings, response) -> bool:
+        if (response.http_request.method == "POST"
+                and response.http_response.status_code in RETRY_STATUS):
+            return False
+        return super().is_retry(settings, response)
+
+
+class SubmitRetryPolicy(_SubmitRetryMixin, RetryPolicy):
+    pass
+
+
+class AsyncSubmitRetryPolicy(_SubmitRetryMixin, AsyncRetryPolicy):
+    pass
+
+
+def retry_policy(asynchronous: bool = False):
+    """Política de reintentos para el cliente de Azure (None = la del SDK, sin planificador)"""
+    if not AZURE_SCHEDULER_ENABLED:
+        return None
+    return AsyncSubmitRetryPolicy() if asynchronous else SubmitRetryPolicy()
+
+
+class ScheduledClient:
+    """DocumentAnalysisClient cuyas llamadas esperan turno en el planificador"""
+
+    def __init__(self, client, scheduler: AzureScheduler):
+        self._client = client
+        self._scheduler = scheduler
+
+    def _begin(self, begin, model_id: str, document, **kwargs):
+        level = _priority.get()
+        position = _rewind(document)
+        for attempt in range(AZURE_MAX_RETRIES + 1):
+            self._scheduler.acquire(model_id, level)
+            if position is not None:
+                document.seek(position)
+            try:
+                return begin(model_id, document=document, **kwargs)
+            except HttpResponseError as e:
+                if not _retryable(e) or attempt == AZURE_MAX_RETRIES:
+                    raise
+                self._scheduler.backoff(model_id, e, attempt)
+
+    def begin_classify_document(self, classifier_id: str, document, **kwargs):
+        return self._begin(self._client.begin_classify_document, classifier_id, document, **kwargs)
+
+    def begin_analyze_document(self, model_id: str, document, **kwargs):
+        return self._begin(self._client.begin_analyze_document, model_id, document, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class ScheduledAsyncClient:
+    """Como ScheduledClient, para el cliente asíncrono"""
+
+    def __init__(self, client, scheduler: AzureScheduler):
+        self._client = client
+        self._scheduler = scheduler
+
+    async def _begin(self, begin, model_id: str, document, **kwargs):
+        level = _priority.get()
+        position = _rewind(document)
+        for attempt in range(AZURE_MAX_RETRIES + 1):
+            await self._scheduler.acquire_async(model_id, level)
+            if position is not None:
+                document.seek(position)
+            try:
+                return await begin(model_id, document=document, **kwargs)
+            except HttpResponseError as e:
+                if not _retryable(e) or attempt == AZURE_MAX_RETRIES:
+                    raise
+                self._scheduler.backoff(model_id, e, attempt)
+
+    async def begin_classify_document(self, classifier_id: str, document, **kwargs):
+        return await self._begin(self._client.begin_classify_document, classifier_id, document, **kwargs)
+
+    async def begin_analyze_document(self, model_id: str, document, **kwargs):
+        return await self._begin(self._client.begin_analyze_document, model_id, document, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+azure_scheduler = AzureScheduler(AZURE_TPS, _parse_model_tps(AZURE_MODEL_TPS))
+
+SCHEDULER_WAIT_SECONDS = metrics.Histogram(
+    "azure_scheduler_wait_seconds", "Espera por un token del modelo en el planificador",
+    ("model_id", "priority"))
+SCHEDULER_RETRIES = metrics.Counter(
+    "azure_scheduler_retries_total", "Llamadas reintentadas tras un 429 o 503 de Azure",
+    ("model_id", "status"))
+metrics.Gauge(
+    "azure_scheduler_queue_depth", "Llamadas esperando token por modelo y prioridad",
+    ("model_id", "priority"), collect=azure_scheduler.queue_depth)
+
+
+def schedule_client(client):
+    """Envolver el cliente de Azure para pasar por el planificador (None queda como None)"""
+    if client is None or not AZURE_SCHEDULER_ENABLED or isinstance(client, ScheduledClient):
+        return client
+    return ScheduledClient(client, azure_scheduler)
+
+
+def schedule_async_client(client):
+    """Como schedule_client, para el cliente asíncrono"""
+    if client is None or not AZURE_SCHEDULER_ENABLED or isinstance(client, ScheduledAsyncClient):
+        return client
+    return ScheduledAsyncClient(client, azure_scheduler)
@@ -0,0 +1,2 @@
+# api-docs/benchmarks
+# Ejecutar desde api-docs/: python -m benchmarks.<modulo>
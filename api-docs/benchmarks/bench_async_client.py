@@ -0,0 +1,110 @@
+# api-docs/benchmarks/bench_async_client.py
+"""Prueba de carga: /health mientras hay decenas de análisis en curso
+
+Uso: python -m benchmarks.bench_async_client [peticiones] [latencia_llamada_s]
+
+Lanza a la vez N POST /process/invoice contra la app en proceso (httpx +
+ASGITransport, un solo event loop) con el cliente Azure simulado, y consulta
+/health cada 20 ms hasta que terminan: informa la latencia de /health y el
+mayor intervalo sin ninguna respuesta. Compara tres caminos:
+
+- bloqueante: el anterior, cliente síncrono y poller.result() en el event loop
+- threadpool: cliente síncrono en el threadpool (sin aiohttp)
+- asíncrono: cliente de azure.ai.formrecognizer.aio con pollers awaitables
+"""
+import os
+import sys
+import time
+import asyncio
+
+import httpx
+
+import extraction_cache
+import main
+from benchmarks.harness import percentile
+from benchmarks.synthetic import build_dispatch_pdf
+from fake_azure import FakeDocumentAnalysisClient, FakeAsyncDocumentAnalysisClient
+
+PROBE_INTERVAL = 0.02
+
+
+async def blocking_analyze_upload(model_id: str, spooled, use_cache: bool = True):
+    """Camino anterior de /process/invoice: la llamada síncrona ocupa el event loop"""
+    return extraction_cache.analyze_document_cached(main.document_analysis_client, model_id, spooled)
+
+
+async def run_load(requests: int, pdf_bytes: bytes) -> dict:
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        done = asyncio.Event()
+        health = []
+        answered = []
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/health")
+                health.append(time.perf_counter() - start)
+                answered.append(time.perf_counter())
+                await asyncio.sleep(PROBE_INTERVAL)
+
+        async def invoice():
+            response = await client.post("/process/invoice", files={"file": ("f.pdf", pdf_bytes, "application/pdf")})
+            return response.status_code
+
+        prober = asyncio.create_task(probe())
+        # Dar tiempo a una primera consulta con el servicio libre
+        await asyncio.sleep(PROBE_INTERVAL)
+        start = time.perf_counter()
+        statuses = await asyncio.gather(*(invoice() for _ in range(requests)))
+        finished = time.perf_counter()
+        done.set()
+        await prober
+
+    # Mayor intervalo sin ninguna respuesta de /health durante la carga
+    marks = [start] + [t for t in answered if start < t < finished] + [finished]
+
+    return {
+        "segundos": finished - start,
+        "ok": sum(1 for status in statuses if status == 200),
+        "health": health,
+        "hueco": max(b - a for a, b in zip(marks, marks[1:])),
+    }
+
+
+def main_cli():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    call_latency = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+    # Todas las peticiones suben el mismo PDF: sin caché llegan todas al cliente simulado
+    extraction_cache.extraction_cache.enabled = False
+    fake = FakeDocumentAnalysisClient(call_latency=call_latency)
+    main.document_analysis_client = fake
+    pdf_bytes = build_dispatch_pdf(["factura", "factura"])
+    analyze_upload = main.analyze_upload
+
+    modes = [
+        ("bloqueante", None, blocking_analyze_upload),
+        ("threadpool", None, analyze_upload),
+        ("asíncrono", FakeAsyncDocumentAnalysisClient(fake), analyze_upload),
+    ]
+
+    print(f"{requests} análisis simultáneos de {call_latency}s (simulado), /health cada {PROBE_INTERVAL * 1000:.0f} ms")
+    print(f"{'modo':>12} {'segundos':>9} {'ok':>4} {'health p50 ms':>14} {'p95 ms':>8} {'sin respuesta ms':>17}")
+    for label, async_client, analyze in modes:
+        main.async_analysis_client = async_client
+        main.analyze_upload = analyze
+        # Silenciar el log de cada análisis
+        sys.stdout = open(os.devnull, "w")
+        try:
+            r = asyncio.run(run_load(requests, pdf_bytes))
+        finally:
+            sys.stdout.close()
+            sys.stdout = sys.__stdout__
+        health = r["health"]
+        print(f"{label:>12} {r['segundos']:>9.2f} {r['ok']:>4} {percentile(health, 0.5) * 1000:>14.1f} "
+              f"{percentile(health, 0.95) * 1000:>8.1f} {r['hueco'] * 1000:>17.0f}")
+
+
+if __name__ == "__main__":
+    main_cli()
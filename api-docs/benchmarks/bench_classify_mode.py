@@ -0,0 +1,58 @@
+# api-docs/benchmarks/bench_classify_mode.py
+"""Comparar clasificación por página vs. documento completo con el cliente Azure simulado
+
+Uso: python -m benchmarks.bench_classify_mode [páginas] [latencia_llamada_s] [latencia_página_s]
+"""
+import sys
+import time
+
+import document_processor
+import text_classifier
+from benchmarks.synthetic import build_dispatch_pdf, mixed_page_types
+from fake_azure import FakeDocumentAnalysisClient
+from pdf_session import PdfSession
+
+
+def classify(pdf_bytes: bytes, mode: str, client: FakeDocumentAnalysisClient):
+    processor = document_processor.DocumentProcessor()
+    processor.client = client
+
+    with PdfSession(pdf_bytes) as session:
+        if mode == "document":
+            return processor.classify_document(pdf_bytes, session.page_count)
+        pages = processor.separate_pages(session)
+        return processor.group_consecutive_pages(processor.classify_pages(pages))
+
+
+def main():
+    total_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    call_latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    page_latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.02
+
+    # Medir sólo las llamadas remotas: sin caché ni clasificador local
+    document_processor.classification_cache.enabled = False
+    text_classifier.LOCAL_CLASSIFIER_ENABLED = False
+
+    pdf_bytes = build_dispatch_pdf(mixed_page_types(total_pages), scanned=True)
+
+    results = {}
+    for mode in ("page", "document"):
+        client = FakeDocumentAnalysisClient(call_latency=call_latency, page_latency=page_latency)
+        start = time.perf_counter()
+        groups = classify(pdf_bytes, mode, client)
+        results[mode] = (time.perf_counter() - start, client, groups)
+
+    print()
+    print(f"{total_pages} páginas, latencia {call_latency}s/llamada + {page_latency}s/página, "
+          f"{document_processor.CLASSIFY_MAX_WORKERS} workers en modo página")
+    print(f"{'modo':<10} {'tiempo (s)':>11} {'llamadas':>9} {'MB subidos':>11} {'grupos':>7}")
+    for mode, (elapsed, client, groups) in results.items():
+        print(f"{mode:<10} {elapsed:>11.2f} {client.calls['classify']:>9} "
+              f"{client.bytes_uploaded['classify'] / 1024 ** 2:>11.2f} {len(groups):>7}")
+
+    same = results["page"][2] == results["document"][2]
+    print(f"Mismos grupos en ambos modos: {'sí' if same else 'no'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# api-docs/benchmarks/bench_excel_export.py
+"""Tiempo y memoria del Excel de despacho: libro en memoria vs. sólo escritura
+
+Uso: python -m benchmarks.bench_excel_export [documentos ...]
+
+Por defecto mide despachos de 10, 100 y 1000 documentos. Cada medición
+corre en un subproceso nuevo para que ru_maxrss refleje sólo esa exportación.
+"""
+import os
+import sys
+import json
+import time
+import subprocess
+
+from benchmarks.bench_upload_memory import current_rss_bytes, peak_rss_bytes
+
+
+def build_dispatch(total_documents: int) -> dict:
+    documentos = []
+    for i in range(total_documents):
+        tipo = "factura" if i % 2 == 0 else "transporte"
+        if tipo == "factura":
+            datos = {
+                "vendor_information": {"VendorName": "Proveedor Demo Ltda.", "VendorAddress": "Av. Demo 123, Shanghai"},
+                "customer_information": {"CustomerName": "Importadora Demo SpA", "CustomerTaxId": "76.123.456-7"},
+                "totals": {"SubTotal": "1150.00", "TotalTax": "100.00", "InvoiceTotal": "1250.00"},
+            }
+        else:
+            datos = {
+                "shipper": {"ShipperName": "Proveedor Demo Ltda."},
+                "consignee": {"ConsigneeName": "Importadora Demo SpA", "ConsigneeAddress": "Valparaíso, Chile"},
+            }
+        documentos.append({
+            "id": f"BENCH_{i + 1}",
+            "tipo": tipo,
+            "paginas": f"{i + 1}-{i + 1}",
+            "procesado": True,
+            "datos_extraidos": datos,
+        })
+    return {
+        "numero_despacho": "BENCH",
+        "total_paginas": total_documents,
+        "total_documentos": total_documents,
+        "resumen": {"factura": (total_documents + 1) // 2, "transporte": total_documents // 2},
+        "documentos": documentos,
+    }
+
+
+def run_export(total_documents: int, streaming: bool) -> dict:
+    import main
+    from excel_export import export_dispatch_excel, iter_export
+
+    data = build_dispatch(total_documents)
+    baseline = current_rss_bytes()
+    start = time.perf_counter()
+    if streaming:
+        size = sum(len(chunk) for chunk in iter_export(export_dispatch_excel(data)))
+    else:
+        size = len(main.create_excel_from_dispatch(data).getvalue())
+    return {
+        "seconds": time.perf_counter() - start,
+        "peak_bytes": max(0, peak_rss_bytes() - baseline),
+        "size": size,
+    }
+
+
+def measure(total_documents: int, streaming: bool) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_excel_export", "--child", str(total_documents), str(int(streaming))],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10, 100, 1000]
+    print(f"{'documentos':>10} {'modo':>14} {'segundos':>9} {'pico MB':>8} {'KB xlsx':>8}")
+    for total_documents in sizes:
+        for label, streaming in (("en memoria", False), ("sólo escritura", True)):
+            r = measure(total_documents, streaming)
+            print(f"{total_documents:>10} {label:>14} {r['seconds']:>9.2f} "
+                  f"{r['peak_bytes'] / 1024 ** 2:>8.1f} {r['size'] / 1024:>8.0f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        result = run_export(int(sys.argv[2]), sys.argv[3] == "1")
+        print(json.dumps(result))
+    else:
+        main()
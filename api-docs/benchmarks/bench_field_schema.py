@@ -0,0 +1,84 @@
+# api-docs/benchmarks/bench_field_schema.py
+"""Categorizar resultados con miles de campos: esquema compilado vs. cadenas de any()
+
+Uso: python -m benchmarks.bench_field_schema [campos] [repeticiones]
+
+Simula facturas con muchas líneas de detalle (ItemNDescription, ItemNAmount,
+...) y compara el esquema de field_schema con la categorización anterior,
+que recorría las listas de palabras clave campo por campo.
+"""
+import sys
+import time
+
+from azure.ai.formrecognizer import AnalyzeResult, AnalyzedDocument, DocumentField
+
+from field_schema import INVOICE_SCHEMA
+
+HEADER_FIELDS = ["VendorName", "VendorAddress", "CustomerName", "CustomerAddress", "InvoiceId",
+                 "InvoiceDate", "DueDate", "PurchaseOrder", "SubTotal", "TotalTax", "InvoiceTotal"]
+ITEM_FIELDS = ["Description", "Quantity", "UnitPrice", "Amount", "ProductCode", "HsCode", "Origin", "NetWeight"]
+
+
+def build_result(total_fields: int) -> AnalyzeResult:
+    names = list(HEADER_FIELDS)
+    item = 1
+    while len(names) < total_fields:
+        names += [f"Item{item}{suffix}" for suffix in ITEM_FIELDS]
+        item += 1
+    fields = {
+        name: DocumentField(value_type="string", value=f"valor {i}", content=f"valor {i}", confidence=0.9)
+        for i, name in enumerate(names[:total_fields])
+    }
+    document = AnalyzedDocument(doc_type="invoice_01", confidence=0.9, bounding_regions=[], spans=[], fields=fields)
+    return AnalyzeResult(model_id="invoice_01", documents=[document], key_value_pairs=[], pages=[])
+
+
+def previous_invoice_data(result) -> dict:
+    """Categorización anterior de document_processor._extract_invoice_data"""
+    data = {"vendor_information": {}, "customer_information": {}, "invoice_details": {}, "totals": {}, "line_items": []}
+    for doc in result.documents:
+        for field_name, field_value in doc.fields.items():
+            if hasattr(field_value, 'value') and field_value.value:
+                value = str(field_value.value)
+                field_lower = field_name.lower()
+                if any(t in field_lower for t in ['vendor', 'supplier', 'seller']):
+                    data["vendor_information"][field_name] = value
+                elif any(t in field_lower for t in ['customer', 'buyer', 'client']):
+                    data["customer_information"][field_name] = value
+                elif any(t in field_lower for t in ['total', 'amount', 'subtotal', 'tax']):
+                    data["totals"][field_name] = value
+                elif any(t in field_lower for t in ['item', 'line', 'product']):
+                    data["line_items"].append({field_name: value})
+                else:
+                    data["invoice_details"][field_name] = value
+    return data
+
+
+def timed(fn, result, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(result)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    total_fields = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    result = build_result(total_fields)
+    compiled = lambda r: INVOICE_SCHEMA.categorize(r)[0]
+
+    previous, new = previous_invoice_data(result), compiled(result)
+    # Mismas categorías salvo las palabras clave que sólo tenía otra copia
+    mismatches = sum(len(previous[k]) != len(new[k]) for k in previous)
+
+    print(f"{total_fields} campos, promedio de {repeat} repeticiones")
+    print(f"{'anterior (any)':>22}: {timed(previous_invoice_data, result, repeat):8.2f} ms")
+    INVOICE_SCHEMA._cache.clear()
+    print(f"{'esquema, 1ª pasada':>22}: {timed(compiled, result, 1):8.2f} ms")
+    print(f"{'esquema, memorizado':>22}: {timed(compiled, result, repeat):8.2f} ms")
+    print(f"categorías con distinto tamaño: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# api-docs/benchmarks/bench_incremental.py
+"""Volver a procesar un despacho resubido: completo vs. sólo las páginas cambiadas
+
+Uso: python -m benchmarks.bench_incremental [páginas] [latencia_llamada_s]
+
+Procesa un despacho y luego una nueva versión con una página de factura
+reemplazada y dos páginas agregadas al final. Las cachés de clasificación y
+extracción y el clasificador local se desactivan para medir sólo el
+manifiesto del despacho.
+"""
+import os
+import sys
+import time
+
+import fitz  # pymupdf
+
+import dispatch_manifest
+import document_processor
+import extraction_cache
+import text_classifier
+from benchmarks.synthetic import build_dispatch_pdf, mixed_page_types
+from fake_azure import FakeDocumentAnalysisClient
+
+
+def reuploaded_pdf(original: bytes, total_pages: int) -> bytes:
+    """El original con su primera factura reemplazada y dos facturas agregadas al final"""
+    replacement = build_dispatch_pdf(["factura"] * 3)
+    src = fitz.open("pdf", original)
+    extra = fitz.open("pdf", replacement)
+    doc = fitz.open()
+    doc.insert_pdf(src)
+    # Página 1 (factura) reemplazada por otra factura con distinto contenido
+    doc.delete_page(0)
+    doc.insert_pdf(extra, from_page=2, to_page=2, start_at=0)
+    doc.insert_pdf(extra, from_page=0, to_page=1)
+    pdf_bytes = doc.tobytes(garbage=3, deflate=True)
+    for d in (src, extra, doc):
+        d.close()
+    return pdf_bytes
+
+
+def run(client: FakeDocumentAnalysisClient, pdf_bytes: bytes, numero_despacho: str) -> dict:
+    calls = dict(client.calls)
+    start = time.perf_counter()
+    sys.stdout = open(os.devnull, "w")
+    try:
+        resultado = document_processor.process_dispatch_workflow(
+            pdf_bytes, numero_despacho, documento=dispatch_manifest.PRINCIPAL
+        )
+    finally:
+        sys.stdout.close()
+        sys.stdout = sys.__stdout__
+    return {
+        "segundos": time.perf_counter() - start,
+        "clasificaciones": client.calls["classify"] - calls["classify"],
+        "extracciones": client.calls["analyze"] - calls["analyze"],
+        "documentos": resultado.get("total_documentos", 0),
+        "fallidos": sum(1 for doc in resultado.get("documentos", []) if not doc["procesado"]),
+        "resumen": resultado.get("resumen"),
+    }
+
+
+def main():
+    total_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    call_latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+
+    document_processor.classification_cache.enabled = False
+    extraction_cache.extraction_cache.enabled = False
+    text_classifier.LOCAL_CLASSIFIER_ENABLED = False
+    client = FakeDocumentAnalysisClient(call_latency=call_latency)
+    document_processor.document_analysis_client = client
+
+    original = build_dispatch_pdf(mixed_page_types(total_pages), scanned=True)
+    updated = reuploaded_pdf(original, total_pages)
+
+    print(f"{total_pages} páginas escaneadas, luego 1 factura reemplazada y 2 agregadas ({call_latency}s/llamada)")
+    print(f"{'modo':>12} {'subida':>10} {'segundos':>9} {'clasif.':>8} {'extracc.':>9} {'documentos':>11}")
+    results = {}
+    for label, enabled in (("completo", False), ("incremental", True)):
+        dispatch_manifest.DISPATCH_MANIFEST_ENABLED = enabled
+        numero_despacho = f"BENCH-{label}-{time.time_ns()}"
+        for upload, pdf_bytes in (("primera", original), ("resubida", updated)):
+            r = run(client, pdf_bytes, numero_despacho)
+            results[(label, upload)] = r
+            print(f"{label:>12} {upload:>10} {r['segundos']:>9.2f} {r['clasificaciones']:>8} "
+                  f"{r['extracciones']:>9} {r['documentos']:>11}")
+
+    same = results[("completo", "resubida")]["resumen"] == results[("incremental", "resubida")]["resumen"]
+    print(f"mismo resumen de documentos en ambos modos: {'sí' if same else 'no'}")
+
+
+if __name__ == "__main__":
+    main()
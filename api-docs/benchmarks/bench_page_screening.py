@@ -0,0 +1,70 @@
+# api-docs/benchmarks/bench_page_screening.py
+"""Llamadas de clasificación y tiempo con y sin detección de páginas en blanco y duplicadas
+
+Uso: python -m benchmarks.bench_page_screening [páginas] [latencia_llamada_s]
+
+El despacho sintético es un escaneo a doble cara: cada hoja lleva un reverso en
+blanco y cada factura se repite una vez (copia original + copia cliente).
+"""
+import sys
+import time
+
+import document_processor
+import text_classifier
+from benchmarks.synthetic import BLANK_PAGE, build_dispatch_pdf, mixed_page_types
+from fake_azure import FakeDocumentAnalysisClient
+from page_fingerprint import PageScreener
+from pdf_session import PdfSession
+
+
+def duplex_page_types(sheets: int) -> list:
+    page_types = []
+    for page_type in mixed_page_types(sheets):
+        copies = 2 if page_type == "factura" else 1
+        page_types += [page_type, BLANK_PAGE] * copies
+    return page_types
+
+
+def run(pdf_bytes: bytes, page_types: list, screening: bool, call_latency: float) -> dict:
+    processor = document_processor.DocumentProcessor()
+    processor.client = FakeDocumentAnalysisClient(call_latency=call_latency)
+
+    with PdfSession(pdf_bytes) as session:
+        screener = PageScreener(session) if screening else None
+        start = time.perf_counter()
+        classifications = processor.classify_pages(session.pages(), screener=screener)
+        elapsed = time.perf_counter() - start
+
+    # Las páginas con contenido deben conservar su tipo; las en blanco no cuentan
+    expected = [(i, t) for i, t in enumerate(page_types) if t != BLANK_PAGE]
+    got = dict(classifications)
+    correct = sum(got.get(i) == t for i, t in expected)
+
+    return {
+        "calls": processor.client.calls["classify"],
+        "seconds": elapsed,
+        "accuracy": correct / len(expected),
+    }
+
+
+def main():
+    sheets = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    call_latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+
+    # Medir sólo las llamadas remotas: sin caché ni clasificador local
+    document_processor.classification_cache.enabled = False
+    text_classifier.LOCAL_CLASSIFIER_ENABLED = False
+
+    page_types = duplex_page_types(sheets)
+    pdf_bytes = build_dispatch_pdf(page_types, scanned=True)
+
+    print(f"{len(page_types)} páginas escaneadas, {page_types.count(BLANK_PAGE)} en blanco "
+          f"(simulado, {call_latency}s/llamada)")
+    print(f"{'modo':<14} {'llamadas':>9} {'segundos':>9} {'precisión':>10}")
+    for label, screening in (("sin detección", False), ("con detección", True)):
+        r = run(pdf_bytes, page_types, screening, call_latency)
+        print(f"{label:<14} {r['calls']:>9} {r['seconds']:>9.2f} {r['accuracy']:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Bytes subidos, latencia por página y precisión con y sin reducción de páginas escaneadas
+
+Uso: python -m benchmarks.bench_payload_slimming [directorio_pdfs]
+
+El directorio puede incluir labels.json ({"archivo.pdf": ["factura", ...]}) con el
+tipo esperado por página. Sin directorio se usa un despacho sintético escaneado a
+BENCH_SCAN_DPI (300 dpi). Por defecto se usa el cliente Azure simulado con un enlace
+de subida compartido de BENCH_UPLOAD_MBPS (8 Mbit/s); con BENCH_USE_AZURE=true se
+mide contra Azure real.
+"""
+import os
+import sys
+import time
+from typing import List, Optional, Tuple
+
+import document_processor
+import extraction_cache
+import payload_slimming
+import text_classifier
+from benchmarks.bench_text_classifier import load_corpus
+from benchmarks.synthetic import build_dispatch_pdf, mixed_page_types
+from fake_azure import FakeDocumentAnalysisClient
+from pdf_session import PdfSession
+
+CALL_LATENCY = float(os.getenv('BENCH_CALL_LATENCY', '0.3'))
+UPLOAD_MBPS = float(os.getenv('BENCH_UPLOAD_MBPS', '8'))
+USE_AZURE = os.getenv('BENCH_USE_AZURE', 'false').lower() == 'true'
+SCAN_DPI = int(os.getenv('BENCH_SCAN_DPI', '300'))
+
+
+class CountingClient:
+    """Envoltorio que cuenta los bytes subidos por un cliente Azure real"""
+
+    def __init__(self, client):
+        self.client = client
+        self.bytes_uploaded = {"classify": 0, "analyze": 0}
+
+    def begin_classify_document(self, model_id, document, **kwargs):
+        self.bytes_uploaded["classify"] += len(document)
+        return self.client.begin_classify_document(model_id, document=document, **kwargs)
+
+    def begin_analyze_document(self, model_id, document, **kwargs):
+        self.bytes_uploaded["analyze"] += len(document)
+        return self.client.begin_analyze_document(model_id, document=document, **kwargs)
+
+
+def make_client():
+    if USE_AZURE:
+        return CountingClient(document_processor.document_analysis_client)
+    return FakeDocumentAnalysisClient(call_latency=CALL_LATENCY, upload_bandwidth=UPLOAD_MBPS * 1024 ** 2 / 8)
+
+
+def run(corpus: List[Tuple[str, bytes, Optional[List[str]]]], slimming: bool) -> dict:
+    payload_slimming.PAYLOAD_SLIMMING_ENABLED = slimming
+    processor = document_processor.DocumentProcessor()
+    processor.client = make_client()
+
+    pages = correct = labelled = 0
+    classify_time = extract_time = 0.0
+
+    for name, pdf_bytes, expected in corpus:
+        with PdfSession(pdf_bytes) as session:
+            start = time.perf_counter()
+            classifications = processor.classify_pages(session.pages())
+            classify_time += time.perf_counter() - start
+
+            for page_num, doc_type in classifications:
+                if expected and page_num < len(expected):
+                    labelled += 1
+                    correct += int(expected[page_num] == doc_type)
+
+            start = time.perf_counter()
+            for group in processor.group_consecutive_pages(classifications):
+                processor.process_with_model(session.range_bytes(group['pages']), group['doc_type'])
+            extract_time += time.perf_counter() - start
+            pages += session.page_count
+
+    return {
+        "pages": pages,
+        "classify_bytes": processor.client.bytes_uploaded["classify"],
+        "analyze_bytes": processor.client.bytes_uploaded["analyze"],
+        "classify_ms": classify_time / pages * 1000,
+        "extract_ms": extract_time / pages * 1000,
+        "accuracy": correct / labelled if labelled else None,
+    }
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else None
+    if directory:
+        corpus = load_corpus(directory)
+    else:
+        page_types = mixed_page_types(40)
+        corpus = [(f"sintetico_{SCAN_DPI}dpi.pdf", build_dispatch_pdf(page_types, scanned=True, dpi=SCAN_DPI), page_types)]
+
+    # Medir sólo las subidas: sin cachés ni clasificador local
+    document_processor.classification_cache.enabled = False
+    extraction_cache.extraction_cache.enabled = False
+    text_classifier.LOCAL_CLASSIFIER_ENABLED = False
+
+    results = {"original": run(corpus, slimming=False), "reducido": run(corpus, slimming=True)}
+
+    source = "Azure" if USE_AZURE else f"simulado, {CALL_LATENCY}s/llamada, {UPLOAD_MBPS:g} Mbit/s"
+    print(f"{results['original']['pages']} páginas ({source})")
+    print(f"{'modo':<9} {'KB/pág clasif':>14} {'KB/pág extr':>12} {'ms/pág clasif':>14} "
+          f"{'ms/pág extr':>12} {'precisión':>10}")
+    for mode, r in results.items():
+        accuracy = f"{r['accuracy']:.1%}" if r['accuracy'] is not None else "-"
+        print(f"{mode:<9} {r['classify_bytes'] / r['pages'] / 1024:>14.1f} {r['analyze_bytes'] / r['pages'] / 1024:>12.1f} "
+              f"{r['classify_ms']:>14.1f} {r['extract_ms']:>12.1f} {accuracy:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# api-docs/benchmarks/bench_pdf_session.py
+"""Comparar separación/reagrupación parseando el PDF una vez (PdfSession) vs. por grupo"""
+import fitz  # pymupdf
+import time
+from typing import List
+
+from benchmarks.synthetic import build_dispatch_pdf, mixed_page_types
+from document_processor import DocumentProcessor
+from pdf_session import PdfSession
+
+SIZES = [50, 200, 500]
+
+
+def legacy_split_and_regroup(pdf_bytes: bytes, groups: List[List[int]]):
+    """Implementación anterior: un parseo del original por cada grupo"""
+    doc = fitz.open("pdf", pdf_bytes)
+    for page_num in range(len(doc)):
+        new_doc = fitz.open()
+        new_doc.insert_pdf(doc, from_page=page_num, to_page=page_num)
+        new_doc.write()
+        new_doc.close()
+    doc.close()
+
+    for pages in groups:
+        doc = fitz.open("pdf", pdf_bytes)
+        new_doc = fitz.open()
+        for page_num in pages:
+            new_doc.insert_pdf(doc, from_page=page_num, to_page=page_num)
+        new_doc.write()
+        new_doc.close()
+        doc.close()
+
+
+def session_split_and_regroup(pdf_bytes: bytes, groups: List[List[int]]):
+    processor = DocumentProcessor()
+    with PdfSession(pdf_bytes) as session:
+        processor.separate_pages(session)
+        for pages in groups:
+            processor.create_pdf_from_pages(session, pages)
+
+
+def main():
+    processor = DocumentProcessor()
+    print(f"{'páginas':>8} {'grupos':>7} {'anterior (s)':>13} {'sesión (s)':>11} {'mejora':>7}")
+
+    for total_pages in SIZES:
+        page_types = mixed_page_types(total_pages)
+        pdf_bytes = build_dispatch_pdf(page_types, scanned=True)
+        groups = [g['pages'] for g in processor.group_consecutive_pages(list(enumerate(page_types)))]
+
+        start = time.perf_counter()
+        legacy_split_and_regroup(pdf_bytes, groups)
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        session_split_and_regroup(pdf_bytes, groups)
+        session = time.perf_counter() - start
+
+        print(f"{total_pages:>8} {len(groups):>7} {legacy:>13.3f} {session:>11.3f} {legacy / session:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
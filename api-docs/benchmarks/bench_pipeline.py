@@ -0,0 +1,51 @@
+# api-docs/benchmarks/bench_pipeline.py
+"""Tiempo por etapa del workflow de despacho con el cliente Azure simulado
+
+Uso: python -m benchmarks.bench_pipeline [páginas] [latencia_llamada_s]
+
+Con las etapas solapadas el total debería acercarse a
+max(clasificación, extracción) en vez de a su suma.
+"""
+import os
+import sys
+
+import dispatch_manifest
+import document_processor
+import extraction_cache
+import page_fingerprint
+import text_classifier
+from benchmarks.synthetic import build_dispatch_pdf, mixed_page_types
+from fake_azure import FakeDocumentAnalysisClient
+
+
+def main():
+    total_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    call_latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+
+    # Medir sólo las llamadas remotas: sin cachés, clasificador local ni detección de duplicadas
+    document_processor.classification_cache.enabled = False
+    extraction_cache.extraction_cache.enabled = False
+    dispatch_manifest.manifest_cache.enabled = False
+    text_classifier.LOCAL_CLASSIFIER_ENABLED = False
+    page_fingerprint.PAGE_SCREENING_ENABLED = False
+    document_processor.document_analysis_client = FakeDocumentAnalysisClient(call_latency=call_latency)
+
+    pdf_bytes = build_dispatch_pdf(mixed_page_types(total_pages), scanned=True)
+
+    # Silenciar el log del workflow
+    sys.stdout = open(os.devnull, "w")
+    resultado = document_processor.process_dispatch_workflow(pdf_bytes, "BENCH")
+    sys.stdout = sys.__stdout__
+
+    tiempos = resultado["tiempos"]
+    staged = tiempos["clasificacion_segundos"] + tiempos["extraccion_segundos"]
+    print(f"{total_pages} páginas, {resultado['total_documentos']} documentos (simulado, {call_latency}s/llamada)")
+    for stage, seconds in tiempos.items():
+        print(f"{stage:>28}: {seconds:7.2f}")
+    print(f"{'suma de etapas':>28}: {staged:7.2f}")
+    print(f"{'total / máx(etapas)':>28}: "
+          f"{tiempos['total_segundos'] / max(tiempos['clasificacion_segundos'], tiempos['extraccion_segundos']):7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# api-docs/benchmarks/bench_process_pool.py
+"""Varios despachos escaneados grandes a la vez: hilos vs. pool de procesos de PDF
+
+Uso: python -m benchmarks.bench_process_pool [despachos] [páginas] [procesos,...]
+
+Procesa los despachos en paralelo (un hilo por despacho, como los trabajos
+de /jobs/automatic) con el cliente Azure simulado casi sin latencia, de modo
+que el tiempo lo domina el trabajo de fitz: reducir cada página para
+clasificarla y cada grupo para extraerlo. Compara el modo sin pool (0) con
+pools de distintos tamaños; las páginas por segundo escalan con los
+procesos hasta el número de núcleos disponibles.
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import dispatch_manifest
+import document_processor
+import extraction_cache
+import payload_slimming
+import text_classifier
+from benchmarks.synthetic import build_dispatch_pdf, mixed_page_types
+from fake_azure import FakeDocumentAnalysisClient
+from pdf_workers import PdfWorkerPool
+
+
+def run(pdfs, pool: PdfWorkerPool) -> dict:
+    document_processor.pdf_pool = pool
+    if pool.enabled:
+        # Arrancar los procesos fuera de la medición (spawn importa fitz en cada uno)
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            list(executor.map(lambda pdf: pool.slim(pdf, "classification"), pdfs[:1] * pool.size))
+
+    start = time.perf_counter()
+    sys.stdout = open(os.devnull, "w")
+    try:
+        with ThreadPoolExecutor(max_workers=len(pdfs)) as executor:
+            resultados = list(executor.map(
+                lambda item: document_processor.process_dispatch_workflow(item[1], f"BENCH-{item[0]}"),
+                enumerate(pdfs)
+            ))
+    finally:
+        sys.stdout.close()
+        sys.stdout = sys.__stdout__
+    seconds = time.perf_counter() - start
+    pool.shutdown()
+
+    return {
+        "segundos": seconds,
+        "paginas": sum(r.get("total_paginas", 0) for r in resultados),
+        "fallidos": sum(1 for r in resultados for doc in r.get("documentos", []) if not doc["procesado"]),
+        "resumenes": [r.get("resumen") for r in resultados],
+    }
+
+
+def main():
+    dispatches = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    total_pages = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    sizes = ([int(n) for n in sys.argv[3].split(",")] if len(sys.argv) > 3
+             else sorted({0, 1, 2, 4, cores}))
+
+    document_processor.classification_cache.enabled = False
+    extraction_cache.extraction_cache.enabled = False
+    dispatch_manifest.DISPATCH_MANIFEST_ENABLED = False
+    text_classifier.LOCAL_CLASSIFIER_ENABLED = False
+    document_processor.document_analysis_client = FakeDocumentAnalysisClient(call_latency=0.01)
+
+    # Escaneos a 300 dpi: se renderizan tanto para clasificar como para extraer
+    pdfs = [build_dispatch_pdf(mixed_page_types(total_pages), scanned=True, dpi=300) for _ in range(dispatches)]
+    size_mb = sum(len(pdf) for pdf in pdfs) / 1024 / 1024
+
+    print(f"{dispatches} despachos simultáneos de {total_pages} páginas escaneadas ({size_mb:.1f} MB), "
+          f"{cores} núcleo(s) disponibles")
+    print(f"{'procesos':>9} {'segundos':>9} {'páginas/s':>10} {'aceleración':>12} {'fallidos':>9}")
+    baseline = None
+    reference = None
+    for size in sizes:
+        r = run(pdfs, PdfWorkerPool(size))
+        rate = r["paginas"] / r["segundos"]
+        baseline = baseline or rate
+        reference = reference or r["resumenes"]
+        print(f"{size:>9} {r['segundos']:>9.2f} {rate:>10.1f} {rate / baseline:>11.2f}x {r['fallidos']:>9}"
+              f"{'' if r['resumenes'] == reference else '  (resumen distinto)'}")
+
+    stats = payload_slimming.payload_stats()
+    print(f"páginas renderizadas: clasificación {stats['classification']['paginas_renderizadas']}, "
+          f"extracción {stats['extraction']['paginas_renderizadas']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# api-docs/benchmarks/bench_replay.py
+"""Workflow completo sobre respuestas grabadas de Azure, sin red ni costo
+
+Uso: python -m benchmarks.bench_replay [páginas | despacho.pdf] [latencia_grabación_s]
+
+Con un número de páginas graba primero las respuestas del cliente simulado
+(con la latencia indicada, como si fuera Azure) en un directorio temporal y
+luego reproduce el mismo despacho sin latencia y con la latencia grabada,
+comprobando que los documentos y datos extraídos coinciden. Con la ruta de
+un PDF reproduce sus respuestas de AZURE_RECORDINGS_DIR, grabadas antes
+con AZURE_RECORD_MODE=record.
+"""
+import os
+import sys
+import time
+import tempfile
+
+import dispatch_manifest
+import document_processor
+import extraction_cache
+import metrics
+import text_classifier
+from azure_recorder import (
+    RECORDED_LATENCY, RecordingClient, RecordingStore, ReplayDocumentAnalysisClient, recordings
+)
+from benchmarks.synthetic import build_dispatch_pdf, mixed_page_types
+from fake_azure import FakeDocumentAnalysisClient
+
+
+def run(client, pdf, numero_despacho: str) -> dict:
+    document_processor.document_analysis_client = metrics.instrument_client(client)
+    start = time.perf_counter()
+    sys.stdout = open(os.devnull, "w")
+    try:
+        resultado = document_processor.process_dispatch_workflow(pdf, numero_despacho)
+    finally:
+        sys.stdout.close()
+        sys.stdout = sys.__stdout__
+    documentos = resultado.get("documentos", [])
+    return {
+        "segundos": time.perf_counter() - start,
+        "documentos": len(documentos),
+        "fallidos": sum(1 for doc in documentos if not doc["procesado"]),
+        # Lo que debe coincidir entre la grabación y la reproducción
+        "salida": [(doc["tipo"], doc["paginas"], doc.get("datos_extraidos")) for doc in documentos],
+    }
+
+
+def report(label: str, r: dict, reference: dict = None):
+    same = "" if reference is None else ("sí" if r["salida"] == reference["salida"] else "NO")
+    print(f"{label:>24} {r['segundos']:>9.2f} {r['documentos']:>11} {r['fallidos']:>9} {same:>12}")
+
+
+def main():
+    arg = sys.argv[1] if len(sys.argv) > 1 else "60"
+    call_latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+
+    # Todas las llamadas llegan al cliente: sin cachés ni clasificador local
+    document_processor.classification_cache.enabled = False
+    extraction_cache.extraction_cache.enabled = False
+    dispatch_manifest.DISPATCH_MANIFEST_ENABLED = False
+    text_classifier.LOCAL_CLASSIFIER_ENABLED = False
+
+    print(f"{'cliente':>24} {'segundos':>9} {'documentos':>11} {'fallidos':>9} {'coincide':>12}")
+    if not arg.isdigit():
+        store = recordings
+        reference = None
+        pdf = arg
+    else:
+        store = RecordingStore(tempfile.mkdtemp(prefix="azure-recordings-"))
+        pdf = build_dispatch_pdf(mixed_page_types(int(arg)), scanned=True)
+        fake = FakeDocumentAnalysisClient(call_latency=call_latency)
+        reference = run(RecordingClient(fake, store), pdf, "BENCH-grabacion")
+        report(f"grabación ({call_latency}s)", reference)
+
+    for label, latency in (("reproducción", "0"), ("reproducción grabada", RECORDED_LATENCY)):
+        replay = ReplayDocumentAnalysisClient(store, latency=latency)
+        report(label, run(replay, pdf, f"BENCH-{latency}"), reference)
+
+    stats = store.stats()
+    print(f"grabaciones en {store.directory}: {stats['por_modelo']}, faltantes: {stats['faltantes']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# api-docs/benchmarks/bench_text_classifier.py
+"""Reporte de llamadas a Azure evitadas por el clasificador local de capa de texto
+
+Uso: python -m benchmarks.bench_text_classifier [directorio_pdfs]
+
+El directorio puede incluir labels.json ({"archivo.pdf": ["factura", ...]}) con el
+tipo esperado por página para medir la precisión de las decisiones locales. Sin
+directorio se usa un corpus sintético con páginas de texto y escaneadas.
+"""
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.synthetic import build_dispatch_pdf, mixed_page_types
+from pdf_session import PdfSession
+from text_classifier import LOCAL_CLASSIFIER_THRESHOLD, classify_text_layer
+
+
+def load_corpus(directory: Optional[str]) -> List[Tuple[str, bytes, Optional[List[str]]]]:
+    if not directory:
+        page_types = mixed_page_types(40)
+        return [
+            ("sintetico_texto.pdf", build_dispatch_pdf(page_types), page_types),
+            ("sintetico_escaneado.pdf", build_dispatch_pdf(page_types[:10], scanned=True), page_types[:10]),
+        ]
+
+    labels: Dict[str, List[str]] = {}
+    labels_path = os.path.join(directory, "labels.json")
+    if os.path.exists(labels_path):
+        with open(labels_path) as f:
+            labels = json.load(f)
+
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(".pdf"):
+            with open(os.path.join(directory, name), "rb") as f:
+                corpus.append((name, f.read(), labels.get(name)))
+    return corpus
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else None
+    corpus = load_corpus(directory)
+
+    total = local = correct = labelled = 0
+    elapsed = 0.0
+
+    print(f"Umbral de confianza: {LOCAL_CLASSIFIER_THRESHOLD}")
+    print(f"{'archivo':<32} {'páginas':>8} {'locales':>8} {'a Azure':>8}")
+
+    for name, pdf_bytes, expected in corpus:
+        file_local = 0
+        with PdfSession(pdf_bytes) as session:
+            for page_num in range(session.page_count):
+                page_bytes = session.page_bytes(page_num)
+                start = time.perf_counter()
+                doc_type, confidence = classify_text_layer(page_bytes)
+                elapsed += time.perf_counter() - start
+
+                if doc_type is not None and confidence >= LOCAL_CLASSIFIER_THRESHOLD:
+                    file_local += 1
+                    if expected and page_num < len(expected):
+                        labelled += 1
+                        correct += int(expected[page_num] == doc_type)
+            pages = session.page_count
+
+        total += pages
+        local += file_local
+        print(f"{name[:32]:<32} {pages:>8} {file_local:>8} {pages - file_local:>8}")
+
+    print()
+    print(f"Páginas: {total}")
+    print(f"Llamadas a Azure evitadas: {local} ({local / total:.1%})" if total else "Sin páginas")
+    if labelled:
+        print(f"Precisión de decisiones locales etiquetadas: {correct}/{labelled} ({correct / labelled:.1%})")
+    if total:
+        print(f"Tiempo medio de clasificación local: {elapsed / total * 1000:.2f} ms/página")
+
+
+if __name__ == "__main__":
+    main()
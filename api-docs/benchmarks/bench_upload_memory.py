@@ -0,0 +1,121 @@
+"""Comprobar el pico de memoria de un trabajo de despacho contra el límite documentado
+
+El trabajo completo (subida volcada a disco -> process_dispatch_workflow ->
+result_store.put) debe quedarse por debajo de
+
+    JOB_MEMORY_BASE_MB + JOB_MEMORY_FACTOR * tamaño del PDF
+
+sobre la memoria residente del proceso antes de empezar. Los PDFs de cada
+grupo van al almacén de artefactos, no al resultado; el factor cubre los
+objetos del original que fitz conserva tras copiar cada grupo y la caché de
+rangos de PdfSession (PDF_SESSION_CACHE_BYTES). Medido en escaneos sintéticos
+de 150 a 600 páginas: unos 80 MB más 1,15 veces el tamaño del PDF.
+
+Cada medición corre en un subproceso nuevo para que ru_maxrss refleje sólo
+ese trabajo. Termina con código 1 si se supera el límite.
+
+Uso: python -m benchmarks.bench_upload_memory [páginas]
+"""
+import os
+import sys
+import json
+import resource
+import tempfile
+import subprocess
+
+JOB_MEMORY_BASE_MB = 100
+JOB_MEMORY_FACTOR = 1.5
+
+
+def current_rss_bytes() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def peak_rss_bytes() -> int:
+    # En Linux ru_maxrss se expresa en KiB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_job(pdf_path: str, from_path: bool) -> dict:
+    """Ejecutar un trabajo en este proceso y devolver el incremento de memoria"""
+    import dispatch_manifest
+    import document_processor
+    import extraction_cache
+    import text_classifier
+    from fake_azure import FakeDocumentAnalysisClient
+    from result_store import result_store
+
+    document_processor.document_analysis_client = FakeDocumentAnalysisClient()
+    document_processor.classification_cache.enabled = False
+    extraction_cache.extraction_cache.enabled = False
+    dispatch_manifest.manifest_cache.enabled = False
+    text_classifier.LOCAL_CLASSIFIER_ENABLED = False
+
+    baseline = current_rss_bytes()
+
+    if from_path:
+        pdf = pdf_path
+    else:
+        # Camino anterior: la subida completa en memoria
+        with open(pdf_path, "rb") as f:
+            pdf = f.read()
+
+    resultado = document_processor.process_dispatch_workflow(pdf, "BENCH")
+    result_store.put("dispatch", "bench", resultado)
+
+    return {
+        "documentos": len(resultado.get("documentos", [])),
+        "error": resultado.get("error"),
+        "peak_bytes": max(0, peak_rss_bytes() - baseline),
+    }
+
+
+def measure(pdf_path: str, from_path: bool) -> dict:
+    env = dict(os.environ, CACHE_DIR=tempfile.mkdtemp(prefix="bench-results-"))
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_upload_memory", "--child", pdf_path, str(int(from_path))],
+        capture_output=True, text=True, env=env, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    from benchmarks.synthetic import build_dispatch_pdf, mixed_page_types
+
+    total_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(build_dispatch_pdf(mixed_page_types(total_pages), scanned=True))
+
+    try:
+        size = os.path.getsize(pdf_path)
+        ceiling = JOB_MEMORY_BASE_MB * 1024 ** 2 + JOB_MEMORY_FACTOR * size
+        print(f"PDF: {total_pages} páginas, {size / 1024 ** 2:.1f} MB; límite {ceiling / 1024 ** 2:.1f} MB")
+
+        in_memory = measure(pdf_path, from_path=False)
+        spooled = measure(pdf_path, from_path=True)
+    finally:
+        os.remove(pdf_path)
+
+    for label, result in (("bytes en memoria", in_memory), ("archivo volcado", spooled)):
+        print(f"{label:>17}: pico +{result['peak_bytes'] / 1024 ** 2:.1f} MB, {result['documentos']} documentos")
+
+    if spooled["error"] or spooled["peak_bytes"] > ceiling:
+        print("❌ El trabajo supera el límite de memoria documentado")
+        sys.exit(1)
+    print("✅ Dentro del límite")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        # Silenciar el log del workflow: la última línea de stdout es el resultado
+        sys.stdout = open(os.devnull, "w")
+        result = run_job(sys.argv[2], sys.argv[3] == "1")
+        sys.stdout = sys.__stdout__
+        print(json.dumps(result))
+    else:
+        main()
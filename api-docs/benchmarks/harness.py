@@ -0,0 +1,218 @@
+# api-docs/benchmarks/harness.py
+"""Benchmark del pipeline completo sin Azure: rendimiento, latencias y memoria
+
+Uso: python -m benchmarks.harness [opciones]   (ver --help)
+
+Genera despachos sintéticos (facturas, BL y packing lists, con texto y
+escaneados), reemplaza el cliente de Azure por FakeDocumentAnalysisClient con
+la latencia, tasa de errores y límite de llamadas indicados, y ejecuta
+process_dispatch_workflow y, con --http, POST /process/automatic. Informa
+páginas/s, latencia p50/p95/p99 por despacho y el pico de memoria residente.
+
+--save guarda los resultados como línea base en JSON; --compare los compara
+con una línea base anterior y termina con código 1 si las páginas/s bajan o
+el p95 sube más de --tolerance, o si aumentan los documentos fallidos.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import azure_scheduler
+import dispatch_manifest
+import document_processor
+import extraction_cache
+import main
+import metrics
+import text_classifier
+from benchmarks.synthetic import build_dispatch_pdf, mixed_page_types
+from fake_azure import FakeDocumentAnalysisClient
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Percentil por rango más cercano"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    # En Linux ru_maxrss se expresa en KiB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def install_fake_client(args) -> FakeDocumentAnalysisClient:
+    client = FakeDocumentAnalysisClient(
+        call_latency=args.latency,
+        page_latency=args.page_latency,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        seed=args.seed
+    )
+    # Con el mismo planificador e instrumentación que el cliente real, para medir también su costo
+    document_processor.document_analysis_client = metrics.instrument_client(azure_scheduler.schedule_client(client))
+    main.document_analysis_client = document_processor.document_analysis_client
+    return client
+
+
+def run_workflow(pdf_bytes: bytes, numero_despacho: str) -> Dict:
+    resultado = document_processor.process_dispatch_workflow(pdf_bytes, numero_despacho)
+    failed = sum(1 for doc in resultado.get("documentos", []) if not doc.get("procesado"))
+    return {"ok": "error" not in resultado, "documentos_fallidos": failed}
+
+
+def http_runner():
+    try:
+        from fastapi.testclient import TestClient
+    except (ImportError, RuntimeError) as e:
+        # TestClient necesita httpx, que no es dependencia del servicio
+        sys.exit(f"--http necesita httpx instalado: {e}")
+    client = TestClient(main.app)
+
+    def run(pdf_bytes: bytes, numero_despacho: str) -> Dict:
+        response = client.post(
+            "/process/automatic",
+            files={"file": (f"{numero_despacho}.pdf", pdf_bytes, "application/pdf")},
+            data={"numero_despacho": numero_despacho}
+        )
+        if response.status_code != 200:
+            return {"ok": False, "documentos_fallidos": 0}
+        documentos = response.json()["resultado"].get("documentos", [])
+        return {"ok": True, "documentos_fallidos": sum(1 for doc in documentos if not doc.get("procesado"))}
+    return run
+
+
+def run_scenario(name: str, runner, pdf_bytes: bytes, pages: int, args, client: FakeDocumentAnalysisClient) -> Dict:
+    calls_before = dict(client.calls)
+    errors_before = dict(client.errors)
+    latencies = []
+    outcomes = []
+    lock = threading.Lock()
+
+    def one(i: int):
+        start = time.perf_counter()
+        outcome = runner(pdf_bytes, f"{name}-{i}")
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            outcomes.append(outcome)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(one, range(args.dispatches)))
+    wall = time.perf_counter() - start
+
+    return {
+        "despachos": args.dispatches,
+        "paginas": pages * args.dispatches,
+        "segundos": round(wall, 3),
+        "paginas_por_segundo": round(pages * args.dispatches / wall, 2),
+        "p50": round(percentile(latencies, 0.50), 3),
+        "p95": round(percentile(latencies, 0.95), 3),
+        "p99": round(percentile(latencies, 0.99), 3),
+        "despachos_con_error": sum(1 for o in outcomes if not o["ok"]),
+        "documentos_fallidos": sum(o["documentos_fallidos"] for o in outcomes),
+        "llamadas_azure": {op: client.calls[op] - calls_before[op] for op in client.calls},
+        "errores_azure": {kind: client.errors[kind] - errors_before[kind] for kind in client.errors},
+        "pico_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> bool:
+    """Imprimir la comparación con la línea base y devolver si hay regresión"""
+    regression = False
+    print(f"\nComparación con la línea base (tolerancia {tolerance:.0%})")
+    for name, current in results.items():
+        previous = baseline.get("resultados", {}).get(name)
+        if not previous:
+            print(f"  {name}: sin línea base")
+            continue
+        pps = current["paginas_por_segundo"] / previous["paginas_por_segundo"] - 1
+        p95 = current["p95"] / previous["p95"] - 1 if previous["p95"] else 0.0
+        # Las llamadas fallidas terminan antes: más errores no puede pasar por una mejora
+        failures = current["documentos_fallidos"] - previous["documentos_fallidos"]
+        worse = pps < -tolerance or p95 > tolerance or failures > 0
+        regression |= worse
+        print(f"  {'❌' if worse else '✅'} {name}: páginas/s {pps:+.1%}, p95 {p95:+.1%}, "
+              f"documentos fallidos {failures:+d}")
+    return regression
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark offline del pipeline de api-docs")
+    parser.add_argument("--pages", type=int, default=40, help="páginas por despacho")
+    parser.add_argument("--dispatches", type=int, default=5, help="despachos por escenario")
+    parser.add_argument("--concurrency", type=int, default=1, help="despachos simultáneos")
+    parser.add_argument("--latency", type=float, default=0.3, help="segundos por llamada a Azure")
+    parser.add_argument("--page-latency", type=float, default=0.02, help="segundos por página enviada")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fracción de llamadas que fallan con 500")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="llamadas/s antes de responder 429 (0 = sin límite)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scenarios", default="texto,escaneado", help="texto, escaneado (separados por coma)")
+    parser.add_argument("--http", action="store_true", help="también medir POST /process/automatic")
+    parser.add_argument("--with-cache", action="store_true", help="no desactivar las cachés de Azure")
+    parser.add_argument("--save", help="guardar los resultados como línea base JSON")
+    parser.add_argument("--compare", help="comparar con una línea base JSON")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    if not args.with_cache:
+        # Cada despacho repite el mismo PDF: sin cachés, todas las llamadas llegan al cliente simulado
+        document_processor.classification_cache.enabled = False
+        extraction_cache.extraction_cache.enabled = False
+        dispatch_manifest.manifest_cache.enabled = False
+        text_classifier.LOCAL_CLASSIFIER_ENABLED = False
+    client = install_fake_client(args)
+
+    runners = [("workflow", run_workflow)]
+    if args.http:
+        runners.append(("http", http_runner()))
+
+    page_types = mixed_page_types(args.pages)
+    results = {}
+    for scenario in args.scenarios.split(","):
+        pdf_bytes = build_dispatch_pdf(page_types, scanned=scenario == "escaneado")
+        for runner_name, runner in runners:
+            name = f"{runner_name}/{scenario}"
+            # Silenciar el log del workflow (y las trazas de los errores simulados) durante la medición
+            sys.stdout = sys.stderr = open(os.devnull, "w")
+            try:
+                results[name] = run_scenario(name, runner, pdf_bytes, args.pages, args, client)
+            finally:
+                sys.stdout.close()
+                sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+
+    print(f"{args.dispatches} despachos x {args.pages} páginas, concurrencia {args.concurrency}, "
+          f"{args.latency}s/llamada, errores {args.error_rate:.0%}, límite {args.rate_limit or '-'} llamadas/s")
+    # El pico de RSS es el del proceso hasta el final de cada escenario (acumulado)
+    print(f"{'escenario':<20} {'pág/s':>7} {'p50':>7} {'p95':>7} {'p99':>7} {'fallidos':>9} "
+          f"{'500':>5} {'429':>5} {'RSS MB':>7}")
+    for name, r in results.items():
+        print(f"{name:<20} {r['paginas_por_segundo']:>7.2f} {r['p50']:>7.2f} {r['p95']:>7.2f} {r['p99']:>7.2f} "
+              f"{r['documentos_fallidos']:>9} {r['errores_azure']['failed']:>5} {r['errores_azure']['throttled']:>5} "
+              f"{r['pico_rss_mb']:>7.1f}")
+
+    regression = False
+    if args.compare:
+        with open(args.compare) as f:
+            regression = compare(results, json.load(f), args.tolerance)
+
+    if args.save:
+        config = {key: value for key, value in vars(args).items() if key not in ("save", "compare")}
+        with open(args.save, "w") as f:
+            json.dump({"configuracion": config, "resultados": results}, f, indent=2, ensure_ascii=False)
+        print(f"\nLínea base guardada en {args.save}")
+
+    if regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
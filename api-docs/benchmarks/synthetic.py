@@ -0,0 +1,74 @@
+# api-docs/benchmarks/synthetic.py
+import fitz  # pymupdf
+from typing import List
+
+from fake_azure import MARKER_BAND, MARKER_WIDTHS
+
+# Texto de cabecera por tipo de página sintética
+PAGE_HEADERS = {
+    "factura": "COMMERCIAL INVOICE",
+    "transporte": "BILL OF LADING",
+    "packing_list": "PACKING LIST",
+}
+
+# Página sin contenido (reverso en blanco de un escaneo a doble cara)
+BLANK_PAGE = "en_blanco"
+
+# Tipo del clasificador simulado que corresponde a cada tipo interno
+CLASSIFIER_TYPES = {
+    "factura": "invoice",
+    "transporte": "bill_of_lading",
+    "packing_list": "packing_list",
+}
+
+
+def build_dispatch_pdf(page_types: List[str], scanned: bool = False, dpi: int = 150) -> bytes:
+    """Generar un PDF de despacho con una página por tipo indicado (escaneos a dpi)"""
+    doc = fitz.open()
+
+    for page_num, page_type in enumerate(page_types):
+        page = doc.new_page(width=595, height=842)  # A4
+        if page_type == BLANK_PAGE:
+            if scanned:
+                # Hoja en blanco escaneada: fondo gris claro con algo de ruido
+                pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 595 * dpi // 72, 842 * dpi // 72), False)
+                pix.set_rect(pix.irect, (235,))
+                for i in range(0, pix.width, 97):
+                    pix.set_pixel(i, (i * 31) % pix.height, (120,))
+                page.insert_image(page.rect, stream=pix.tobytes("jpeg", jpg_quality=75))
+            continue
+        header = PAGE_HEADERS.get(page_type, "DOCUMENTO")
+        marker = MARKER_WIDTHS.get(CLASSIFIER_TYPES.get(page_type, ""))
+        if marker:
+            # Barra que permite al cliente simulado reconocer el tipo también en escaneos
+            rect = page.rect
+            page.draw_rect(
+                fitz.Rect(36, rect.height * MARKER_BAND[0], 36 + rect.width * marker, rect.height * MARKER_BAND[1]),
+                color=(0, 0, 0), fill=(0, 0, 0)
+            )
+        page.insert_text((72, 80), header, fontsize=20)
+        lines = [
+            f"Linea {line + 1} pagina {page_num + 1} - item {line * 7 % 13} - USD {line * 10.5:.2f}"
+            for line in range(40)
+        ]
+        page.insert_text((72, 120), "\n".join(lines), fontsize=9, lineheight=1.6)
+
+        if scanned:
+            # Simular escaneo: rasterizar la página y reemplazar su contenido por la imagen
+            pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+            image = pix.tobytes("jpeg", jpg_quality=75)
+            rect = page.rect
+            doc.delete_page(page_num)
+            page = doc.new_page(pno=page_num, width=rect.width, height=rect.height)
+            page.insert_image(rect, stream=image)
+
+    pdf_bytes = doc.write(garbage=3, deflate=True)
+    doc.close()
+    return pdf_bytes
+
+
+def mixed_page_types(total_pages: int) -> List[str]:
+    """Secuencia de tipos con grupos de 1 a 4 páginas consecutivas"""
+    cycle = ["factura", "factura", "transporte", "packing_list", "packing_list",
+             "factura", "factura", "factura", "transporte", "transporte"]
+    return [cycle[i % len(cycle)] for i in range(total_pages)]
@@ -0,0 +1,197 @@
+# api-docs/disk_cache.py
+import os
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from typing import Optional, Dict
+
+# Directorio compartido por los workers del servicio (montar como volumen en docker)
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'api-docs-cache'))
+
+
+def content_hash(data: bytes) -> str:
+    """Hash de contenido usado como clave de caché"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class DiskCache:
+    """Caché persistente en SQLite con TTL, límite de tamaño y contadores de aciertos"""
+
+    def __init__(self, name: str, ttl_seconds: int, max_entries: int, max_bytes: int = 0):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = max_entries > 0 and ttl_seconds > 0
+        self.path = os.path.join(CACHE_DIR, f"{name}.sqlite3")
+
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "expired": 0, "invalidated": 0}
+        self._model_counters: Dict[str, Dict[str, int]] = {}
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    model_id TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_model ON entries(model_id)")
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def _count(self, counter: str, amount: int = 1, model_id: Optional[str] = None):
+        with self._lock:
+            self._counters[counter] += amount
+            if model_id is not None:
+                by_model = self._model_counters.setdefault(model_id, {"hits": 0, "misses": 0})
+                by_model[counter] += amount
+
+    @staticmethod
+    def make_key(model_id: str, digest: str) -> str:
+        return f"{model_id}:{digest}"
+
+    def get(self, model_id: str, digest: str) -> Optional[str]:
+        """Obtener valor vigente o None"""
+        if not self.enabled:
+            return None
+
+        key = self.make_key(model_id, digest)
+        now = time.time()
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row and now - row[1] > self.ttl_seconds:
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    conn.commit()
+                    self._count("expired")
+                    row = None
+                if row:
+                    conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+                    conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"   ⚠️ Caché {self.name} no disponible: {e}")
+            row = None
+
+        self._count("hits" if row else "misses", model_id=model_id)
+        return row[0] if row else None
+
+    def set(self, model_id: str, digest: str, value: str):
+        """Guardar valor y aplicar expulsión por TTL y tamaño"""
+        if not self.enabled:
+            return
+
+        key = self.make_key(model_id, digest)
+        now = time.time()
+        try:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, model_id, value, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model_id, value, len(value), now, now)
+                )
+                self._evict(conn, now)
+                conn.commit()
+            finally:
+                conn.close()
+            self._count("sets")
+        except sqlite3.Error as e:
+            print(f"   ⚠️ No se pudo guardar en caché {self.name}: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Eliminar expiradas y, si se excede el límite, las menos usadas recientemente"""
+        expired = conn.execute(
+            "DELETE FROM entries WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        if expired:
+            self._count("expired", expired)
+
+        count, total_size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        evicted = 0
+
+        if count > self.max_entries:
+            evicted += conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,)
+            ).rowcount
+
+        if self.max_bytes and total_size > self.max_bytes:
+            # Recorrer de la menos a la más usada hasta liberar el exceso
+            rows = conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall()
+            total_size = sum(size for _, size in rows)
+            excess = total_size - self.max_bytes
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                excess -= size
+                evicted += 1
+
+        if evicted:
+            self._count("evictions", evicted)
+
+    def invalidate(self, model_id: str) -> int:
+        """Eliminar todas las entradas de un modelo (p. ej. tras reentrenarlo)"""
+        if not self.enabled:
+            return 0
+
+        conn = self._connect()
+        try:
+            deleted = conn.execute("DELETE FROM entries WHERE model_id = ?", (model_id,)).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+
+        self._count("invalidated", deleted)
+        return deleted
+
+    def stats(self) -> Dict:
+        """Contadores del proceso y tamaño actual de la caché"""
+        with self._lock:
+            counters = dict(self._counters)
+            by_model = {model_id: dict(c) for model_id, c in self._model_counters.items()}
+
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = round(counters["hits"] / lookups, 4) if lookups else 0.0
+        for model_counters in by_model.values():
+            model_lookups = model_counters["hits"] + model_counters["misses"]
+            model_counters["hit_rate"] = round(model_counters["hits"] / model_lookups, 4) if model_lookups else 0.0
+        counters["by_model"] = by_model
+        counters["enabled"] = self.enabled
+        counters["entries"] = 0
+        counters["bytes"] = 0
+
+        if self.enabled:
+            try:
+                conn = self._connect()
+                try:
+                    counters["entries"], counters["bytes"] = conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+                    ).fetchone()
+                finally:
+                    conn.close()
+            except sqlite3.Error:
+                pass
+
+        return counters
@@ -0,0 +1,155 @@
+# api-docs/dispatch_manifest.py
+"""Manifiesto de páginas por despacho para reprocesar sólo lo que cambió
+
+Al terminar un workflow se guarda, por despacho y documento (el principal,
+no los que se agregan sueltos al mismo despacho), el hash de cada
+página agrupada con su tipo y los documentos extraídos con los hashes de
+sus páginas. Si el despacho vuelve a subirse (páginas agregadas, una
+factura reemplazada), las páginas con hash conocido reutilizan su tipo sin
+clasificarse y los grupos con las mismas páginas y tipo reutilizan su
+extracción; sólo lo agregado o cambiado vuelve a Azure.
+
+El manifiesto guarda los modelos con que se clasificó y extrajo: si
+DOCTYPE_MODEL_ID o el modelo de extracción de un tipo cambian, lo anterior
+se ignora. Un modelo reentrenado con el mismo id se invalida con
+DELETE /cache/{caché}/{modelo}, que también borra los manifiestos.
+"""
+import os
+import json
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from disk_cache import DiskCache, content_hash
+from pdf_session import PdfSession
+
+DISPATCH_MANIFEST_ENABLED = os.getenv('DISPATCH_MANIFEST_ENABLED', 'true').lower() == 'true'
+DISPATCH_MANIFEST_TTL = int(os.getenv('DISPATCH_MANIFEST_TTL', str(90 * 24 * 3600)))
+DISPATCH_MANIFEST_MAX_ENTRIES = int(os.getenv('DISPATCH_MANIFEST_MAX_ENTRIES', '50000'))
+
+# Clave de modelo de la caché: los manifiestos se indexan por despacho y documento
+MANIFEST_KIND = "dispatch"
+
+# Documento del despacho que api-despachos procesa con manifiesto
+PRINCIPAL = "principal"
+
+manifest_cache = DiskCache(
+    "manifests",
+    ttl_seconds=DISPATCH_MANIFEST_TTL,
+    max_entries=DISPATCH_MANIFEST_MAX_ENTRIES
+)
+
+
+class DispatchManifest:
+    """Manifiesto anterior de un despacho y huellas de las páginas del PDF actual"""
+
+    def __init__(self, numero_despacho: str, documento: str, session: PdfSession, classifier_model_id: str,
+                 extraction_model: Callable[[str], Optional[str]], previous: Optional[Dict] = None):
+        self.numero_despacho = numero_despacho
+        self.documento = documento
+        self.key = f"{numero_despacho}:{documento}"
+        self.session = session
+        self.classifier_model_id = classifier_model_id
+        self.extraction_model = extraction_model
+        self.previous = previous
+        previous = previous or {}
+        # Tipos y extracciones de otros modelos no se reutilizan
+        self._types: Dict[str, str] = (
+            previous.get("tipos", {}) if previous.get("modelo_clasificacion") == classifier_model_id else {}
+        )
+        self._documents: Dict[Tuple[str, Tuple[str, ...]], Dict] = {
+            (doc["tipo"], tuple(doc["paginas"])): doc for doc in previous.get("documentos", [])
+            if doc.get("modelo") == extraction_model(doc["tipo"])
+        }
+        self._hashes: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "paginas_reutilizadas": 0,
+            "paginas_clasificadas": 0,
+            "documentos_reutilizados": 0,
+            "documentos_extraidos": 0,
+        }
+
+    @classmethod
+    def load(cls, numero_despacho: str, documento: str, session: PdfSession, classifier_model_id: str,
+             extraction_model: Callable[[str], Optional[str]]) -> "DispatchManifest":
+        cached = manifest_cache.get(MANIFEST_KIND, f"{numero_despacho}:{documento}")
+        return cls(numero_despacho, documento, session, classifier_model_id, extraction_model,
+                   json.loads(cached) if cached is not None else None)
+
+    def _count(self, counter: str):
+        with self._lock:
+            self.stats[counter] += 1
+
+    def page_hash(self, page_num: int) -> str:
+        """Hash del PDF de una página (el mismo que usa la caché de clasificación)"""
+        with self._lock:
+            cached = self._hashes.get(page_num)
+        if cached is not None:
+            return cached
+        digest = content_hash(self.session.page_bytes(page_num))
+        with self._lock:
+            self._hashes[page_num] = digest
+        return digest
+
+    def known_type(self, page_num: int) -> Optional[str]:
+        """Tipo de la página en el procesamiento anterior, si no cambió"""
+        if not self._types:
+            return None
+        doc_type = self._types.get(self.page_hash(page_num))
+        if doc_type is not None:
+            self._count("paginas_reutilizadas")
+        return doc_type
+
+    def classified(self):
+        self._count("paginas_clasificadas")
+
+    def carried_document(self, group: Dict) -> Optional[Dict]:
+        """Documento anterior con las mismas páginas y tipo que el grupo, si lo hay"""
+        if not self._documents:
+            return None
+        key = (group['doc_type'], tuple(self.page_hash(page_num) for page_num in group['pages']))
+        document = self._documents.get(key)
+        if document is not None:
+            self._count("documentos_reutilizados")
+        return document
+
+    def extracted(self):
+        self._count("documentos_extraidos")
+
+    def save(self, groups: List[Dict], documentos: List[Dict]):
+        """Guardar las páginas agrupadas y los documentos extraídos con éxito"""
+        tipos = {}
+        documents = []
+        for group, documento in zip(groups, documentos):
+            hashes = [self.page_hash(page_num) for page_num in group['pages']]
+            for digest in hashes:
+                tipos[digest] = group['doc_type']
+            # Los documentos fallidos se vuelven a extraer en la próxima subida
+            if documento.get("procesado"):
+                documents.append({
+                    "tipo": group['doc_type'],
+                    "paginas": hashes,
+                    "modelo": self.extraction_model(group['doc_type']),
+                    "datos_extraidos": documento.get("datos_extraidos"),
+                })
+        manifest = {
+            "numero_despacho": self.numero_despacho,
+            "documento": self.documento,
+            "timestamp": datetime.now().isoformat(),
+            "modelo_clasificacion": self.classifier_model_id,
+            "tipos": tipos,
+            "documentos": documents,
+        }
+        manifest_cache.set(MANIFEST_KIND, self.key, json.dumps(manifest, default=str))
+
+    def report(self) -> Dict:
+        with self._lock:
+            report = dict(self.stats)
+        report["manifiesto_anterior"] = self.previous is not None
+        return report
+
+
+def invalidate_manifests() -> int:
+    """Borrar todos los manifiestos (un modelo reentrenado conserva su id)"""
+    return manifest_cache.invalidate(MANIFEST_KIND)
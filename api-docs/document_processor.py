@@ -1,46 +1,189 @@
 # api-docs/document_processor.py
 import fitz  # pymupdf
 import os
-import base64
-from typing import List, Dict, Tuple
-from azure.ai.formrecognizer import DocumentAnalysisClient
-from azure.core.credentials import AzureKeyCredential
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Tuple, Optional, Union, Callable, Sequence
 import json
 from datetime import datetime
+from pdf_session import PdfSession
+from disk_cache import DiskCache, content_hash
+from extraction_cache import analyze_document_cached
+from text_classifier import local_classification
+from artifact_store import artifact_store
+from field_schema import INVOICE_SCHEMA, TRANSPORT_SCHEMA, INVOICE_KEY_CATEGORIES, TRANSPORT_KEY_CATEGORIES
+import payload_slimming
+import page_fingerprint
+from pdf_workers import pdf_pool
+import metrics
+import azure_client
+from page_fingerprint import PageScreener, DUPLICATE
+import dispatch_manifest
+from dispatch_manifest import DispatchManifest
 
 # Configuración modelos custom
-ENDPOINT = os.getenv('AZURE_FORM_RECOGNIZER_ENDPOINT', '')
-API_KEY = os.getenv('AZURE_FORM_RECOGNIZER_KEY', '')
 DOCTYPE_MODEL_ID = os.getenv('DOCTYPE_MODEL_ID', 'doctype_01')
 INVOICE_MODEL_ID = os.getenv('INVOICE_MODEL_ID', 'invoice_01')
 TRANSPORT_MODEL_ID = os.getenv('TRANSPORT_MODEL_ID', 'transport_01')
 
-document_analysis_client = DocumentAnalysisClient(
-    endpoint=ENDPOINT,
-    credential=AzureKeyCredential(API_KEY)
-) if ENDPOINT and API_KEY else None
+# Concurrencia de clasificación: páginas en vuelo por despacho y por proceso
+CLASSIFY_MAX_WORKERS = int(os.getenv('CLASSIFY_MAX_WORKERS', '8'))
+CLASSIFY_MAX_CONCURRENCY = int(os.getenv('CLASSIFY_MAX_CONCURRENCY', '16'))
+
+# Concurrencia de extracción: grupos analizados a la vez por despacho y por proceso
+EXTRACT_MAX_WORKERS = int(os.getenv('EXTRACT_MAX_WORKERS', '4'))
+EXTRACT_MAX_CONCURRENCY = int(os.getenv('EXTRACT_MAX_CONCURRENCY', '8'))
+
+# Modo de clasificación: "page" (una llamada por página) o "document" (PDF completo
+# en una llamada, usando la separación de documentos del clasificador)
+CLASSIFY_MODE = os.getenv('CLASSIFY_MODE', 'page').lower()
+
+# Límite global compartido por todos los despachos de este proceso
+_classify_slots = threading.BoundedSemaphore(CLASSIFY_MAX_CONCURRENCY)
+_extract_slots = threading.BoundedSemaphore(EXTRACT_MAX_CONCURRENCY)
+
+# Caché de clasificación por hash de página + modelo (0 desactiva)
+CLASSIFICATION_CACHE_TTL = int(os.getenv('CLASSIFICATION_CACHE_TTL', str(30 * 24 * 3600)))
+CLASSIFICATION_CACHE_MAX_ENTRIES = int(os.getenv('CLASSIFICATION_CACHE_MAX_ENTRIES', '200000'))
+
+classification_cache = DiskCache(
+    "classification",
+    ttl_seconds=CLASSIFICATION_CACHE_TTL,
+    max_entries=CLASSIFICATION_CACHE_MAX_ENTRIES
+)
+
+# El mismo cliente que main.py, con su pool de conexiones (azure_client.py)
+document_analysis_client = azure_client.document_analysis_client
+
+def map_doc_type(doc_type: str) -> str:
+    """Mapear el tipo devuelto por el clasificador a los tipos internos"""
+    doc_type_lower = doc_type.lower()
+    
+    if 'invoice' in doc_type_lower or 'factura' in doc_type_lower:
+        return "factura"
+    elif any(t in doc_type_lower for t in ['transport', 'transporte', 'awb', 'bl', 'bill_of_lading', 'air_waybill']):
+        return "transporte"
+    elif 'packing' in doc_type_lower or 'lista_empaque' in doc_type_lower:
+        return "packing_list"
+    elif 'certificate' in doc_type_lower or 'certificado' in doc_type_lower:
+        return "certificado"
+    else:
+        # Si el modelo devuelve un tipo específico, usarlo
+        print(f"   ℹ️ Tipo no mapeado, usando: {doc_type}")
+        return doc_type
+
+def extraction_model_id(doc_type: str) -> Optional[str]:
+    """Modelo de extracción para un tipo de documento, o None si no tiene"""
+    model_map = {
+        "factura": INVOICE_MODEL_ID,
+        "invoice": INVOICE_MODEL_ID,
+        "transporte": TRANSPORT_MODEL_ID,
+        "transport": TRANSPORT_MODEL_ID,
+        "awb": TRANSPORT_MODEL_ID,
+        "bl": TRANSPORT_MODEL_ID,
+        "bill_of_lading": TRANSPORT_MODEL_ID,
+        "air_waybill": TRANSPORT_MODEL_ID
+    }
+    return model_map.get(doc_type.lower())
+
+def _page_group(start_page: int, end_page: int, doc_type: str) -> Dict:
+    """Grupo con la misma estructura que group_consecutive_pages"""
+    return {
+        'start_page': start_page,
+        'end_page': end_page,
+        'doc_type': doc_type,
+        'pages': list(range(start_page, end_page + 1))
+    }
+
+class GroupStream:
+    """Agrupación incremental equivalente a group_consecutive_pages
+    
+    Recibe las clasificaciones en cualquier orden y avanza por el prefijo
+    consecutivo de páginas resueltas; un grupo se cierra, y se entrega a
+    on_group(índice, grupo), en cuanto la siguiente página con contenido
+    es de otro tipo. Las páginas omitidas no cortan el grupo.
+    """
+    
+    def __init__(self, total_pages: int, on_group: Callable[[int, Dict], None]):
+        self.total_pages = total_pages
+        self.on_group = on_group
+        self.groups: List[Dict] = []
+        self._resolved: Dict[int, Optional[str]] = {}
+        self._next_page = 0
+        self._current: Optional[Dict] = None
+        self._lock = threading.Lock()
+    
+    def add(self, page_num: int, doc_type: str):
+        self._resolve(page_num, doc_type)
+    
+    def skip(self, page_num: int):
+        self._resolve(page_num, None)
+    
+    def _resolve(self, page_num: int, doc_type: Optional[str]):
+        # on_group se llama con el lock tomado para entregar los grupos en orden
+        with self._lock:
+            self._resolved[page_num] = doc_type
+            while self._next_page in self._resolved:
+                page = self._next_page
+                page_type = self._resolved.pop(page)
+                self._next_page += 1
+                if page_type is None:
+                    continue
+                if self._current is not None and self._current['doc_type'] == page_type:
+                    self._current['end_page'] = page
+                    self._current['pages'].append(page)
+                else:
+                    self._close()
+                    self._current = {'start_page': page, 'end_page': page, 'doc_type': page_type, 'pages': [page]}
+            if self._next_page == self.total_pages:
+                self._close()
+    
+    def _close(self):
+        if self._current is not None:
+            self.groups.append(self._current)
+            self.on_group(len(self.groups) - 1, self._current)
+            self._current = None
 
 class DocumentProcessor:
     def __init__(self):
         self.client = document_analysis_client
     
-    def separate_pages(self, pdf_bytes: bytes) -> List[bytes]:
+    def separate_pages(self, pdf: Union[bytes, PdfSession]) -> List[bytes]:
         """Separar PDF en páginas individuales"""
-        doc = fitz.open("pdf", pdf_bytes)
-        pages = []
-        
-        for page_num in range(len(doc)):
-            new_doc = fitz.open()
-            new_doc.insert_pdf(doc, from_page=page_num, to_page=page_num)
-            page_bytes = new_doc.write()
-            pages.append(page_bytes)
-            new_doc.close()
-        
-        doc.close()
-        return pages
+        session = pdf if isinstance(pdf, PdfSession) else PdfSession(pdf)
+        try:
+            return [session.page_bytes(page_num) for page_num in range(session.page_count)]
+        finally:
+            if session is not pdf:
+                session.close()
+    
+    def prepare_payload(self, pdf: Union[bytes, str], purpose: str) -> Union[bytes, str]:
+        """Reducir las páginas escaneadas antes de subirlas (purpose: classification o extraction)"""
+        if not payload_slimming.PAYLOAD_SLIMMING_ENABLED:
+            return pdf
+        try:
+            if pdf_pool.enabled:
+                return pdf_pool.slim(pdf, purpose)
+            return payload_slimming.slim_pdf(pdf, purpose)
+        except Exception as e:
+            print(f"   ⚠️ No se pudo reducir el documento, se envía el original: {e}")
+            return pdf
     
     def classify_page(self, page_bytes: bytes) -> str:
         """Clasificar una página usando doctype_01"""
+        # Páginas ya clasificadas (reimportaciones SGD, resubidas) no vuelven a Azure
+        page_hash = content_hash(page_bytes)
+        cached = classification_cache.get(DOCTYPE_MODEL_ID, page_hash)
+        if cached is not None:
+            print(f"   💾 Clasificación en caché: {cached}")
+            return cached
+        
+        # Páginas con capa de texto evidente se resuelven sin llamar a Azure
+        local_type = local_classification(page_bytes)
+        if local_type is not None:
+            return local_type
+        
         if not self.client:
             print("   ⚠️ Cliente Azure no configurado, usando clasificación por defecto")
             return "general"
@@ -51,39 +194,29 @@ class DocumentProcessor:
             # Usar begin_classify_document para modelos de clasificación
             poller = self.client.begin_classify_document(
                 DOCTYPE_MODEL_ID,
-                document=page_bytes
+                document=self.prepare_payload(page_bytes, "classification")
             )
             result = poller.result()
             
+            tipo = None
+            
             # Extraer tipo de documento desde el resultado de clasificación
             if hasattr(result, 'documents') and result.documents:
                 for doc in result.documents:
                     # Para modelos de clasificación, el tipo está en doc_type
                     if hasattr(doc, 'doc_type'):
-                        doc_type = doc.doc_type
                         confidence = doc.confidence if hasattr(doc, 'confidence') else 0
-                        print(f"   ✅ Clasificación: {doc_type} (confianza: {confidence:.2%})")
-                        
-                        # Normalizar el tipo de documento
-                        doc_type_lower = doc_type.lower()
-                        
-                        # Mapeo de tipos detectados a tipos internos
-                        if 'invoice' in doc_type_lower or 'factura' in doc_type_lower:
-                            return "factura"
-                        elif any(t in doc_type_lower for t in ['transport', 'transporte', 'awb', 'bl', 'bill_of_lading', 'air_waybill']):
-                            return "transporte"
-                        elif 'packing' in doc_type_lower or 'lista_empaque' in doc_type_lower:
-                            return "packing_list"
-                        elif 'certificate' in doc_type_lower or 'certificado' in doc_type_lower:
-                            return "certificado"
-                        else:
-                            # Si el modelo devuelve un tipo específico, usarlo
-                            print(f"   ℹ️ Tipo no mapeado, usando: {doc_type}")
-                            return doc_type
+                        print(f"   ✅ Clasificación: {doc.doc_type} (confianza: {confidence:.2%})")
+                        tipo = map_doc_type(doc.doc_type)
+                        break
             
-            # Si no se detectó tipo específico
-            print("   ⚠️ No se pudo clasificar, usando tipo general")
-            return "general"
+            if tipo is None:
+                # Si no se detectó tipo específico
+                print("   ⚠️ No se pudo clasificar, usando tipo general")
+                tipo = "general"
+            
+            classification_cache.set(DOCTYPE_MODEL_ID, page_hash, tipo)
+            return tipo
             
         except Exception as e:
             print(f"   ❌ Error clasificando página: {e}")
@@ -91,11 +224,140 @@ class DocumentProcessor:
             traceback.print_exc()
             return "general"
     
-    def group_consecutive_pages(self, page_classifications: List[Tuple[int, str]]) -> List[Dict]:
-        """Agrupar páginas consecutivas del mismo tipo"""
+    def classify_pages(
+        self,
+        pages: Sequence[bytes],
+        max_workers: Optional[int] = None,
+        on_classified: Optional[Callable[[int, str], None]] = None,
+        screener: Optional[PageScreener] = None,
+        on_skipped: Optional[Callable[[int], None]] = None,
+        manifest: Optional[DispatchManifest] = None
+    ) -> List[Tuple[int, str]]:
+        """Clasificar varias páginas en paralelo, devolviendo (página, tipo) en orden
+        
+        on_classified se llama al resolverse cada página, en cualquier orden.
+        Con screener, las páginas en blanco no se devuelven (se avisan con
+        on_skipped) y las duplicadas reutilizan el tipo de su página de
+        referencia sin llamar a Azure. Con manifest, las páginas que no
+        cambiaron desde el procesamiento anterior del despacho reutilizan su tipo.
+        """
+        workers = max(1, min(max_workers or CLASSIFY_MAX_WORKERS, len(pages)))
+        
+        def classify(page_num: int) -> str:
+            doc_type = manifest.known_type(page_num) if manifest is not None else None
+            if doc_type is None:
+                with metrics.queued(_classify_slots, metrics.CLASSIFY):
+                    doc_type = self.classify_page(pages[page_num])
+                if manifest is not None:
+                    manifest.classified()
+            if on_classified is not None:
+                on_classified(page_num, doc_type)
+            return doc_type
+        
+        if screener is None:
+            # executor.map conserva el orden de entrada aunque terminen desordenadas
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="classify") as executor:
+                doc_types = list(executor.map(classify, range(len(pages))))
+            return list(enumerate(doc_types))
+        
+        # La huella de cada página se calcula en este hilo mientras las ya
+        # enviadas esperan a Azure
+        futures = {}
+        duplicates = {}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="classify") as executor:
+            for page_num in range(len(pages)):
+                decision = screener.screen(page_num)
+                if decision is None:
+                    futures[page_num] = executor.submit(classify, page_num)
+                elif decision[0] == DUPLICATE:
+                    duplicates[page_num] = decision[1]
+                    if on_classified is not None:
+                        # Se resuelve en cuanto termina su página de referencia
+                        futures[decision[1]].add_done_callback(
+                            lambda future, page_num=page_num: on_classified(page_num, future.result())
+                        )
+                elif on_skipped is not None:
+                    on_skipped(page_num)
+            
+            page_classifications = []
+            for page_num in range(len(pages)):
+                if page_num in futures:
+                    page_classifications.append((page_num, futures[page_num].result()))
+                elif page_num in duplicates:
+                    page_classifications.append((page_num, futures[duplicates[page_num]].result()))
+        
+        return page_classifications
+    
+    def classify_document(self, pdf: Union[bytes, str], page_count: int) -> Optional[List[Dict]]:
+        """Clasificar el PDF completo (bytes o ruta) en una sola llamada y devolver los grupos separados por Azure"""
+        if not self.client:
+            print("   ⚠️ Cliente Azure no configurado, no se puede clasificar el documento completo")
+            return None
+        
+        try:
+            print(f"   🔍 Clasificando documento completo con modelo: {DOCTYPE_MODEL_ID}")
+            pdf = self.prepare_payload(pdf, "classification")
+            # Con una ruta, el SDK envía el archivo por streaming sin cargarlo completo
+            document = open(pdf, "rb") if isinstance(pdf, str) else pdf
+            try:
+                poller = self.client.begin_classify_document(
+                    DOCTYPE_MODEL_ID,
+                    document=document
+                )
+                result = poller.result()
+            finally:
+                if document is not pdf:
+                    document.close()
+        except Exception as e:
+            print(f"   ❌ Error clasificando documento completo: {e}")
+            return None
+        
+        # Cada documento devuelto cubre un rango de páginas (1-based en Azure)
+        ranges = []
+        for doc in result.documents or []:
+            page_numbers = sorted({
+                region.page_number - 1
+                for region in (doc.bounding_regions or [])
+                if 1 <= region.page_number <= page_count
+            })
+            if not page_numbers or not doc.doc_type:
+                continue
+            confidence = doc.confidence or 0
+            print(f"   ✅ Páginas {page_numbers[0]+1}-{page_numbers[-1]+1}: {doc.doc_type} (confianza: {confidence:.2%})")
+            ranges.append((page_numbers[0], page_numbers[-1], map_doc_type(doc.doc_type)))
+        
+        groups = []
+        next_page = 0
+        for start, end, doc_type in sorted(ranges):
+            start = max(start, next_page)
+            if start > end:
+                continue
+            if start > next_page:
+                # Páginas sin documento asignado
+                groups.append(_page_group(next_page, start - 1, "general"))
+            groups.append(_page_group(start, end, doc_type))
+            next_page = end + 1
+        
+        if next_page < page_count:
+            groups.append(_page_group(next_page, page_count - 1, "general"))
+        
+        return groups
+    
+    def group_consecutive_pages(
+        self,
+        page_classifications: List[Tuple[int, str]],
+        skipped_pages: Sequence[int] = ()
+    ) -> List[Dict]:
+        """Agrupar páginas consecutivas del mismo tipo
+        
+        Las páginas de skipped_pages (en blanco) no cortan un grupo: si entre
+        dos páginas del mismo tipo sólo hay omitidas, siguen en el mismo grupo.
+        """
         if not page_classifications:
             return []
         
+        skipped = set(skipped_pages)
+        
         groups = []
         current_group = {
             'start_page': page_classifications[0][0],
@@ -107,7 +369,8 @@ class DocumentProcessor:
         for i in range(1, len(page_classifications)):
             page_num, doc_type = page_classifications[i]
             
-            if doc_type == current_group['doc_type'] and page_num == current_group['end_page'] + 1:
+            contiguous = all(p in skipped for p in range(current_group['end_page'] + 1, page_num))
+            if doc_type == current_group['doc_type'] and contiguous:
                 current_group['end_page'] = page_num
                 current_group['pages'].append(page_num)
             else:
@@ -122,39 +385,45 @@ class DocumentProcessor:
         groups.append(current_group)
         return groups
     
-    def create_pdf_from_pages(self, original_pdf: bytes, page_numbers: List[int]) -> bytes:
+    def create_pdf_from_pages(self, original_pdf: Union[bytes, PdfSession], page_numbers: List[int]) -> bytes:
         """Crear PDF desde páginas específicas"""
-        doc = fitz.open("pdf", original_pdf)
-        new_doc = fitz.open()
-        
-        for page_num in page_numbers:
-            new_doc.insert_pdf(doc, from_page=page_num, to_page=page_num)
-        
-        pdf_bytes = new_doc.write()
-        new_doc.close()
-        doc.close()
+        session = original_pdf if isinstance(original_pdf, PdfSession) else PdfSession(original_pdf)
+        try:
+            return session.range_bytes(page_numbers)
+        finally:
+            if session is not original_pdf:
+                session.close()
+    
+    def assemble_document(self, session: PdfSession, page_numbers: List[int], purpose: Optional[str] = None):
+        """PDF de un grupo y, si hay purpose, el payload preparado para Azure
         
-        return pdf_bytes
+        Con el pool de procesos ambos pasos se hacen en un proceso aparte que
+        lee el original por ruta; si el pool falla el PDF se arma aquí y se
+        envía sin reducir.
+        """
+        if pdf_pool.enabled:
+            try:
+                slim = purpose if payload_slimming.PAYLOAD_SLIMMING_ENABLED else None
+                doc_pdf, payload = pdf_pool.assemble(session.source_path(pdf_pool.work_dir), page_numbers, slim)
+                return doc_pdf, (payload or doc_pdf) if purpose else None
+            except Exception as e:
+                print(f"   ⚠️ Pool de PDF no disponible, se arma el documento en este proceso: {e}")
+                doc_pdf = self.create_pdf_from_pages(session, page_numbers)
+                return doc_pdf, doc_pdf if purpose else None
+        doc_pdf = self.create_pdf_from_pages(session, page_numbers)
+        return doc_pdf, self.prepare_payload(doc_pdf, purpose) if purpose else None
     
-    def process_with_model(self, doc_bytes: bytes, doc_type: str) -> Dict:
-        """Procesar documento con modelo específico"""
+    def process_with_model(self, doc_bytes: bytes, doc_type: str, payload: Optional[Union[bytes, str]] = None) -> Dict:
+        """Procesar documento con modelo específico
+        
+        payload es el documento ya preparado con prepare_payload(doc_bytes,
+        "extraction"); si falta se prepara aquí.
+        """
         if not self.client:
             return {"error": "Azure client no configurado"}
         
         try:
-            # Mapear tipo de documento a modelo
-            model_map = {
-                "factura": INVOICE_MODEL_ID,
-                "invoice": INVOICE_MODEL_ID,
-                "transporte": TRANSPORT_MODEL_ID,
-                "transport": TRANSPORT_MODEL_ID,
-                "awb": TRANSPORT_MODEL_ID,
-                "bl": TRANSPORT_MODEL_ID,
-                "bill_of_lading": TRANSPORT_MODEL_ID,
-                "air_waybill": TRANSPORT_MODEL_ID
-            }
-            
-            model_id = model_map.get(doc_type.lower())
+            model_id = extraction_model_id(doc_type)
             
             if not model_id:
                 print(f"   ℹ️ No hay modelo específico para tipo: {doc_type}")
@@ -162,9 +431,10 @@ class DocumentProcessor:
             
             print(f"   📄 Procesando con modelo: {model_id}")
             
-            # Usar begin_analyze_document para modelos de extracción
-            poller = self.client.begin_analyze_document(model_id, document=doc_bytes)
-            result = poller.result()
+            # Usar begin_analyze_document para modelos de extracción (con caché por contenido)
+            if payload is None:
+                payload = self.prepare_payload(doc_bytes, "extraction")
+            result = analyze_document_cached(self.client, model_id, payload)
             
             # Extraer datos según el modelo usado
             if INVOICE_MODEL_ID in model_id:
@@ -184,100 +454,45 @@ class DocumentProcessor:
     
     def _extract_invoice_data(self, result) -> Dict:
         """Extraer datos de factura"""
-        data = {
-            "vendor_information": {},
-            "customer_information": {},
-            "invoice_details": {},
-            "totals": {},
-            "line_items": []
-        }
-        
-        # Primero intentar con campos del modelo custom
-        if hasattr(result, 'documents') and result.documents:
-            for doc in result.documents:
-                if hasattr(doc, 'fields'):
-                    for field_name, field_value in doc.fields.items():
-                        if hasattr(field_value, 'value') and field_value.value:
-                            value = str(field_value.value)
-                            field_lower = field_name.lower()
-                            
-                            if any(t in field_lower for t in ['vendor', 'supplier', 'seller']):
-                                data["vendor_information"][field_name] = value
-                            elif any(t in field_lower for t in ['customer', 'buyer', 'client']):
-                                data["customer_information"][field_name] = value
-                            elif any(t in field_lower for t in ['total', 'amount', 'subtotal', 'tax']):
-                                data["totals"][field_name] = value
-                            elif any(t in field_lower for t in ['item', 'line', 'product']):
-                                data["line_items"].append({field_name: value})
-                            else:
-                                data["invoice_details"][field_name] = value
-        
-        # Si no hay campos, intentar con key-value pairs
-        if not any([data["vendor_information"], data["customer_information"], data["totals"]]):
-            if hasattr(result, 'key_value_pairs') and result.key_value_pairs:
-                for kv_pair in result.key_value_pairs:
-                    if kv_pair.key and kv_pair.value:
-                        key = kv_pair.key.content if hasattr(kv_pair.key, 'content') else str(kv_pair.key)
-                        value = kv_pair.value.content if hasattr(kv_pair.value, 'content') else str(kv_pair.value)
-                        
-                        key_lower = key.lower()
-                        if any(t in key_lower for t in ['vendor', 'supplier']):
-                            data["vendor_information"][key] = value
-                        elif any(t in key_lower for t in ['customer', 'buyer']):
-                            data["customer_information"][key] = value
-                        elif any(t in key_lower for t in ['total', 'amount']):
-                            data["totals"][key] = value
-        
+        data, _ = INVOICE_SCHEMA.categorize(result, fallback_if_empty=INVOICE_KEY_CATEGORIES)
         return data
     
     def _extract_transport_data(self, result) -> Dict:
         """Extraer datos de documento de transporte"""
-        data = {
-            "shipper": {},
-            "consignee": {},
-            "transport_details": {},
-            "goods": []
-        }
-        
-        # Intentar con campos del modelo custom
-        if hasattr(result, 'documents') and result.documents:
-            for doc in result.documents:
-                if hasattr(doc, 'fields'):
-                    for field_name, field_value in doc.fields.items():
-                        if hasattr(field_value, 'value') and field_value.value:
-                            value = str(field_value.value)
-                            field_lower = field_name.lower()
-                            
-                            if any(t in field_lower for t in ['shipper', 'sender', 'remitente', 'exportador']):
-                                data["shipper"][field_name] = value
-                            elif any(t in field_lower for t in ['consignee', 'receiver', 'destinatario', 'importador']):
-                                data["consignee"][field_name] = value
-                            elif any(t in field_lower for t in ['goods', 'cargo', 'mercancia', 'descripcion']):
-                                data["goods"].append({field_name: value})
-                            else:
-                                data["transport_details"][field_name] = value
-        
-        # Si no hay campos, intentar con key-value pairs
-        if not any([data["shipper"], data["consignee"], data["transport_details"]]):
-            if hasattr(result, 'key_value_pairs') and result.key_value_pairs:
-                for kv_pair in result.key_value_pairs:
-                    if kv_pair.key and kv_pair.value:
-                        key = kv_pair.key.content if hasattr(kv_pair.key, 'content') else str(kv_pair.key)
-                        value = kv_pair.value.content if hasattr(kv_pair.value, 'content') else str(kv_pair.value)
-                        
-                        key_lower = key.lower()
-                        if any(t in key_lower for t in ['shipper', 'sender']):
-                            data["shipper"][key] = value
-                        elif any(t in key_lower for t in ['consignee', 'receiver']):
-                            data["consignee"][key] = value
-                        else:
-                            data["transport_details"][key] = value
-        
+        data, _ = TRANSPORT_SCHEMA.categorize(result, fallback_if_empty=TRANSPORT_KEY_CATEGORIES)
         return data
 
-def process_dispatch_workflow(pdf_bytes: bytes, numero_despacho: str) -> Dict:
-    """Workflow completo de procesamiento de despacho"""
+def process_dispatch_workflow(
+    pdf: Union[bytes, str],
+    numero_despacho: str,
+    max_workers: Optional[int] = None,
+    classify_mode: Optional[str] = None,
+    progress: Optional[Callable[..., None]] = None,
+    documento: Optional[str] = None
+) -> Dict:
+    """Workflow completo de procesamiento de despacho
+    
+    pdf puede ser la ruta de una subida volcada a disco: el original no se
+    carga en memoria y las páginas y grupos se generan a medida que se
+    usan. El pico de memoria por trabajo queda por debajo del límite que
+    comprueba benchmarks/bench_upload_memory.py.
+    
+    progress(evento, **datos) se llama al avanzar cada etapa (páginas
+    clasificadas, grupos extraídos); puede invocarse desde varios hilos.
+    
+    Las etapas se solapan: un grupo se cierra en cuanto la siguiente página
+    es de otro tipo y su extracción empieza mientras se clasifican las
+    páginas restantes. resultado["tiempos"] detalla la duración de cada etapa.
+    
+    Con documento (p. ej. "principal"), si ese documento del despacho ya se
+    procesó, sólo las páginas agregadas o cambiadas se clasifican y sólo los
+    grupos que las contienen se extraen; el resto se toma del manifiesto
+    anterior (resultado["reprocesamiento"]). Sin documento no se lee ni se
+    guarda manifiesto: otros PDFs del mismo despacho no pisan el del principal.
+    """
     processor = DocumentProcessor()
+    if progress is None:
+        progress = lambda event, **data: None
     resultado = {
         "numero_despacho": numero_despacho,
         "timestamp": datetime.now().isoformat(),
@@ -285,52 +500,199 @@ def process_dispatch_workflow(pdf_bytes: bytes, numero_despacho: str) -> Dict:
         "resumen": {}
     }
     
+    session = None
+    workflow_started = time.perf_counter()
+    
     try:
         # 1. IDENTIFICACIÓN
         print(f"[1/4] Separando páginas del PDF...")
-        pages = processor.separate_pages(pdf_bytes)
-        resultado["total_paginas"] = len(pages)
-        print(f"   Total: {len(pages)} páginas")
-        
-        print(f"[2/4] Clasificando {len(pages)} páginas...")
-        page_classifications = []
-        for i, page_bytes in enumerate(pages):
-            doc_type = processor.classify_page(page_bytes)
-            page_classifications.append((i, doc_type))
-            print(f"   Página {i+1}: {doc_type}")
-        
-        # 2. AGRUPACIÓN
-        print(f"[3/4] Agrupando páginas consecutivas...")
-        groups = processor.group_consecutive_pages(page_classifications)
-        resultado["total_documentos"] = len(groups)
-        print(f"   Resultado: {len(groups)} documento(s)")
+        # El PDF original se parsea una sola vez para separar y reagrupar
+        session = PdfSession(pdf)
+        resultado["total_paginas"] = session.page_count
+        print(f"   Total: {session.page_count} páginas")
+        progress("paginas_separadas", total_paginas=session.page_count)
+        manifest = DispatchManifest.load(
+            numero_despacho, documento, session, DOCTYPE_MODEL_ID, extraction_model_id
+        ) if documento and dispatch_manifest.DISPATCH_MANIFEST_ENABLED else None
+        classify_started = time.perf_counter()
+        
+        groups = None
+        if (classify_mode or CLASSIFY_MODE) == "document":
+            # Una sola llamada con el PDF original; Azure devuelve los rangos de cada documento
+            print(f"[2/4] Clasificando documento completo ({session.page_count} páginas)...")
+            groups = processor.classify_document(pdf, session.page_count)
+            if groups is not None:
+                progress("pagina_clasificada", clasificadas=session.page_count, total_paginas=session.page_count)
+            else:
+                print("   ⚠️ Clasificación de documento completo falló, se clasifica por página")
         
         # 3. ALMACENAMIENTO Y PROCESAMIENTO
-        print(f"[4/4] Procesando {len(groups)} documentos...")
-        documentos = []
+        # Cada grupo se extrae en cuanto se cierra, mientras siguen clasificándose las páginas
+        # siguientes. El armado del PDF (CPU, fitz) corre en un solo hilo propio, o en tantos
+        # como procesos tenga el pool de PDF; los análisis en Azure (E/S) corren en paralelo
+        # hasta EXTRACT_MAX_WORKERS por despacho.
+        assemble_executor = ThreadPoolExecutor(
+            max_workers=max(1, pdf_pool.size), thread_name_prefix="assemble"
+        )
+        extract_executor = ThreadPoolExecutor(
+            max_workers=max(1, EXTRACT_MAX_WORKERS), thread_name_prefix="extract"
+        )
+        extractions = []
+        extract_lock = threading.Lock()
+        stage_busy = {"ensamblado": 0.0, "extraccion": 0.0}
+        extract_first_start = [None]
+        extract_last_end = [0.0]
+        extracted = [0]
         
-        for idx, group in enumerate(groups):
-            print(f"   Documento {idx+1}: {group['doc_type']} (páginas {group['start_page']+1}-{group['end_page']+1})")
-            
-            # Crear PDF del grupo
-            doc_pdf = processor.create_pdf_from_pages(pdf_bytes, group['pages'])
-            
-            # Procesar con modelo específico
-            extracted_data = processor.process_with_model(doc_pdf, group['doc_type'])
-            
-            # Preparar documento
-            documento = {
+        def timed(stage: str, started: float):
+            ended = time.perf_counter()
+            with extract_lock:
+                if extract_first_start[0] is None:
+                    extract_first_start[0] = started
+                extract_last_end[0] = max(extract_last_end[0], ended)
+                stage_busy[stage] += ended - started
+        
+        def document_for(idx: int, group: Dict) -> Dict:
+            return {
                 "id": f"{numero_despacho}_{idx+1}",
                 "tipo": group['doc_type'],
                 "paginas": f"{group['start_page']+1}-{group['end_page']+1}",
                 "total_paginas": len(group['pages']),
-                "pdf_base64": base64.b64encode(doc_pdf).decode('utf-8'),
-                "datos_extraidos": extracted_data,
-                "procesado": not extracted_data.get("error"),
-                "timestamp": datetime.now().isoformat()
             }
+        
+        def finish_document(idx: int, documento: Dict) -> Dict:
+            with extract_lock:
+                extracted[0] += 1
+                count = extracted[0]
+            # El total de documentos se conoce recién al terminar la clasificación
+            progress("documento_extraido", documento=idx + 1, tipo=documento["tipo"],
+                     procesado=documento["procesado"], extraidos=count)
+            return documento
+        
+        def failed_document(idx: int, group: Dict, error: Exception, documento: Optional[Dict] = None) -> Dict:
+            print(f"   ❌ Error en documento {idx+1}: {error}")
+            documento = documento or document_for(idx, group)
+            documento.update({
+                "datos_extraidos": {"error": f"Error procesando: {error}", "doc_type": group['doc_type']},
+                "procesado": False,
+                "timestamp": datetime.now().isoformat()
+            })
+            return finish_document(idx, documento)
+        
+        def extract_group(idx: int, group: Dict, documento: Dict, doc_pdf: bytes, payload) -> Dict:
+            started = time.perf_counter()
+            try:
+                with metrics.queued(_extract_slots, metrics.ANALYZE):
+                    extracted_data = processor.process_with_model(doc_pdf, group['doc_type'], payload=payload)
+                documento["datos_extraidos"] = extracted_data
+                documento["procesado"] = not extracted_data.get("error")
+                documento["timestamp"] = datetime.now().isoformat()
+                return finish_document(idx, documento)
+            except Exception as e:
+                # El PDF del grupo ya está en /artifacts aunque falle el análisis
+                return failed_document(idx, group, e, documento)
+            finally:
+                timed("extraccion", started)
+        
+        def assemble_group(idx: int, group: Dict):
+            """Armar el PDF del grupo y encolar su análisis; devuelve el futuro de la extracción"""
+            started = time.perf_counter()
+            print(f"   Documento {idx+1}: {group['doc_type']} (páginas {group['start_page']+1}-{group['end_page']+1})")
+            try:
+                # Mismas páginas y tipo que en el procesamiento anterior: sin reducir ni analizar
+                carried = manifest.carried_document(group) if manifest is not None else None
+                # Crear PDF del grupo; se entrega en binario por /artifacts, no dentro del JSON.
+                # La reducción de escaneos también es CPU: se hace aquí y no en el hilo de E/S
+                purpose = "extraction" if carried is None and extraction_model_id(group['doc_type']) else None
+                doc_pdf, payload = processor.assemble_document(session, group['pages'], purpose)
+                artifact_id = artifact_store.put(doc_pdf)
+            except Exception as e:
+                timed("ensamblado", started)
+                return failed_document(idx, group, e)
+            timed("ensamblado", started)
+            
+            documento = document_for(idx, group)
+            documento.update({
+                "artifact_id": artifact_id,
+                "pdf_url": f"/artifacts/{artifact_id}",
+                "pdf_size": len(doc_pdf),
+            })
+            if carried is not None:
+                print(f"   ♻️ Documento {idx+1} sin cambios, se reutiliza su extracción")
+                documento.update({
+                    "datos_extraidos": carried["datos_extraidos"],
+                    "procesado": True,
+                    "reutilizado": True,
+                    "timestamp": datetime.now().isoformat()
+                })
+                return finish_document(idx, documento)
+            if manifest is not None:
+                manifest.extracted()
+            return extract_executor.submit(extract_group, idx, group, documento, doc_pdf, payload)
+        
+        def submit_group(idx: int, group: Dict):
+            extractions.append(assemble_executor.submit(assemble_group, idx, group))
+        
+        def document_result(future: Future) -> Dict:
+            # El armado devuelve el futuro de la extracción, o el documento si falló antes
+            result = future.result()
+            return result.result() if isinstance(result, Future) else result
+        
+        try:
+            if groups is not None:
+                for idx, group in enumerate(groups):
+                    submit_group(idx, group)
+            else:
+                # Cada página se genera al clasificarla, no todas de antemano
+                pages = session.pages()
+                
+                print(f"[2/4] Clasificando {len(pages)} páginas...")
+                # 2. AGRUPACIÓN, a medida que llegan las clasificaciones
+                stream = GroupStream(len(pages), on_group=submit_group)
+                classified = [0]
+                classified_lock = threading.Lock()
+                
+                def on_classified(page_num: int, doc_type: str):
+                    with classified_lock:
+                        classified[0] += 1
+                        count = classified[0]
+                    progress("pagina_clasificada", pagina=page_num + 1, tipo=doc_type,
+                             clasificadas=count, total_paginas=len(pages))
+                    stream.add(page_num, doc_type)
+                
+                # Páginas en blanco y duplicadas se resuelven localmente, sin Azure
+                screener = PageScreener(session) if page_fingerprint.PAGE_SCREENING_ENABLED else None
+                page_classifications = processor.classify_pages(
+                    pages, max_workers=max_workers, on_classified=on_classified,
+                    screener=screener, on_skipped=stream.skip, manifest=manifest
+                )
+                for i, doc_type in page_classifications:
+                    print(f"   Página {i+1}: {doc_type}")
+                
+                if screener is not None:
+                    resultado["paginas_omitidas"] = screener.report()
+                    progress("paginas_omitidas", en_blanco=len(screener.blank_pages),
+                             duplicadas=len(screener.duplicates), total_paginas=len(pages))
+                    if screener.blank_pages or screener.duplicates:
+                        print(f"   Omitidas: {len(screener.blank_pages)} en blanco, "
+                              f"{len(screener.duplicates)} duplicadas sin llamar a Azure")
+                
+                print(f"[3/4] Páginas agrupadas a medida que se clasificaban")
+                groups = stream.groups
+            classify_ended = time.perf_counter()
+            
+            resultado["total_documentos"] = len(groups)
+            print(f"   Resultado: {len(groups)} documento(s)")
+            progress("documentos_agrupados", total_documentos=len(groups))
             
-            documentos.append(documento)
+            print(f"[4/4] Procesando {len(groups)} documentos...")
+            # Resultados en el orden de los grupos, aunque terminen desordenados
+            documentos = [document_result(future) for future in extractions]
+        finally:
+            assemble_executor.shutdown(wait=True)
+            extract_executor.shutdown(wait=True)
+        
+        for documento in documentos:
             resultado["documentos_procesados"].append({
                 "id": documento["id"],
                 "tipo": documento["tipo"],
@@ -338,6 +700,21 @@ def process_dispatch_workflow(pdf_bytes: bytes, numero_despacho: str) -> Dict:
                 "procesado": documento["procesado"]
             })
         
+        finished = time.perf_counter()
+        extract_wall = extract_last_end[0] - extract_first_start[0] if extract_first_start[0] is not None else 0.0
+        classify_wall = classify_ended - classify_started
+        # Con las etapas solapadas el total se acerca a max(clasificación, extracción)
+        resultado["tiempos"] = {
+            "separacion_segundos": round(classify_started - workflow_started, 3),
+            "clasificacion_segundos": round(classify_wall, 3),
+            "extraccion_segundos": round(extract_wall, 3),
+            "ensamblado_ocupado_segundos": round(stage_busy["ensamblado"], 3),
+            "extraccion_ocupada_segundos": round(stage_busy["extraccion"], 3),
+            "solapamiento_segundos": round(max(0.0, classify_wall + extract_wall - (finished - classify_started)), 3),
+            "total_segundos": round(finished - workflow_started, 3)
+        }
+        print(f"   Tiempos: {resultado['tiempos']}")
+        
         # Generar resumen con conteo por tipo
         tipos_contador = {}
         for doc in documentos:
@@ -347,6 +724,14 @@ def process_dispatch_workflow(pdf_bytes: bytes, numero_despacho: str) -> Dict:
         resultado["resumen"] = tipos_contador
         resultado["documentos"] = documentos
         
+        if manifest is not None:
+            resultado["reprocesamiento"] = manifest.report()
+            print(f"   Reprocesamiento: {resultado['reprocesamiento']}")
+            try:
+                manifest.save(groups, documentos)
+            except Exception as e:
+                print(f"   ⚠️ No se pudo guardar el manifiesto del despacho: {e}")
+        
         print(f"✅ Procesamiento completado")
         print(f"   Resumen: {tipos_contador}")
         
@@ -357,4 +742,8 @@ def process_dispatch_workflow(pdf_bytes: bytes, numero_despacho: str) -> Dict:
         import traceback
         traceback.print_exc()
         resultado["error"] = str(e)
-        return resultado
\ No newline at end of file
+        return resultado
+    
+    finally:
+        if session is not None:
+            session.close()
\ No newline at end of file
@@ -0,0 +1,146 @@
+# api-docs/excel_export.py
+import os
+import tempfile
+from typing import Dict, Iterator, List, Tuple
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Font
+from openpyxl.utils import get_column_letter
+
+# Exportación Excel en modo sólo escritura, volcada a disco y enviada por partes
+EXCEL_STREAMING_ENABLED = os.getenv('EXCEL_STREAMING_ENABLED', 'true').lower() == 'true'
+EXPORT_DIR = os.getenv('EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'api-docs-exports'))
+EXPORT_CHUNK_BYTES = int(os.getenv('EXPORT_CHUNK_BYTES', str(1024 * 1024)))
+
+# Ancho máximo de columna, como en create_excel_from_dispatch
+MAX_COLUMN_WIDTH = 50
+
+HEADER_FILL = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+STYLES = {
+    "title": {"font": Font(bold=True, size=14)},
+    "subtitle": {"font": Font(bold=True, size=12)},
+    "bold": {"font": Font(bold=True)},
+    "header": {"font": Font(color="FFFFFF", bold=True), "fill": HEADER_FILL},
+}
+
+# Secciones de datos extraídos por tipo de documento: (título, clave en datos_extraidos)
+SECTIONS = {
+    "factura": [("VENDEDOR", "vendor_information"), ("CLIENTE", "customer_information"), ("TOTALES", "totals")],
+    "transporte": [("REMITENTE", "shipper"), ("DESTINATARIO", "consignee")],
+}
+
+
+class SheetWriter:
+    """Filas de una hoja sólo escritura con el ancho de cada columna calculado al agregarlas
+
+    En modo sólo escritura los anchos deben fijarse antes de la primera fila,
+    así que las filas de la hoja se acumulan como valores simples y se
+    escriben al cerrar.
+    """
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.rows: List[List[Tuple]] = []
+        self.widths: Dict[int, int] = {}
+
+    def row(self, *cells):
+        """Agregar una fila; cada celda es un valor o (valor, estilo)"""
+        row = []
+        for col, cell in enumerate(cells, start=1):
+            value, style = cell if isinstance(cell, tuple) else (cell, None)
+            if value is not None:
+                self.widths[col] = max(self.widths.get(col, 0), len(str(value)))
+            row.append((value, style))
+        self.rows.append(row)
+
+    def blank(self):
+        self.rows.append([])
+
+    def header(self, title: str):
+        """Fila de encabezado combinada en las columnas A:B"""
+        self.row((title, "header"))
+        self.ws.merged_cells.add(f"A{len(self.rows)}:B{len(self.rows)}")
+
+    def close(self):
+        for col, width in self.widths.items():
+            self.ws.column_dimensions[get_column_letter(col)].width = min(width + 2, MAX_COLUMN_WIDTH)
+        for row in self.rows:
+            self.ws.append([self._cell(value, style) for value, style in row])
+        self.rows = []
+        # Cerrar la hoja libera su archivo temporal abierto en vez de esperar a wb.save
+        self.ws.close()
+
+    def _cell(self, value, style):
+        if style is None:
+            return value
+        cell = WriteOnlyCell(self.ws, value=value)
+        for attr, style_value in STYLES[style].items():
+            setattr(cell, attr, style_value)
+        return cell
+
+
+def write_dispatch_excel(data: Dict, path: str):
+    """Escribir en path el Excel de un despacho, con la misma estructura que create_excel_from_dispatch"""
+    wb = Workbook(write_only=True)
+
+    summary = SheetWriter(wb.create_sheet(title="Resumen"))
+    summary.row(("RESUMEN DEL DESPACHO", "title"))
+    summary.blank()
+    summary.row("Número Despacho:", data.get('numero_despacho', ''))
+    summary.row("Total Páginas:", data.get('total_paginas', 0))
+    summary.row("Total Documentos:", data.get('total_documentos', 0))
+    summary.blank()
+    summary.header("DOCUMENTOS POR TIPO")
+    for tipo, cantidad in data.get('resumen', {}).items():
+        summary.row(tipo.replace('_', ' ').title(), cantidad)
+    summary.close()
+
+    # Cada hoja se escribe y se libera antes de pasar al siguiente documento
+    for doc in data.get('documentos', []):
+        sheet = SheetWriter(wb.create_sheet(title=f"{doc['tipo'][:10]}_{doc['id'][-5:]}"))
+        sheet.row((f"DOCUMENTO: {doc['tipo'].upper()}", "subtitle"))
+        sheet.blank()
+        sheet.row("ID:", doc['id'])
+        sheet.row("Páginas:", doc['paginas'])
+        sheet.row("Procesado:", "Sí" if doc['procesado'] else "No")
+
+        datos = doc.get('datos_extraidos')
+        if datos and not datos.get('error'):
+            sheet.blank()
+            sheet.header("DATOS EXTRAÍDOS")
+            sections = [(title, datos[key]) for title, key in SECTIONS.get(doc['tipo'], []) if datos.get(key)]
+            for i, (title, fields) in enumerate(sections):
+                sheet.row((title, "bold"))
+                for k, v in fields.items():
+                    sheet.row(k.replace('_', ' ').title(), str(v))
+                if i < len(sections) - 1:
+                    sheet.blank()
+        sheet.close()
+
+    wb.save(path)
+
+
+def export_dispatch_excel(data: Dict) -> str:
+    """Escribir el Excel del despacho en EXPORT_DIR y devolver la ruta (la borra iter_export)"""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=".xlsx", dir=EXPORT_DIR)
+    os.close(fd)
+    try:
+        write_dispatch_excel(data, path)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def iter_export(path: str) -> Iterator[bytes]:
+    """Leer el archivo exportado por partes y borrarlo al terminar el envío"""
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(EXPORT_CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
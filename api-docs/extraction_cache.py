@@ -0,0 +1,77 @@
+# api-docs/extraction_cache.py
+import os
+import json
+import asyncio
+from typing import Optional, Tuple, Union
+from azure.ai.formrecognizer import AnalyzeResult
+from disk_cache import DiskCache, content_hash
+from upload_spool import SpooledPdf
+
+# Caché de resultados crudos de begin_analyze_document por (modelo, hash del documento)
+EXTRACTION_CACHE_TTL = int(os.getenv('EXTRACTION_CACHE_TTL', str(30 * 24 * 3600)))
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv('EXTRACTION_CACHE_MAX_ENTRIES', '20000'))
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv('EXTRACTION_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+
+extraction_cache = DiskCache(
+    "extraction",
+    ttl_seconds=EXTRACTION_CACHE_TTL,
+    max_entries=EXTRACTION_CACHE_MAX_ENTRIES,
+    max_bytes=EXTRACTION_CACHE_MAX_BYTES
+)
+
+
+def _lookup(model_id: str, document: Union[bytes, SpooledPdf]) -> Tuple[str, Optional[AnalyzeResult]]:
+    """Hash del documento y resultado en caché, si lo hay"""
+    # Las subidas volcadas a disco ya traen su hash y se envían por streaming
+    digest = document.sha256 if isinstance(document, SpooledPdf) else content_hash(document)
+
+    cached = extraction_cache.get(model_id, digest)
+    if cached is not None:
+        print(f"   💾 Resultado de {model_id} en caché")
+        return digest, AnalyzeResult.from_dict(json.loads(cached))
+    return digest, None
+
+
+def _store(model_id: str, digest: str, result: AnalyzeResult):
+    # Fechas y otros valores no JSON se guardan como texto, igual que los usa la extracción
+    extraction_cache.set(model_id, digest, json.dumps(result.to_dict(), default=str))
+
+
+def analyze_document_cached(client, model_id: str, document: Union[bytes, SpooledPdf]) -> AnalyzeResult:
+    """Analizar documento con un modelo, reutilizando el resultado si ya se analizó"""
+    digest, cached = _lookup(model_id, document)
+    if cached is not None:
+        return cached
+
+    if isinstance(document, SpooledPdf):
+        with document.open() as f:
+            poller = client.begin_analyze_document(model_id, document=f)
+            result = poller.result()
+    else:
+        poller = client.begin_analyze_document(model_id, document=document)
+        result = poller.result()
+
+    _store(model_id, digest, result)
+    return result
+
+
+async def analyze_document_cached_async(client, model_id: str, document: Union[bytes, SpooledPdf]) -> AnalyzeResult:
+    """Como analyze_document_cached, con el cliente asíncrono de Azure
+
+    La caché (SQLite) se consulta y escribe en un hilo; la subida y la espera
+    del poller no ocupan hilos ni bloquean el event loop.
+    """
+    digest, cached = await asyncio.to_thread(_lookup, model_id, document)
+    if cached is not None:
+        return cached
+
+    if isinstance(document, SpooledPdf):
+        with document.open() as f:
+            poller = await client.begin_analyze_document(model_id, document=f)
+            result = await poller.result()
+    else:
+        poller = await client.begin_analyze_document(model_id, document=document)
+        result = await poller.result()
+
+    await asyncio.to_thread(_store, model_id, digest, result)
+    return result
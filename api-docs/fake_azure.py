@@ -0,0 +1,217 @@
+# api-docs/fake_azure.py
+"""Cliente local que imita DocumentAnalysisClient para pruebas y benchmarks sin Azure
+
+Decide el tipo de cada página por su texto o, en páginas escaneadas, por la barra
+marcadora que dibuja benchmarks.synthetic. Devuelve objetos AnalyzeResult reales
+para que la extracción y el agrupamiento recorran el mismo código que en producción.
+"""
+import fitz  # pymupdf
+import time
+import random
+import threading
+from typing import List, Optional
+from azure.core.exceptions import HttpResponseError
+
+from azure.ai.formrecognizer import (
+    AnalyzeResult,
+    AnalyzedDocument,
+    BoundingRegion,
+    DocumentField,
+)
+
+from azure_pollers import LocalPoller, LocalAsyncClient
+
+# Ancho de la barra marcadora (fracción del ancho de página) por tipo de clasificador
+MARKER_WIDTHS = {
+    "invoice": 0.2,
+    "bill_of_lading": 0.4,
+    "packing_list": 0.6,
+}
+# Franja vertical de la barra (fracción del alto de página)
+MARKER_BAND = (0.03, 0.045)
+
+TEXT_KEYWORDS = [
+    ("invoice", "invoice"),
+    ("factura", "invoice"),
+    ("bill of lading", "bill_of_lading"),
+    ("waybill", "bill_of_lading"),
+    ("packing list", "packing_list"),
+]
+
+
+def detect_page_type(page: "fitz.Page") -> str:
+    """Tipo de clasificador para una página: por texto y, si no hay, por barra marcadora"""
+    text = page.get_text().lower()
+    for keyword, doc_type in TEXT_KEYWORDS:
+        if keyword in text:
+            return doc_type
+
+    rect = page.rect
+    band = fitz.Rect(0, rect.height * MARKER_BAND[0], rect.width, rect.height * MARKER_BAND[1])
+    scale = 100 / rect.width
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), clip=band, colorspace=fitz.csGRAY)
+    if pix.width == 0 or pix.height == 0:
+        return "other"
+
+    samples = pix.samples
+    row = pix.height // 2
+    dark = sum(1 for x in range(pix.width) if samples[row * pix.stride + x] < 128)
+    width = dark / pix.width
+
+    for doc_type, marker in MARKER_WIDTHS.items():
+        if abs(width - marker) < 0.05:
+            return doc_type
+    return "other"
+
+
+def open_document(document) -> "fitz.Document":
+    """Abrir bytes de PDF o imagen como documento fitz"""
+    data = document.read() if hasattr(document, "read") else document
+    if data[:4] == b"%PDF":
+        return fitz.open("pdf", data)
+    return fitz.open(stream=data)
+
+
+class FakeDocumentAnalysisClient:
+    """Sustituto local de DocumentAnalysisClient con latencia por llamada, por página y por subida
+
+    upload_bandwidth (bytes/s, 0 = sin límite) simula un enlace de subida compartido:
+    las subidas concurrentes se reparten el ancho de banda en vez de sumarlo.
+
+    error_rate (0 a 1) hace fallar esa fracción de operaciones con un 500 al
+    esperar el resultado. rate_limit (llamadas/s, 0 = sin límite) rechaza con
+    429 las llamadas que superan el límite en una ventana de un segundo, como
+    el límite de transacciones por segundo del recurso de Azure.
+    """
+
+    def __init__(self, call_latency: float = 0.0, page_latency: float = 0.0, upload_bandwidth: float = 0.0,
+                 error_rate: float = 0.0, rate_limit: float = 0.0, seed: Optional[int] = None):
+        self.call_latency = call_latency
+        self.page_latency = page_latency
+        self.upload_bandwidth = upload_bandwidth
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.calls = {"classify": 0, "analyze": 0}
+        self.bytes_uploaded = {"classify": 0, "analyze": 0}
+        self.errors = {"throttled": 0, "failed": 0}
+        self._random = random.Random(seed)
+        self._window: List[float] = []
+        self._lock = threading.Lock()
+        self._link_lock = threading.Lock()
+
+    def _register(self, operation: str, data: bytes):
+        with self._lock:
+            self.calls[operation] += 1
+            self.bytes_uploaded[operation] += len(data)
+            if self.rate_limit:
+                now = time.monotonic()
+                self._window = [t for t in self._window if now - t < 1.0]
+                if len(self._window) >= self.rate_limit:
+                    self.errors["throttled"] += 1
+                    raise _http_error(429, "Too Many Requests: se excedió el límite de llamadas por segundo")
+                self._window.append(now)
+            fail = self.error_rate and self._random.random() < self.error_rate
+        if self.upload_bandwidth:
+            with self._link_lock:
+                time.sleep(len(data) / self.upload_bandwidth)
+        return fail
+
+    def _outcome(self, fail: bool, build):
+        """Función de resultado del poller: build() o un error 500 simulado"""
+        if not fail:
+            return build
+
+        def failed():
+            with self._lock:
+                self.errors["failed"] += 1
+            raise _http_error(500, "Internal Server Error simulado")
+        return failed
+
+    def begin_classify_document(self, classifier_id: str, document, **kwargs) -> LocalPoller:
+        data = document.read() if hasattr(document, "read") else document
+        fail = self._register("classify", data)
+
+        doc = open_document(data)
+        page_types = [detect_page_type(page) for page in doc]
+        doc.close()
+
+        def build():
+            # Como el clasificador real, separa en documentos de páginas consecutivas del mismo tipo
+            documents: List[AnalyzedDocument] = []
+            for page_num, doc_type in enumerate(page_types, start=1):
+                if documents and documents[-1].doc_type == doc_type:
+                    documents[-1].bounding_regions.append(BoundingRegion(page_number=page_num, polygon=[]))
+                    continue
+                documents.append(AnalyzedDocument(
+                    doc_type=doc_type,
+                    confidence=0.95,
+                    bounding_regions=[BoundingRegion(page_number=page_num, polygon=[])],
+                    spans=[],
+                    fields={},
+                ))
+            return AnalyzeResult(model_id=classifier_id, documents=documents, key_value_pairs=[], pages=[])
+
+        return LocalPoller(self._outcome(fail, build), self.call_latency + self.page_latency * len(page_types))
+
+    def begin_analyze_document(self, model_id: str, document, **kwargs) -> LocalPoller:
+        data = document.read() if hasattr(document, "read") else document
+        fail = self._register("analyze", data)
+
+        doc = open_document(data)
+        page_count = len(doc)
+        doc.close()
+
+        def build():
+            fields = {
+                name: DocumentField(value_type="string", value=value, content=value, confidence=0.9)
+                for name, value in _fake_fields(model_id).items()
+            }
+            document_result = AnalyzedDocument(
+                doc_type=model_id,
+                confidence=0.9,
+                bounding_regions=[BoundingRegion(page_number=n, polygon=[]) for n in range(1, page_count + 1)],
+                spans=[],
+                fields=fields,
+            )
+            return AnalyzeResult(model_id=model_id, documents=[document_result], key_value_pairs=[], pages=[])
+
+        return LocalPoller(self._outcome(fail, build), self.call_latency + self.page_latency * page_count)
+
+
+class FakeAsyncDocumentAnalysisClient(LocalAsyncClient):
+    """Sustituto de azure.ai.formrecognizer.aio.DocumentAnalysisClient sobre un cliente simulado
+
+    Comparte contadores, límite de llamadas y errores con el cliente
+    síncrono; la lectura del PDF se hace en un hilo y la latencia con
+    asyncio.sleep.
+    """
+
+    def __init__(self, client: FakeDocumentAnalysisClient):
+        super().__init__(client)
+
+
+def _http_error(status_code: int, message: str) -> HttpResponseError:
+    error = HttpResponseError(message=message)
+    error.status_code = status_code
+    return error
+
+
+def _fake_fields(model_id: str) -> dict:
+    if "invoice" in model_id:
+        return {
+            "VendorName": "Proveedor Demo Ltda.",
+            "CustomerName": "Importadora Demo SpA",
+            "InvoiceId": "INV-0001",
+            "InvoiceDate": "2024-01-15",
+            "InvoiceTotal": "1250.00",
+            "ItemDescription": "Repuestos varios",
+        }
+    if "transport" in model_id:
+        return {
+            "ShipperName": "Proveedor Demo Ltda.",
+            "ConsigneeName": "Importadora Demo SpA",
+            "VesselName": "MSC DEMO",
+            "PortOfLoading": "Shanghai",
+            "GoodsDescription": "Repuestos varios",
+        }
+    return {}
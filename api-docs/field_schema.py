@@ -0,0 +1,139 @@
+# api-docs/field_schema.py
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Nombres de campo distintos memorizados por esquema (los modelos repiten los mismos)
+FIELD_NAME_CACHE_SIZE = 65536
+
+
+class FieldCategory:
+    """Categoría de salida y palabras clave que la identifican en el nombre de un campo"""
+
+    def __init__(self, name: str, keywords: List[str], is_list: bool = False):
+        self.name = name
+        self.keywords = keywords
+        # Las categorías de lista guardan un dict por campo (ítems, mercancías)
+        self.is_list = is_list
+        # Se busca sobre el nombre en minúsculas: sin IGNORECASE la búsqueda es el doble de rápida
+        self.pattern = re.compile("|".join(re.escape(k.lower()) for k in keywords))
+
+
+class FieldSchema:
+    """Esquema declarativo para repartir los campos extraídos en categorías
+
+    Las categorías se prueban en orden y gana la primera que coincide; un
+    campo del modelo sin coincidencias va a la categoría default, y un
+    key_value_pair sólo si contiene alguna de default_keywords (el resto
+    queda únicamente en all_fields). Cada categoría se
+    compila en una sola expresión regular y la categoría de cada nombre de
+    campo se memoriza: los mismos nombres se repiten entre documentos del
+    mismo modelo y no vuelven a recorrer las palabras clave.
+    """
+
+    def __init__(self, categories: List[FieldCategory], default: str, default_keywords: List[str]):
+        self.categories = categories
+        self.default = default
+        self._default_search = FieldCategory(default, default_keywords).pattern.search
+        self._searches = [(category.pattern.search, category.name) for category in self.categories]
+        self._cache: Dict[str, str] = {}
+
+    def category_for(self, field_name: str) -> str:
+        category = self._cache.get(field_name)
+        if category is None:
+            category = self._match(field_name)
+            if len(self._cache) >= FIELD_NAME_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[field_name] = category
+        return category
+
+    def _match(self, field_name: str) -> str:
+        field_lower = field_name.lower()
+        for search, name in self._searches:
+            if search(field_lower):
+                return name
+        return self.default
+
+    def empty(self) -> Dict:
+        data = {category.name: [] if category.is_list else {} for category in self.categories}
+        data[self.default] = {}
+        return data
+
+    def categorize(self, result, fallback_if_empty: Optional[Iterable[str]] = None) -> Tuple[Dict, Dict]:
+        """Datos por categoría y todos los campos de un AnalyzeResult
+
+        Usa los campos del modelo custom y recurre a los key_value_pairs del
+        resultado si el modelo no devolvió ninguno o, con fallback_if_empty,
+        si esas categorías quedaron vacías.
+        """
+        data = self.empty()
+        all_fields = {}
+
+        fields = _model_fields(result)
+        for name, value in fields:
+            all_fields[name] = value
+            self._add(data, self.category_for(name), name, value)
+
+        if fallback_if_empty is None:
+            use_pairs = not fields
+        else:
+            use_pairs = not any(data[category] for category in fallback_if_empty)
+        if use_pairs:
+            for name, value in _key_value_pairs(result):
+                all_fields[name] = value
+                category = self.category_for(name)
+                if category != self.default or self._default_search(name.lower()):
+                    self._add(data, category, name, value)
+
+        return data, all_fields
+
+    def _add(self, data: Dict, category: str, name: str, value: str):
+        if isinstance(data[category], list):
+            data[category].append({name: value})
+        else:
+            data[category][name] = value
+
+
+def _model_fields(result) -> List[Tuple[str, str]]:
+    fields = []
+    for doc in getattr(result, 'documents', None) or []:
+        for field_name, field_value in (getattr(doc, 'fields', None) or {}).items():
+            if getattr(field_value, 'value', None):
+                fields.append((field_name, str(field_value.value)))
+    return fields
+
+
+def _key_value_pairs(result) -> List[Tuple[str, str]]:
+    pairs = []
+    for kv_pair in getattr(result, 'key_value_pairs', None) or []:
+        if kv_pair.key and kv_pair.value:
+            key = kv_pair.key.content if hasattr(kv_pair.key, 'content') else str(kv_pair.key)
+            value = kv_pair.value.content if hasattr(kv_pair.value, 'content') else str(kv_pair.value)
+            pairs.append((key, value))
+    return pairs
+
+
+INVOICE_SCHEMA = FieldSchema(
+    categories=[
+        FieldCategory("vendor_information", ["vendor", "supplier", "seller"]),
+        FieldCategory("customer_information", ["customer", "buyer", "client", "bill to"]),
+        FieldCategory("totals", ["total", "amount", "subtotal", "tax"]),
+        FieldCategory("line_items", ["item", "line", "product"], is_list=True),
+    ],
+    default="invoice_details",
+    default_keywords=["invoice", "number", "date", "due"]
+)
+
+# Sin datos en estas categorías el workflow completa con los key_value_pairs
+INVOICE_KEY_CATEGORIES = ("vendor_information", "customer_information", "totals")
+
+TRANSPORT_SCHEMA = FieldSchema(
+    categories=[
+        FieldCategory("shipper", ["shipper", "sender", "remitente", "exportador"]),
+        FieldCategory("consignee", ["consignee", "receiver", "destinatario", "importador"]),
+        FieldCategory("goods", ["goods", "cargo", "mercancia", "descripcion"], is_list=True),
+    ],
+    default="transport_details",
+    default_keywords=["transport", "vessel", "container", "booking"]
+)
+
+TRANSPORT_KEY_CATEGORIES = ("shipper", "consignee", "transport_details")
@@ -0,0 +1,187 @@
+# api-docs/jobs.py
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Any
+from result_store import result_store
+
+# Workflows de despacho ejecutándose a la vez en este proceso
+JOBS_MAX_WORKERS = int(os.getenv('JOBS_MAX_WORKERS', '2'))
+# Trabajos en cola o en ejecución antes de rechazar nuevos envíos
+JOBS_MAX_PENDING = int(os.getenv('JOBS_MAX_PENDING', '50'))
+# Trabajos terminados que se conservan para consultar estado y eventos
+JOBS_MAX_RETAINED = int(os.getenv('JOBS_MAX_RETAINED', '500'))
+# Intervalo mínimo entre instantáneas de progreso visibles para otros workers
+JOBS_SNAPSHOT_INTERVAL = float(os.getenv('JOBS_SNAPSHOT_INTERVAL', '1'))
+
+QUEUED = "en_cola"
+RUNNING = "procesando"
+COMPLETED = "completado"
+FAILED = "error"
+
+
+class JobQueueFull(Exception):
+    """No se aceptan más trabajos hasta que termine alguno de los pendientes"""
+
+
+class Job:
+    """Trabajo en segundo plano con estado y registro de eventos de progreso"""
+
+    def __init__(self, job_id: str, kind: str, metadata: Dict, on_event: Optional[Callable[["Job"], None]] = None):
+        self.id = job_id
+        self.kind = kind
+        self.metadata = metadata
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.progress: Dict = {}
+        self._events: List[Dict] = []
+        self._lock = threading.Lock()
+        self._on_event = on_event
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (COMPLETED, FAILED)
+
+    def emit(self, event: str, **data):
+        """Registrar un evento; se llama desde los hilos del workflow"""
+        with self._lock:
+            self._events.append({
+                "seq": len(self._events),
+                "evento": event,
+                "timestamp": datetime.now().isoformat(),
+                **data
+            })
+            self.progress[event] = data
+        if self._on_event is not None:
+            self._on_event(self)
+
+    def events_since(self, seq: int) -> List[Dict]:
+        with self._lock:
+            return list(self._events[seq:])
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            progress = {event: dict(data) for event, data in self.progress.items()}
+            total_events = len(self._events)
+        return {
+            "id": self.id,
+            "tipo": self.kind,
+            "estado": self.status,
+            "error": self.error,
+            "creado": self.created_at,
+            "iniciado": self.started_at,
+            "finalizado": self.finished_at,
+            "progreso": progress,
+            "total_eventos": total_events,
+            **self.metadata
+        }
+
+
+class JobManager:
+    """Pool acotado de workers para workflows largos fuera de la petición HTTP
+
+    El estado de cada trabajo se publica en el almacén de resultados para que
+    cualquier worker pueda responder a las consultas de estado.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, max_retained: int, store=None):
+        self.max_pending = max_pending
+        self.max_retained = max_retained
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._snapshot_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        kind: str,
+        fn: Callable[[Job], Any],
+        metadata: Optional[Dict] = None
+    ) -> Job:
+        """Encolar fn(job); lanza JobQueueFull si hay demasiados pendientes"""
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"{pending} trabajos pendientes")
+            job = Job(str(uuid.uuid4()), kind, metadata or {}, on_event=self._on_event)
+            self._jobs[job.id] = job
+            self._prune()
+
+        self._snapshot(job)
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def _on_event(self, job: Job):
+        """Publicar el progreso como mucho una vez por intervalo, y siempre al terminar"""
+        now = time.monotonic()
+        with self._lock:
+            if not job.finished and now - self._snapshot_at.get(job.id, 0) < JOBS_SNAPSHOT_INTERVAL:
+                return
+            self._snapshot_at[job.id] = now
+        self._snapshot(job)
+
+    def _snapshot(self, job: Job):
+        if self.store is None:
+            return
+        try:
+            self.store.put("job", job.id, job.to_dict())
+        except Exception as e:
+            print(f"   ⚠️ No se pudo publicar el estado del trabajo {job.id}: {e}")
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]):
+        job.status = RUNNING
+        job.started_at = datetime.now().isoformat()
+        job.emit("iniciado")
+        started = time.perf_counter()
+
+        try:
+            fn(job)
+            job.status = COMPLETED
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = FAILED
+
+        job.finished_at = datetime.now().isoformat()
+        job.emit(job.status, duracion_segundos=round(time.perf_counter() - started, 3), error=job.error)
+
+    def _prune(self):
+        """Olvidar los trabajos terminados más antiguos por encima del límite"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_retained)]:
+            del self._jobs[job_id]
+            self._snapshot_at.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Trabajo ejecutado por este proceso"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """Estado del trabajo, local o publicado por otro worker"""
+        job = self.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if self.store is None:
+            return None
+        return self.store.get("job", job_id)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {QUEUED: 0, RUNNING: 0, COMPLETED: 0, FAILED: 0}
+        for job in jobs:
+            counts[job.status] += 1
+        return {"trabajos": counts, "max_pendientes": self.max_pending}
+
+
+job_manager = JobManager(JOBS_MAX_WORKERS, JOBS_MAX_PENDING, JOBS_MAX_RETAINED, store=result_store)
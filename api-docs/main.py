@@ -1,38 +1,66 @@
 # api-docs/main.py
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Header, Response
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Header, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, FileResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, Dict, List, Any
 from datetime import datetime
-from azure.ai.formrecognizer import DocumentAnalysisClient
-from azure.core.credentials import AzureKeyCredential
 import os
 import base64
 import json
 import io
 import re
 import uuid
+import asyncio
+from contextlib import asynccontextmanager
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+from extraction_cache import extraction_cache, analyze_document_cached, analyze_document_cached_async
+from jobs import job_manager, JobQueueFull, QUEUED, RUNNING, COMPLETED, FAILED
+from result_store import result_store
+from upload_spool import spool_upload
+from artifact_store import artifact_store
+from page_preview import (
+    preview_service, etag, etag_matches, page_count, preview_key, PageOutOfRange, FORMATS,
+    PREVIEW_DEFAULT_WIDTH, PREVIEW_MIN_WIDTH, PREVIEW_MAX_WIDTH
+)
+from field_schema import INVOICE_SCHEMA, TRANSPORT_SCHEMA
+from excel_export import EXCEL_STREAMING_ENABLED, export_dispatch_excel, iter_export
+import metrics
+import azure_scheduler
+import azure_client
+from pdf_workers import pdf_pool
 
 # Configuración Azure
-ENDPOINT = os.getenv('AZURE_FORM_RECOGNIZER_ENDPOINT', '')
-API_KEY = os.getenv('AZURE_FORM_RECOGNIZER_KEY', '')
-
 # IMPORTANTE: Los nombres de los modelos deben coincidir exactamente con los de Azure
 # Si hay un typo en el .env (inovice_01 en lugar de invoice_01), corregirlo
 DOCTYPE_MODEL_ID = os.getenv('DOCTYPE_MODEL_ID', 'doctype_01')
 INVOICE_MODEL_ID = os.getenv('INVOICE_MODEL_ID', 'invoice_01')  # Verificar: era "inovice_01" en el .env
 TRANSPORT_MODEL_ID = os.getenv('TRANSPORT_MODEL_ID', 'transport_01')
 
-# Cliente Azure
-document_analysis_client = DocumentAnalysisClient(
-    endpoint=ENDPOINT,
-    credential=AzureKeyCredential(API_KEY)
-) if ENDPOINT and API_KEY else None
+# Cliente Azure compartido con document_processor.py (azure_client.py)
+document_analysis_client = azure_client.document_analysis_client
+
+# Cliente asíncrono para los endpoints de un documento; se crea al arrancar, con el event loop
+async_analysis_client = None
+
 
-app = FastAPI(title="Document Processing API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global async_analysis_client
+    if async_analysis_client is None:
+        async_analysis_client = azure_client.create_async_client()
+    # Conexiones abiertas antes de aceptar la primera petición
+    await run_in_threadpool(azure_client.warm_up)
+    await azure_client.warm_up_async()
+    yield
+    if async_analysis_client is not None:
+        await async_analysis_client.close()
+    await run_in_threadpool(pdf_pool.shutdown)
+
+
+app = FastAPI(title="Document Processing API", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -43,123 +71,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Storage en memoria para procesos
-app.state.processed_dispatches = {}
-app.state.processed_documents = {}
+# Resultados de procesos: compartidos entre workers y acotados (ver result_store)
+DISPATCHES = "dispatch"
+DOCUMENTS = "document"
+
+# Medidores leídos al exportar /metrics
+metrics.Gauge(
+    "api_docs_jobs", "Trabajos de este proceso por estado", ("status",),
+    collect=lambda: {(status,): count for status, count in job_manager.stats()["trabajos"].items()}
+)
+metrics.Gauge(
+    "api_docs_jobs_in_flight", "Trabajos en cola o procesando en este proceso",
+    collect=lambda: {(): sum(job_manager.stats()["trabajos"][status] for status in (QUEUED, RUNNING))}
+)
+metrics.Gauge(
+    "api_docs_result_store", "Tamaño del almacén de resultados compartido", ("measure",),
+    collect=lambda: {(measure,): value for measure, value in result_store.stats().items()
+                     if measure in ("entries", "bytes", "spilled_entries", "memory_entries", "memory_bytes")}
+)
 
 # ==================== FUNCIONES AUXILIARES ====================
 
+def result_metadata(result) -> Dict:
+    return {
+        "pages": len(result.pages) if hasattr(result, 'pages') else 0,
+        "model_id": result.model_id if hasattr(result, 'model_id') else 'unknown',
+        "processed_at": datetime.now().isoformat()
+    }
+
 def extract_invoice_data(result) -> Dict:
     """Extraer datos estructurados de una factura"""
-    invoice_data = {
-        "metadata": {
-            "pages": len(result.pages) if hasattr(result, 'pages') else 0,
-            "model_id": result.model_id if hasattr(result, 'model_id') else 'unknown',
-            "processed_at": datetime.now().isoformat()
-        },
-        "vendor_information": {},
-        "customer_information": {},
-        "invoice_details": {},
-        "totals": {},
-        "line_items": [],
-        "all_fields": {}
-    }
-    
-    # Extraer campos del modelo custom
-    if hasattr(result, 'documents') and result.documents:
-        for doc in result.documents:
-            if hasattr(doc, 'fields'):
-                for field_name, field_value in doc.fields.items():
-                    if hasattr(field_value, 'value') and field_value.value:
-                        value = str(field_value.value)
-                        invoice_data["all_fields"][field_name] = value
-                        
-                        # Clasificar por tipo de campo
-                        field_lower = field_name.lower()
-                        if 'vendor' in field_lower or 'supplier' in field_lower:
-                            invoice_data["vendor_information"][field_name] = value
-                        elif 'customer' in field_lower or 'buyer' in field_lower:
-                            invoice_data["customer_information"][field_name] = value
-                        elif 'total' in field_lower or 'amount' in field_lower:
-                            invoice_data["totals"][field_name] = value
-                        elif 'item' in field_lower or 'line' in field_lower:
-                            invoice_data["line_items"].append({field_name: value})
-                        elif any(term in field_lower for term in ['invoice', 'number', 'date', 'due']):
-                            invoice_data["invoice_details"][field_name] = value
-    
-    # Extraer key-value pairs si no hay campos del modelo custom
-    if not invoice_data["all_fields"] and hasattr(result, 'key_value_pairs'):
-        for kv_pair in result.key_value_pairs:
-            if kv_pair.key and kv_pair.value:
-                key = kv_pair.key.content if hasattr(kv_pair.key, 'content') else str(kv_pair.key)
-                value = kv_pair.value.content if hasattr(kv_pair.value, 'content') else str(kv_pair.value)
-                
-                invoice_data["all_fields"][key] = value
-                key_lower = key.lower()
-                
-                if any(term in key_lower for term in ['vendor', 'supplier', 'seller']):
-                    invoice_data["vendor_information"][key] = value
-                elif any(term in key_lower for term in ['customer', 'buyer', 'bill to']):
-                    invoice_data["customer_information"][key] = value
-                elif any(term in key_lower for term in ['total', 'amount', 'subtotal', 'tax']):
-                    invoice_data["totals"][key] = value
-                elif any(term in key_lower for term in ['invoice', 'number', 'date']):
-                    invoice_data["invoice_details"][key] = value
-    
-    return invoice_data
+    data, all_fields = INVOICE_SCHEMA.categorize(result)
+    return {"metadata": result_metadata(result), **data, "all_fields": all_fields}
 
 def extract_transport_data(result) -> Dict:
     """Extraer datos estructurados de un documento de transporte"""
-    transport_data = {
-        "metadata": {
-            "pages": len(result.pages) if hasattr(result, 'pages') else 0,
-            "model_id": result.model_id if hasattr(result, 'model_id') else 'unknown',
-            "processed_at": datetime.now().isoformat()
-        },
-        "shipper": {},
-        "consignee": {},
-        "transport_details": {},
-        "goods": [],
-        "all_fields": {}
-    }
-    
-    # Extraer campos del modelo custom
-    if hasattr(result, 'documents') and result.documents:
-        for doc in result.documents:
-            if hasattr(doc, 'fields'):
-                for field_name, field_value in doc.fields.items():
-                    if hasattr(field_value, 'value') and field_value.value:
-                        value = str(field_value.value)
-                        transport_data["all_fields"][field_name] = value
-                        
-                        field_lower = field_name.lower()
-                        if 'shipper' in field_lower or 'sender' in field_lower:
-                            transport_data["shipper"][field_name] = value
-                        elif 'consignee' in field_lower or 'receiver' in field_lower:
-                            transport_data["consignee"][field_name] = value
-                        elif 'goods' in field_lower or 'cargo' in field_lower:
-                            transport_data["goods"].append({field_name: value})
-                        else:
-                            transport_data["transport_details"][field_name] = value
-    
-    # Extraer key-value pairs si no hay campos del modelo custom
-    if not transport_data["all_fields"] and hasattr(result, 'key_value_pairs'):
-        for kv_pair in result.key_value_pairs:
-            if kv_pair.key and kv_pair.value:
-                key = kv_pair.key.content if hasattr(kv_pair.key, 'content') else str(kv_pair.key)
-                value = kv_pair.value.content if hasattr(kv_pair.value, 'content') else str(kv_pair.value)
-                
-                transport_data["all_fields"][key] = value
-                key_lower = key.lower()
-                
-                if any(term in key_lower for term in ['shipper', 'sender', 'exportador']):
-                    transport_data["shipper"][key] = value
-                elif any(term in key_lower for term in ['consignee', 'receiver', 'importador']):
-                    transport_data["consignee"][key] = value
-                elif any(term in key_lower for term in ['transport', 'vessel', 'container', 'booking']):
-                    transport_data["transport_details"][key] = value
-    
-    return transport_data
+    data, all_fields = TRANSPORT_SCHEMA.categorize(result)
+    return {"metadata": result_metadata(result), **data, "all_fields": all_fields}
 
 def create_excel_from_dispatch(data: Dict) -> io.BytesIO:
     """Crear Excel con datos del despacho procesado"""
@@ -301,6 +249,43 @@ def create_excel_from_dispatch(data: Dict) -> io.BytesIO:
     
     return excel_file
 
+async def analyze_upload(model_id: str, spooled, use_cache: bool = True):
+    """Analizar una subida sin bloquear el event loop, con prioridad interactiva
+    
+    Con el cliente asíncrono la subida y la espera del poller no ocupan
+    hilos; sin él, el cliente síncrono corre en el threadpool.
+    """
+    # La prioridad viaja en el contexto, también hacia el threadpool
+    with azure_scheduler.priority(azure_scheduler.INTERACTIVE):
+        return await _analyze_upload(model_id, spooled, use_cache)
+
+async def _analyze_upload(model_id: str, spooled, use_cache: bool):
+    if async_analysis_client is not None:
+        if use_cache:
+            return await analyze_document_cached_async(async_analysis_client, model_id, spooled)
+        with spooled.open() as f:
+            poller = await async_analysis_client.begin_analyze_document(model_id, document=f)
+            return await poller.result()
+    
+    if use_cache:
+        return await run_in_threadpool(analyze_document_cached, document_analysis_client, model_id, spooled)
+    
+    def analyze():
+        with spooled.open() as f:
+            return document_analysis_client.begin_analyze_document(model_id, document=f).result()
+    return await run_in_threadpool(analyze)
+
+def automatic_response(process_id: str, numero_despacho: str, filename: str, resultado: Dict) -> Dict:
+    """Respuesta de /process/automatic, también usada al consultar un trabajo terminado"""
+    return {
+        "id": process_id,
+        "numero_despacho": numero_despacho,
+        "filename": filename,
+        "resultado": resultado,
+        "json_url": f"/download/{process_id}/json",
+        "excel_url": f"/download/{process_id}/excel"
+    }
+
 # ==================== ENDPOINTS ====================
 
 @app.get("/")
@@ -329,10 +314,93 @@ async def health():
         }
     }
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Estadísticas de las cachés de Azure, los manifiestos de despacho y los almacenes de resultados y artefactos"""
+    from document_processor import classification_cache
+    from dispatch_manifest import manifest_cache
+    return {
+        "classification": classification_cache.stats(),
+        "extraction": extraction_cache.stats(),
+        "manifests": manifest_cache.stats(),
+        "results": result_store.stats(),
+        "artifacts": artifact_store.stats(),
+        "previews": preview_service.stats()
+    }
+
+@app.get("/classifier/stats")
+async def classifier_stats():
+    """Páginas resueltas por el clasificador local y llamadas a Azure evitadas"""
+    from text_classifier import local_classifier_stats
+    return local_classifier_stats()
+
+@app.get("/screening/stats")
+async def screening_stats():
+    """Páginas en blanco omitidas y duplicadas que reutilizaron su clasificación"""
+    from page_fingerprint import screening_stats
+    return screening_stats()
+
+@app.get("/scheduler/stats")
+async def scheduler_stats():
+    """Tokens, llamadas en espera por prioridad y reintentos por modelo"""
+    return azure_scheduler.azure_scheduler.stats()
+
+@app.get("/payload/stats")
+async def payload_stats():
+    """Bytes enviados a Azure tras reducir las páginas escaneadas, por perfil"""
+    from payload_slimming import payload_stats
+    return payload_stats()
+
+@app.get("/recordings/stats")
+async def recordings_stats():
+    """Modo de grabación o reproducción de Azure y respuestas grabadas por modelo"""
+    from azure_recorder import recordings
+    return await run_in_threadpool(recordings.stats)
+
+@app.get("/pdf-workers/stats")
+async def pdf_workers_stats():
+    """Procesos del pool de PDF, tareas ejecutadas y reinicios tras caídas"""
+    return pdf_pool.stats()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Métricas de llamadas a Azure, trabajos y almacén de resultados en formato Prometheus"""
+    content = await run_in_threadpool(metrics.render_metrics)
+    return Response(content=content, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.delete("/cache/{cache_name}/{model_id}")
+async def invalidate_cache(cache_name: str, model_id: str):
+    """Invalidar las entradas de un modelo (por ejemplo, tras reentrenarlo)
+
+    Los manifiestos de despacho guardan tipos y extracciones sin pasar por
+    estas cachés: se borran todos con cualquier invalidación, o solos con
+    cache_name "manifests".
+    """
+    from document_processor import classification_cache
+    from dispatch_manifest import invalidate_manifests
+    caches = {
+        "classification": classification_cache,
+        "extraction": extraction_cache
+    }
+    
+    if cache_name != "manifests" and cache_name not in caches:
+        raise HTTPException(status_code=404, detail="Caché no encontrada")
+    
+    deleted = caches[cache_name].invalidate(model_id) if cache_name in caches else 0
+    manifests_deleted = invalidate_manifests()
+    return {
+        "cache": cache_name,
+        "model_id": model_id,
+        "entradas_eliminadas": deleted,
+        "manifiestos_eliminados": manifests_deleted
+    }
+
 @app.post("/process/automatic")
 async def process_automatic(
     file: UploadFile = File(...),
-    numero_despacho: str = Form(...)
+    numero_despacho: str = Form(...),
+    # Documento del despacho cuyo manifiesto se usa para reprocesar sólo lo cambiado
+    documento: Optional[str] = Form(None)
 ):
     """Procesar documento con identificación automática y separación"""
     if not document_analysis_client:
@@ -340,36 +408,160 @@ async def process_automatic(
     
     process_id = str(uuid.uuid4())
     
+    # Volcar a disco: el workflow abre el PDF desde el archivo
+    spooled = await spool_upload(file)
+    
     try:
-        # Leer archivo
-        contents = await file.read()
-        
-        if not contents.startswith(b'%PDF'):
+        if not spooled.is_pdf:
             raise HTTPException(status_code=400, detail="El archivo no es un PDF válido")
         
         # Ejecutar workflow completo
+        # El workflow usa sus propios hilos de clasificación y extracción: corre en
+        # el threadpool para no bloquear el event loop mientras espera a Azure
         from document_processor import process_dispatch_workflow
-        resultado = process_dispatch_workflow(contents, numero_despacho)
+        resultado = await run_in_threadpool(
+            process_dispatch_workflow, spooled.path, numero_despacho, documento=documento
+        )
         
         if resultado.get("error"):
             raise HTTPException(status_code=500, detail=resultado["error"])
         
         # Guardar para descarga posterior
-        app.state.processed_dispatches[process_id] = resultado
+        await run_in_threadpool(result_store.put, DISPATCHES, process_id, resultado)
         
-        return {
-            "id": process_id,
-            "numero_despacho": numero_despacho,
-            "filename": file.filename,
-            "resultado": resultado,
-            "json_url": f"/download/{process_id}/json",
-            "excel_url": f"/download/{process_id}/excel"
-        }
+        return automatic_response(process_id, numero_despacho, file.filename, resultado)
         
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
+    
+    finally:
+        spooled.delete()
+
+@app.post("/jobs/automatic", status_code=202)
+async def submit_automatic_job(
+    file: UploadFile = File(...),
+    numero_despacho: str = Form(...),
+    documento: Optional[str] = Form(None)
+):
+    """Encolar el procesamiento automático y devolver el id del trabajo sin esperar"""
+    if not document_analysis_client:
+        raise HTTPException(status_code=500, detail="Azure Document Intelligence no configurado")
+    
+    spooled = await spool_upload(file)
+    
+    if not spooled.is_pdf:
+        spooled.delete()
+        raise HTTPException(status_code=400, detail="El archivo no es un PDF válido")
+    
+    from document_processor import process_dispatch_workflow
+    
+    def run(job):
+        # El archivo volcado vive hasta que el trabajo termina
+        with spooled:
+            resultado = process_dispatch_workflow(
+                spooled.path, numero_despacho, progress=job.emit, documento=documento
+            )
+        if resultado.get("error"):
+            raise RuntimeError(resultado["error"])
+        # El id del trabajo es el id de proceso de las rutas /download
+        result_store.put(DISPATCHES, job.id, resultado)
+    
+    try:
+        job = job_manager.submit(
+            "automatic",
+            run,
+            metadata={"numero_despacho": numero_despacho, "filename": file.filename}
+        )
+    except JobQueueFull as e:
+        spooled.delete()
+        raise HTTPException(status_code=503, detail=f"Cola de procesamiento llena: {e}")
+    
+    return {
+        "id": job.id,
+        "estado": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+        "result_url": f"/jobs/{job.id}/result",
+        "json_url": f"/download/{job.id}/json",
+        "excel_url": f"/download/{job.id}/excel"
+    }
+
+@app.get("/jobs/stats")
+async def jobs_stats():
+    """Trabajos por estado en este proceso"""
+    return job_manager.stats()
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Estado y último progreso de un trabajo"""
+    status = await run_in_threadpool(job_manager.status, job_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return status
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    """Resultado de un trabajo terminado, con el mismo formato que /process/automatic"""
+    status = await run_in_threadpool(job_manager.status, job_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    if status["estado"] == FAILED:
+        raise HTTPException(status_code=500, detail=status["error"])
+    if status["estado"] != COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Trabajo en estado {status['estado']}")
+    
+    resultado = await run_in_threadpool(result_store.get, DISPATCHES, job_id)
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Resultado no disponible")
+    
+    return automatic_response(job_id, status["numero_despacho"], status["filename"], resultado)
+
+async def stream_job_snapshots(job_id: str):
+    """Server-sent events con cada cambio del estado publicado de un trabajo"""
+    last = None
+    while True:
+        status = await run_in_threadpool(job_manager.status, job_id)
+        if status is None:
+            return
+        if status != last:
+            yield f"event: estado\ndata: {json.dumps(status, ensure_ascii=False)}\n\n"
+            last = status
+        if status["estado"] in (COMPLETED, FAILED):
+            return
+        await asyncio.sleep(1)
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, desde: int = 0):
+    """Eventos de progreso como server-sent events hasta que el trabajo termina"""
+    job = job_manager.get(job_id)
+    if not job:
+        if not await run_in_threadpool(job_manager.status, job_id):
+            raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+        # Trabajo de otro worker: sólo se ven sus instantáneas de estado
+        return StreamingResponse(
+            stream_job_snapshots(job_id),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"}
+        )
+    
+    async def stream():
+        seq = desde
+        while True:
+            events = job.events_since(seq)
+            for event in events:
+                yield f"id: {event['seq']}\nevent: {event['evento']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+                if event["evento"] in (COMPLETED, FAILED):
+                    return
+            seq += len(events)
+            await asyncio.sleep(0.5)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
 
 @app.post("/process/invoice")
 async def process_invoice(
@@ -382,29 +574,25 @@ async def process_invoice(
     
     process_id = str(uuid.uuid4())
     
+    spooled = await spool_upload(file)
+    
     try:
-        contents = await file.read()
-        
-        if not contents.startswith(b'%PDF'):
+        if not spooled.is_pdf:
             raise HTTPException(status_code=400, detail="El archivo no es un PDF válido")
         
-        # Analizar con Azure
-        poller = document_analysis_client.begin_analyze_document(
-            INVOICE_MODEL_ID,
-            document=contents
-        )
-        result = poller.result()
+        # Analizar con Azure (documentos idénticos se sirven desde caché)
+        result = await analyze_upload(INVOICE_MODEL_ID, spooled)
         
         # Extraer datos
         invoice_data = extract_invoice_data(result)
         
         # Guardar para descarga
-        app.state.processed_documents[process_id] = {
+        await run_in_threadpool(result_store.put, DOCUMENTS, process_id, {
             'data': invoice_data,
             'type': 'invoice',
             'filename': file.filename,
             'numero_despacho': numero_despacho
-        }
+        })
         
         return {
             "id": process_id,
@@ -416,6 +604,9 @@ async def process_invoice(
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    finally:
+        spooled.delete()
 
 @app.post("/process/transport")
 async def process_transport(
@@ -428,29 +619,25 @@ async def process_transport(
     
     process_id = str(uuid.uuid4())
     
+    spooled = await spool_upload(file)
+    
     try:
-        contents = await file.read()
-        
-        if not contents.startswith(b'%PDF'):
+        if not spooled.is_pdf:
             raise HTTPException(status_code=400, detail="El archivo no es un PDF válido")
         
-        # Analizar con Azure
-        poller = document_analysis_client.begin_analyze_document(
-            TRANSPORT_MODEL_ID,
-            document=contents
-        )
-        result = poller.result()
+        # Analizar con Azure (documentos idénticos se sirven desde caché)
+        result = await analyze_upload(TRANSPORT_MODEL_ID, spooled)
         
         # Extraer datos
         transport_data = extract_transport_data(result)
         
         # Guardar para descarga
-        app.state.processed_documents[process_id] = {
+        await run_in_threadpool(result_store.put, DOCUMENTS, process_id, {
             'data': transport_data,
             'type': 'transport',
             'filename': file.filename,
             'numero_despacho': numero_despacho
-        }
+        })
         
         return {
             "id": process_id,
@@ -462,16 +649,18 @@ async def process_transport(
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    finally:
+        spooled.delete()
 
 @app.get("/download/{process_id}/json")
 async def download_dispatch_json(process_id: str):
     """Descargar datos de despacho procesado como JSON"""
-    if process_id not in app.state.processed_dispatches:
+    data = await run_in_threadpool(result_store.get, DISPATCHES, process_id)
+    if data is None:
         raise HTTPException(status_code=404, detail="Proceso no encontrado")
     
-    data = app.state.processed_dispatches[process_id]
-    
-    # Crear JSON sin los PDFs base64 para reducir tamaño
+    # Crear JSON sólo con los datos extraídos (los PDFs se descargan desde /artifacts)
     export_data = {
         "numero_despacho": data['numero_despacho'],
         "timestamp": data['timestamp'],
@@ -504,11 +693,15 @@ async def download_dispatch_json(process_id: str):
 @app.get("/download/{process_id}/excel")
 async def download_dispatch_excel(process_id: str):
     """Descargar datos de despacho procesado como Excel"""
-    if process_id not in app.state.processed_dispatches:
+    data = await run_in_threadpool(result_store.get, DISPATCHES, process_id)
+    if data is None:
         raise HTTPException(status_code=404, detail="Proceso no encontrado")
-    
-    data = app.state.processed_dispatches[process_id]
-    excel_file = create_excel_from_dispatch(data)
+    if EXCEL_STREAMING_ENABLED:
+        # Libro sólo escritura volcado a disco fuera del event loop y enviado por partes
+        path = await run_in_threadpool(export_dispatch_excel, data)
+        excel_file = iter_export(path)
+    else:
+        excel_file = create_excel_from_dispatch(data)
     
     return StreamingResponse(
         excel_file,
@@ -518,13 +711,75 @@ async def download_dispatch_excel(process_id: str):
         }
     )
 
+@app.get("/artifacts/{artifact_id}")
+async def download_artifact(artifact_id: str):
+    """Descargar en binario un PDF separado por el workflow (id = SHA-256 del contenido)"""
+    path = artifact_store.path(artifact_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Artefacto no encontrado")
+    
+    return FileResponse(
+        path,
+        media_type="application/pdf",
+        headers={"X-Content-SHA256": artifact_id}
+    )
+
+@app.post("/artifacts")
+async def upload_artifact(file: UploadFile = File(...)):
+    """Guardar un PDF en el almacén de artefactos (p. ej. uno de api-despachos, para sus vistas previas)"""
+    spooled = await spool_upload(file)
+    with spooled:
+        if not spooled.is_pdf:
+            raise HTTPException(status_code=400, detail="El archivo no es un PDF válido")
+        artifact_id = await run_in_threadpool(artifact_store.put_file, spooled.path, spooled.sha256)
+    return {"artifact_id": artifact_id, "size": spooled.size}
+
+@app.get("/artifacts/{artifact_id}/pages")
+async def artifact_pages(artifact_id: str):
+    """Número de páginas de un artefacto, para pedir sus vistas previas una a una"""
+    path = artifact_store.path(artifact_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Artefacto no encontrado")
+    return {"artifact_id": artifact_id, "paginas": await run_in_threadpool(page_count, path)}
+
+@app.get("/artifacts/{artifact_id}/pages/{page}/preview")
+async def artifact_page_preview(
+    artifact_id: str,
+    page: int,
+    width: int = Query(PREVIEW_DEFAULT_WIDTH, ge=PREVIEW_MIN_WIDTH, le=PREVIEW_MAX_WIDTH),
+    format: str = Query("jpeg", pattern="^(jpeg|png)$"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Imagen de la página N (desde 1) al ancho pedido, cacheada en disco y servida con ETag"""
+    # Antes del 304: un artefacto expirado o desconocido no se valida con un ETag viejo
+    if artifact_store.path(artifact_id) is None:
+        raise HTTPException(status_code=404, detail="Artefacto no encontrado")
+
+    key = preview_key(artifact_id, page, width, format)
+    headers = {
+        "ETag": etag(key),
+        # La clave depende del contenido del artefacto: la imagen no cambia nunca
+        "Cache-Control": "public, max-age=31536000, immutable"
+    }
+    if etag_matches(if_none_match, key):
+        preview_service.not_modified()
+        return Response(status_code=304, headers=headers)
+
+    try:
+        path, _ = await run_in_threadpool(preview_service.get, artifact_id, page, width, format)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Artefacto no encontrado")
+    except PageOutOfRange as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return FileResponse(path, media_type=FORMATS[format][1], headers=headers)
+
 @app.get("/download/doc/{process_id}/json")
 async def download_document_json(process_id: str):
     """Descargar datos de documento individual como JSON"""
-    if process_id not in app.state.processed_documents:
+    doc_data = await run_in_threadpool(result_store.get, DOCUMENTS, process_id)
+    if doc_data is None:
         raise HTTPException(status_code=404, detail="Documento no encontrado")
-    
-    doc_data = app.state.processed_documents[process_id]
     json_content = json.dumps(doc_data['data'], indent=2, ensure_ascii=False)
     
     return Response(
@@ -544,9 +799,9 @@ async def test_model(
     if not document_analysis_client:
         raise HTTPException(status_code=500, detail="Azure no configurado")
     
+    spooled = await spool_upload(file)
+    
     try:
-        contents = await file.read()
-        
         # Seleccionar modelo
         model_map = {
             "doctype": DOCTYPE_MODEL_ID,
@@ -558,12 +813,8 @@ async def test_model(
         if not model_id:
             raise HTTPException(status_code=400, detail="Tipo de modelo inválido")
         
-        # Procesar
-        poller = document_analysis_client.begin_analyze_document(
-            model_id,
-            document=contents
-        )
-        result = poller.result()
+        # Procesar (sin caché: se quiere ver la respuesta actual del modelo)
+        result = await analyze_upload(model_id, spooled, use_cache=False)
         
         # Información de debug
         debug_info = {
@@ -606,6 +857,9 @@ async def test_model(
             "error": str(e),
             "traceback": traceback.format_exc()
         }
+    
+    finally:
+        spooled.delete()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,367 @@
+# api-docs/metrics.py
+"""Métricas del proceso en formato de texto de Prometheus (GET /metrics)
+
+Contadores, histogramas y medidores mínimos, sin dependencias, más la
+instrumentación de las llamadas a Azure: instrument_client (o
+instrument_async_client) envuelve el cliente y mide cada
+begin_classify_document / begin_analyze_document.
+"""
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from azure.core.exceptions import HttpResponseError
+
+AZURE_METRICS_ENABLED = os.getenv('AZURE_METRICS_ENABLED', 'true').lower() == 'true'
+
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+BYTES_BUCKETS = tuple(16 * 1024 * 4 ** i for i in range(8))  # 16 KiB .. 256 MiB
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = SECONDS_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Por etiquetas: conteo por bucket (no acumulado), suma y total
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = {key: (list(counts), total[0]) for key, (counts, total) in self._values.items()}
+        lines = []
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Medidor con valores fijados a mano o leídos de una función al exportar
+
+    collect devuelve {valores de etiquetas (tupla): valor}; sin etiquetas,
+    la clave es la tupla vacía.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 collect: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._collect = collect
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[str]:
+        if self._collect is not None:
+            try:
+                values = self._collect()
+            except Exception as e:
+                print(f"⚠️ No se pudo leer la métrica {self.name}: {e}")
+                return []
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+def render_metrics() -> str:
+    """Todas las métricas registradas en el formato de texto de Prometheus"""
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# ==================== LLAMADAS A AZURE ====================
+
+AZURE_CALLS = Counter(
+    "azure_calls_total", "Llamadas a Azure Form Recognizer por resultado",
+    ("operation", "model_id", "outcome"))
+AZURE_QUEUE_SECONDS = Histogram(
+    "azure_queue_seconds", "Espera por un cupo de concurrencia antes de llamar a Azure",
+    ("operation",))
+AZURE_UPLOAD_BYTES = Histogram(
+    "azure_upload_bytes", "Bytes del documento enviado a Azure",
+    ("operation", "model_id"), buckets=BYTES_BUCKETS)
+AZURE_SUBMIT_SECONDS = Histogram(
+    "azure_submit_seconds", "Duración de begin_*: subida del documento y creación de la operación",
+    ("operation", "model_id"))
+AZURE_POLL_SECONDS = Histogram(
+    "azure_poll_wait_seconds", "Espera del poller hasta el resultado de la operación",
+    ("operation", "model_id"))
+AZURE_CALL_SECONDS = Histogram(
+    "azure_call_seconds", "Latencia total de la llamada, del envío al resultado",
+    ("operation", "model_id", "outcome"))
+AZURE_IN_FLIGHT = Gauge(
+    "azure_calls_in_flight", "Operaciones de Azure enviadas y aún sin resultado",
+    ("operation",))
+AZURE_HTTP_REQUESTS = Counter(
+    "azure_http_requests_total", "Peticiones HTTP a Azure por conexión recién abierta o reutilizada del pool",
+    ("transport", "connection"))
+
+CLASSIFY = "classify"
+ANALYZE = "analyze"
+
+
+@contextmanager
+def queued(slots: threading.Semaphore, operation: str):
+    """Tomar un cupo del semáforo registrando cuánto se esperó por él"""
+    start = time.perf_counter()
+    with slots:
+        AZURE_QUEUE_SECONDS.observe(time.perf_counter() - start, operation=operation)
+        yield
+
+
+def _outcome(error: Optional[BaseException]) -> str:
+    if error is None:
+        return "ok"
+    if isinstance(error, HttpResponseError) and error.status_code == 429:
+        return "throttled"
+    return "error"
+
+
+def _payload_size(document) -> Optional[int]:
+    """Bytes que se subirán: largo de los bytes o lo que queda del archivo abierto"""
+    if isinstance(document, (bytes, bytearray, memoryview)):
+        return len(document)
+    try:
+        return os.fstat(document.fileno()).st_size - document.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class _CallTimer:
+    """Estado de una llamada: desde el envío hasta que el poller entrega el resultado"""
+
+    def __init__(self, operation: str, model_id: str):
+        self.operation = operation
+        self.model_id = model_id
+        self.started = time.perf_counter()
+        self._done = False
+        self._lock = threading.Lock()
+        AZURE_IN_FLIGHT.inc(operation=operation)
+
+    def finish(self, error: Optional[BaseException] = None):
+        with self._lock:
+            if self._done:
+                return
+            self._done = True
+        outcome = _outcome(error)
+        AZURE_IN_FLIGHT.dec(operation=self.operation)
+        AZURE_CALLS.inc(operation=self.operation, model_id=self.model_id, outcome=outcome)
+        AZURE_CALL_SECONDS.observe(time.perf_counter() - self.started,
+                                   operation=self.operation, model_id=self.model_id, outcome=outcome)
+
+
+class InstrumentedPoller:
+    """Poller que registra la espera y el resultado de la operación al pedir result()"""
+
+    def __init__(self, poller, timer: _CallTimer):
+        self._poller = poller
+        self._timer = timer
+
+    def result(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = self._poller.result(*args, **kwargs)
+        except BaseException as e:
+            self._timer.finish(e)
+            raise
+        finally:
+            AZURE_POLL_SECONDS.observe(time.perf_counter() - start,
+                                       operation=self._timer.operation, model_id=self._timer.model_id)
+        self._timer.finish()
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._poller, name)
+
+
+class InstrumentedClient:
+    """DocumentAnalysisClient (o el simulado) con métricas por llamada"""
+
+    def __init__(self, client):
+        self._client = client
+
+    def _begin(self, operation: str, begin, model_id: str, document, **kwargs) -> InstrumentedPoller:
+        size = _payload_size(document)
+        if size is not None:
+            AZURE_UPLOAD_BYTES.observe(size, operation=operation, model_id=model_id)
+        timer = _CallTimer(operation, model_id)
+        try:
+            poller = begin(model_id, document=document, **kwargs)
+        except BaseException as e:
+            timer.finish(e)
+            raise
+        finally:
+            AZURE_SUBMIT_SECONDS.observe(time.perf_counter() - timer.started,
+                                         operation=operation, model_id=model_id)
+        return InstrumentedPoller(poller, timer)
+
+    def begin_classify_document(self, classifier_id: str, document, **kwargs):
+        return self._begin(CLASSIFY, self._client.begin_classify_document, classifier_id, document, **kwargs)
+
+    def begin_analyze_document(self, model_id: str, document, **kwargs):
+        return self._begin(ANALYZE, self._client.begin_analyze_document, model_id, document, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class InstrumentedAsyncPoller:
+    """AsyncLROPoller con las mismas métricas que InstrumentedPoller"""
+
+    def __init__(self, poller, timer: _CallTimer):
+        self._poller = poller
+        self._timer = timer
+
+    async def result(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = await self._poller.result(*args, **kwargs)
+        except BaseException as e:
+            self._timer.finish(e)
+            raise
+        finally:
+            AZURE_POLL_SECONDS.observe(time.perf_counter() - start,
+                                       operation=self._timer.operation, model_id=self._timer.model_id)
+        self._timer.finish()
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._poller, name)
+
+
+class InstrumentedAsyncClient:
+    """DocumentAnalysisClient asíncrono (azure.ai.formrecognizer.aio) con métricas por llamada"""
+
+    def __init__(self, client):
+        self._client = client
+
+    async def _begin(self, operation: str, begin, model_id: str, document, **kwargs) -> InstrumentedAsyncPoller:
+        size = _payload_size(document)
+        if size is not None:
+            AZURE_UPLOAD_BYTES.observe(size, operation=operation, model_id=model_id)
+        timer = _CallTimer(operation, model_id)
+        try:
+            poller = await begin(model_id, document=document, **kwargs)
+        except BaseException as e:
+            timer.finish(e)
+            raise
+        finally:
+            AZURE_SUBMIT_SECONDS.observe(time.perf_counter() - timer.started,
+                                         operation=operation, model_id=model_id)
+        return InstrumentedAsyncPoller(poller, timer)
+
+    async def begin_classify_document(self, classifier_id: str, document, **kwargs):
+        return await self._begin(CLASSIFY, self._client.begin_classify_document, classifier_id, document, **kwargs)
+
+    async def begin_analyze_document(self, model_id: str, document, **kwargs):
+        return await self._begin(ANALYZE, self._client.begin_analyze_document, model_id, document, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def instrument_client(client):
+    """Envolver el cliente de Azure para medir sus llamadas (None queda como None)"""
+    if client is None or not AZURE_METRICS_ENABLED or isinstance(client, InstrumentedClient):
+        return client
+    return InstrumentedClient(client)
+
+
+def instrument_async_client(client):
+    """Como instrument_client, para el cliente asíncrono"""
+    if client is None or not AZURE_METRICS_ENABLED or isinstance(client, InstrumentedAsyncClient):
+        return client
+    return InstrumentedAsyncClient(client)
@@ -0,0 +1,152 @@
+# api-docs/page_fingerprint.py
+import fitz  # pymupdf
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+from text_classifier import MIN_TEXT_CHARS
+
+# Detección local de páginas en blanco y duplicadas antes de clasificar
+PAGE_SCREENING_ENABLED = os.getenv('PAGE_SCREENING_ENABLED', 'true').lower() == 'true'
+# Fracción máxima de píxeles con tinta para considerar una página en blanco
+BLANK_INK_MAX = float(os.getenv('BLANK_INK_MAX', '0.003'))
+# Bits distintos (de HASH_SIZE * HASH_SIZE) para considerar dos páginas duplicadas
+DUPLICATE_MAX_DISTANCE = int(os.getenv('DUPLICATE_MAX_DISTANCE', '4'))
+# Diferencia relativa máxima de tinta entre duplicadas
+DUPLICATE_MAX_INK_DELTA = 0.10
+
+# Ancho del renderizado de huella y lado de la grilla del hash de diferencias
+THUMB_WIDTH = 96
+HASH_SIZE = 16
+
+BLANK = "en_blanco"
+DUPLICATE = "duplicada"
+
+_stats_lock = threading.Lock()
+_stats = {"paginas": 0, "en_blanco": 0, "duplicadas": 0}
+
+
+class PageFingerprint:
+    """Huella de una página: hash perceptual, cobertura de tinta y si tiene texto"""
+
+    def __init__(self, dhash: int, ink: float, has_text: bool):
+        self.dhash = dhash
+        self.ink = ink
+        self.has_text = has_text
+
+    @property
+    def blank(self) -> bool:
+        return not self.has_text and self.ink <= BLANK_INK_MAX
+
+    def distance(self, other: "PageFingerprint") -> int:
+        return (self.dhash ^ other.dhash).bit_count()
+
+
+def fingerprint_page(page: "fitz.Page") -> PageFingerprint:
+    """Calcular la huella con un renderizado en gris de THUMB_WIDTH píxeles de ancho"""
+    has_text = len(page.get_text().strip()) >= MIN_TEXT_CHARS
+    scale = THUMB_WIDTH / page.rect.width
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY, alpha=False)
+
+    width, height, stride = pix.width, pix.height, pix.stride
+    samples = pix.samples
+    rows = [samples[y * stride:y * stride + width] for y in range(height)]
+
+    # Tinta: píxeles claramente más oscuros que el fondo (tolera papel gris de escaneos)
+    histogram = [0] * 256
+    for row in rows:
+        for value in row:
+            histogram[value] += 1
+    total = width * height
+    background = _percentile(histogram, total, 0.9)
+    threshold = background * 0.6
+    ink = sum(histogram[:int(threshold)]) / total if total else 0.0
+
+    # Hash de diferencias sobre una grilla (HASH_SIZE + 1) x HASH_SIZE de promedios por celda
+    grid = _cell_means(rows, width, height, HASH_SIZE + 1, HASH_SIZE)
+    dhash = 0
+    for y in range(HASH_SIZE):
+        for x in range(HASH_SIZE):
+            dhash = (dhash << 1) | int(grid[y][x] > grid[y][x + 1])
+
+    return PageFingerprint(dhash, ink, has_text)
+
+
+def _percentile(histogram: List[int], total: int, fraction: float) -> int:
+    target = total * fraction
+    seen = 0
+    for value, count in enumerate(histogram):
+        seen += count
+        if seen >= target:
+            return value
+    return 255
+
+
+def _cell_means(rows: List[bytes], width: int, height: int, cols: int, cells_y: int) -> List[List[float]]:
+    means = []
+    for cy in range(cells_y):
+        y0, y1 = cy * height // cells_y, max(cy * height // cells_y + 1, (cy + 1) * height // cells_y)
+        row_means = []
+        for cx in range(cols):
+            x0, x1 = cx * width // cols, max(cx * width // cols + 1, (cx + 1) * width // cols)
+            cell_sum = sum(sum(rows[y][x0:x1]) for y in range(y0, y1))
+            row_means.append(cell_sum / ((y1 - y0) * (x1 - x0)))
+        means.append(row_means)
+    return means
+
+
+class PageScreener:
+    """Decide por página si se clasifica, se omite por estar en blanco o reutiliza otra clasificación"""
+
+    def __init__(self, session):
+        self.session = session
+        self._seen: List[Tuple[int, PageFingerprint]] = []
+        self.blank_pages: List[int] = []
+        # página -> (página de referencia, distancia)
+        self.duplicates: Dict[int, Tuple[int, int]] = {}
+
+    def screen(self, page_num: int) -> Optional[Tuple[str, Optional[int]]]:
+        """None si hay que clasificarla; (BLANK, None) o (DUPLICATE, página de referencia)"""
+        fingerprint = self.session.run_on_page(page_num, fingerprint_page)
+
+        if fingerprint.blank:
+            self.blank_pages.append(page_num)
+            _count("en_blanco")
+            return BLANK, None
+
+        for seen_page, seen in self._seen:
+            distance = fingerprint.distance(seen)
+            if distance <= DUPLICATE_MAX_DISTANCE and _similar_ink(fingerprint.ink, seen.ink):
+                self.duplicates[page_num] = (seen_page, distance)
+                _count("duplicadas")
+                return DUPLICATE, seen_page
+
+        self._seen.append((page_num, fingerprint))
+        _count("paginas")
+        return None
+
+    def report(self) -> List[Dict]:
+        """Páginas omitidas o reutilizadas, numeradas desde 1, para el resultado del workflow"""
+        skipped = [{"pagina": page_num + 1, "motivo": BLANK} for page_num in self.blank_pages]
+        skipped += [
+            {"pagina": page_num + 1, "motivo": DUPLICATE, "duplicado_de": ref + 1, "distancia": distance}
+            for page_num, (ref, distance) in self.duplicates.items()
+        ]
+        return sorted(skipped, key=lambda entry: entry["pagina"])
+
+
+def _similar_ink(a: float, b: float) -> bool:
+    return abs(a - b) <= DUPLICATE_MAX_INK_DELTA * max(a, b)
+
+
+def _count(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def screening_stats() -> Dict:
+    """Páginas en blanco y duplicadas detectadas en este proceso"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["total"] = stats["paginas"] + stats["en_blanco"] + stats["duplicadas"]
+    stats["habilitado"] = PAGE_SCREENING_ENABLED
+    return stats
@@ -0,0 +1,140 @@
+# api-docs/page_preview.py
+"""Vistas previas por página de los PDFs del almacén de artefactos
+
+Una miniatura o vista previa de la página N se renderiza una sola vez con
+fitz y queda en CACHE_DIR/previews, con TTL y límite de tamaño como los
+artefactos. La clave es el hash de (artefacto, página, ancho, formato,
+calidad): como el artefacto se direcciona por su contenido, una vista
+previa nunca cambia y su clave sirve de ETag.
+"""
+import os
+import threading
+from typing import Dict, Tuple
+
+import fitz  # pymupdf
+
+from artifact_store import ArtifactStore, artifact_store
+from disk_cache import content_hash
+
+PREVIEW_TTL = int(os.getenv('PREVIEW_TTL', str(7 * 24 * 3600)))
+PREVIEW_MAX_BYTES = int(os.getenv('PREVIEW_MAX_BYTES', str(512 * 1024 ** 2)))
+PREVIEW_DEFAULT_WIDTH = int(os.getenv('PREVIEW_DEFAULT_WIDTH', '300'))
+PREVIEW_MIN_WIDTH = 16
+PREVIEW_MAX_WIDTH = int(os.getenv('PREVIEW_MAX_WIDTH', '2000'))
+PREVIEW_JPEG_QUALITY = int(os.getenv('PREVIEW_JPEG_QUALITY', '75'))
+# Renderizados simultáneos: fitz retiene el GIL y una página a 2000 px ocupa ~12 MB
+PREVIEW_MAX_CONCURRENCY = int(os.getenv('PREVIEW_MAX_CONCURRENCY', '2'))
+
+# formato -> (extensión de fitz, media type)
+FORMATS = {
+    "jpeg": ("jpg", "image/jpeg"),
+    "png": ("png", "image/png"),
+}
+
+
+class PageOutOfRange(ValueError):
+    pass
+
+
+def preview_key(artifact_id: str, page: int, width: int, fmt: str) -> str:
+    """Id de la vista previa (SHA-256, válido como id del almacén y como ETag)"""
+    quality = PREVIEW_JPEG_QUALITY if fmt == "jpeg" else 0
+    return content_hash(f"{artifact_id}:{page}:{width}:{fmt}:{quality}".encode())
+
+
+def etag(key: str) -> str:
+    return f'"{key}"'
+
+
+def etag_matches(if_none_match: str, key: str) -> bool:
+    """If-None-Match con uno o varios ETags, fuertes o débiles, o *"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag(key):
+            return True
+    return False
+
+
+def render_page(pdf_path: str, page: int, width: int, fmt: str) -> bytes:
+    """Página (desde 1) escalada al ancho indicado, sin canal alfa"""
+    doc = fitz.open(pdf_path)
+    try:
+        if not 1 <= page <= doc.page_count:
+            raise PageOutOfRange(f"El documento tiene {doc.page_count} páginas")
+        pdf_page = doc[page - 1]
+        zoom = width / pdf_page.rect.width
+        pix = pdf_page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        if fmt == "jpeg":
+            return pix.tobytes("jpg", jpg_quality=PREVIEW_JPEG_QUALITY)
+        return pix.tobytes("png")
+    finally:
+        doc.close()
+
+
+def page_count(pdf_path: str) -> int:
+    doc = fitz.open(pdf_path)
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
+
+
+class PreviewService:
+    """Vistas previas servidas desde disco o renderizadas bajo demanda"""
+
+    def __init__(self, max_concurrency: int = PREVIEW_MAX_CONCURRENCY):
+        # Un almacén por formato: la extensión del archivo es la del formato
+        self.stores = {
+            fmt: ArtifactStore("previews", ttl_seconds=PREVIEW_TTL, max_bytes=PREVIEW_MAX_BYTES // len(FORMATS),
+                               suffix=f".{ext}")
+            for fmt, (ext, _) in FORMATS.items()
+        }
+        self._render_slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self._lock = threading.Lock()
+        self._stats = {"renderizadas": 0, "en_cache": 0, "no_modificadas": 0}
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def not_modified(self):
+        """Registrar una respuesta 304 (el cliente ya tenía la vista previa)"""
+        self._count("no_modificadas")
+
+    def get(self, artifact_id: str, page: int, width: int, fmt: str) -> Tuple[str, str]:
+        """(ruta de la imagen, clave) de la vista previa; renderiza si no está en disco
+
+        KeyError si el artefacto no existe o expiró, PageOutOfRange si la
+        página no existe.
+        """
+        key = preview_key(artifact_id, page, width, fmt)
+        store = self.stores[fmt]
+        path = store.path(key)
+        if path is not None:
+            self._count("en_cache")
+            return path, key
+
+        pdf_path = artifact_store.path(artifact_id)
+        if pdf_path is None:
+            raise KeyError(artifact_id)
+        with self._render_slots:
+            # Otra petición pudo renderizarla mientras se esperaba turno
+            path = store.path(key)
+            if path is not None:
+                self._count("en_cache")
+                return path, key
+            image = render_page(pdf_path, page, width, fmt)
+            store.put(image, key)
+        self._count("renderizadas")
+        return store.path(key), key
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["almacenes"] = {fmt: store.stats() for fmt, store in self.stores.items()}
+        return stats
+
+
+preview_service = PreviewService()
@@ -0,0 +1,134 @@
+# api-docs/payload_slimming.py
+import fitz  # pymupdf
+import os
+import threading
+from typing import Dict, Optional, Tuple, Union
+from text_classifier import MIN_TEXT_CHARS
+
+# Reducir las páginas escaneadas antes de enviarlas a Azure
+PAYLOAD_SLIMMING_ENABLED = os.getenv('PAYLOAD_SLIMMING_ENABLED', 'true').lower() == 'true'
+# Sólo se renderiza si la imagen supera en este factor la resolución del perfil;
+# por debajo, renderizar cuesta más CPU de lo que ahorra en la subida
+MIN_DOWNSCALE = float(os.getenv('PAYLOAD_MIN_DOWNSCALE', '1.5'))
+
+
+class PayloadProfile:
+    """Calidad de renderizado de las páginas escaneadas para un tipo de llamada"""
+
+    def __init__(self, name: str, dpi: int, jpeg_quality: int, grayscale: bool):
+        self.name = name
+        self.dpi = dpi
+        self.jpeg_quality = jpeg_quality
+        self.grayscale = grayscale
+
+
+# El clasificador sólo necesita una vista general; la extracción necesita leer el texto
+PROFILES = {
+    "classification": PayloadProfile(
+        "classification",
+        dpi=int(os.getenv('CLASSIFY_RENDER_DPI', '96')),
+        jpeg_quality=int(os.getenv('CLASSIFY_JPEG_QUALITY', '60')),
+        grayscale=True
+    ),
+    "extraction": PayloadProfile(
+        "extraction",
+        dpi=int(os.getenv('EXTRACT_RENDER_DPI', '200')),
+        jpeg_quality=int(os.getenv('EXTRACT_JPEG_QUALITY', '80')),
+        grayscale=os.getenv('EXTRACT_GRAYSCALE', 'true').lower() == 'true'
+    ),
+}
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {
+    name: {"documentos": 0, "reducidos": 0, "paginas_renderizadas": 0, "bytes_originales": 0, "bytes_enviados": 0}
+    for name in PROFILES
+}
+
+
+def image_dpi(page: "fitz.Page") -> int:
+    """Resolución efectiva de la imagen más densa de la página (sin decodificarla)"""
+    best = 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"])
+        if bbox.width > 0:
+            best = max(best, info["width"] / (bbox.width / 72))
+    # Los bbox redondeados dan, por ejemplo, 300.1 para un escaneo de 300 dpi
+    return round(best)
+
+
+def slim_pdf(pdf: Union[bytes, str], purpose: str) -> Union[bytes, str]:
+    """PDF con las páginas escaneadas renderizadas según el perfil del propósito
+
+    Las páginas con capa de texto o sin imágenes de alta resolución se copian
+    tal cual: ya son livianas y el texto embebido sirve a Azure. Si el resultado no es más pequeño que el
+    original se devuelve el original sin cambios (bytes o ruta).
+    """
+    if PROFILES[purpose].dpi <= 0:
+        # Perfil desactivado (*_RENDER_DPI=0)
+        return pdf
+
+    slim, original_size, rendered = render_scanned(pdf, purpose)
+    reduced = record_slimming(purpose, original_size, len(slim) if slim is not None else None, rendered)
+    return slim if reduced else pdf
+
+
+def render_scanned(pdf: Union[bytes, str], purpose: str) -> Tuple[Optional[bytes], int, int]:
+    """Renderizar las páginas escaneadas: (PDF resultante o None si no hubo, tamaño original, páginas renderizadas)
+
+    Sin estado ni estadísticas: también corre en los procesos de pdf_workers.
+    """
+    profile = PROFILES[purpose]
+    src = fitz.open(pdf) if isinstance(pdf, str) else fitz.open("pdf", pdf)
+    out = fitz.open()
+    rendered = 0
+
+    try:
+        original_size = os.path.getsize(pdf) if isinstance(pdf, str) else len(pdf)
+        colorspace = fitz.csGRAY if profile.grayscale else fitz.csRGB
+
+        for page in src:
+            if (len(page.get_text().strip()) >= MIN_TEXT_CHARS
+                    or image_dpi(page) <= profile.dpi * MIN_DOWNSCALE):
+                out.insert_pdf(src, from_page=page.number, to_page=page.number)
+                continue
+
+            pix = page.get_pixmap(dpi=profile.dpi, colorspace=colorspace)
+            image = pix.tobytes("jpeg", jpg_quality=profile.jpeg_quality)
+            new_page = out.new_page(width=page.rect.width, height=page.rect.height)
+            new_page.insert_image(new_page.rect, stream=image)
+            rendered += 1
+
+        slim = out.write(garbage=3, deflate=True, no_new_id=True) if rendered else None
+    finally:
+        out.close()
+        src.close()
+
+    return slim, original_size, rendered
+
+
+def record_slimming(purpose: str, original_size: int, slim_size: Optional[int], rendered: int) -> bool:
+    """Sumar un documento a las estadísticas; True si el resultado es más pequeño que el original"""
+    reduced = slim_size is not None and slim_size < original_size
+
+    with _stats_lock:
+        stats = _stats[purpose]
+        stats["documentos"] += 1
+        stats["reducidos"] += int(reduced)
+        stats["paginas_renderizadas"] += rendered if reduced else 0
+        stats["bytes_originales"] += original_size
+        stats["bytes_enviados"] += slim_size if reduced else original_size
+
+    return reduced
+
+
+def payload_stats() -> Dict:
+    """Bytes enviados a Azure frente a los originales, por perfil"""
+    with _stats_lock:
+        stats = {name: dict(counters) for name, counters in _stats.items()}
+    for name, counters in stats.items():
+        original = counters["bytes_originales"]
+        counters["reduccion_pct"] = round((1 - counters["bytes_enviados"] / original) * 100, 2) if original else 0.0
+        profile = PROFILES[name]
+        counters["perfil"] = {"dpi": profile.dpi, "jpeg_quality": profile.jpeg_quality, "grayscale": profile.grayscale}
+    stats["habilitado"] = PAYLOAD_SLIMMING_ENABLED
+    return stats
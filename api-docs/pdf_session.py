@@ -0,0 +1,148 @@
+# api-docs/pdf_session.py
+import os
+import fitz  # pymupdf
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Callable, List, Optional, Tuple, TypeVar, Union
+
+# Memoria máxima para PDFs de rango ya generados (páginas sueltas reutilizadas al reagrupar)
+PDF_SESSION_CACHE_BYTES = int(os.getenv('PDF_SESSION_CACHE_BYTES', str(16 * 1024 * 1024)))
+
+T = TypeVar("T")
+
+
+class PdfSession:
+    """PDF de origen parseado una sola vez para separar y reagrupar páginas
+
+    Acepta los bytes del PDF o la ruta de un archivo; con una ruta, fitz lee
+    del disco bajo demanda en vez de mantener el original en memoria.
+    """
+
+    def __init__(self, pdf: Union[bytes, str], cache_bytes: int = PDF_SESSION_CACHE_BYTES):
+        self.doc = fitz.open(pdf) if isinstance(pdf, str) else fitz.open("pdf", pdf)
+        self._path: Optional[str] = pdf if isinstance(pdf, str) else None
+        self._source: Optional[bytes] = None if isinstance(pdf, str) else pdf
+        self._spilled = False
+        self.page_count = len(self.doc)
+        self.cache_bytes = cache_bytes
+        self._ranges: "OrderedDict[Tuple[int, ...], bytes]" = OrderedDict()
+        self._cached_size = 0
+        # Un documento fitz no admite acceso concurrente
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def __len__(self):
+        return self.page_count
+
+    def page_bytes(self, page_num: int) -> bytes:
+        """PDF de una sola página"""
+        return self.range_bytes([page_num])
+
+    def run_on_page(self, page_num: int, fn: Callable[["fitz.Page"], T]) -> T:
+        """Ejecutar fn sobre una página del original con acceso exclusivo al documento"""
+        with self._lock:
+            return fn(self.doc[page_num])
+
+    def pages(self) -> "LazyPages":
+        """Secuencia de PDFs de una página generados al accederlos"""
+        return LazyPages(self)
+
+    def range_bytes(self, page_numbers: List[int]) -> bytes:
+        """PDF con las páginas indicadas, memorizado por combinación de páginas"""
+        key = tuple(page_numbers)
+
+        with self._lock:
+            cached = self._ranges.get(key)
+            if cached is not None:
+                self._ranges.move_to_end(key)
+                return cached
+
+            pdf_bytes = build_range(self.doc, key)
+            self._remember(key, pdf_bytes)
+            return pdf_bytes
+
+    def source_path(self, directory: Optional[str] = None) -> str:
+        """Ruta del PDF original en disco, para trabajar sobre él desde otro proceso
+
+        Si la sesión se abrió con bytes se vuelcan una sola vez a un temporal
+        en directory, que se borra al cerrar la sesión.
+        """
+        with self._lock:
+            if self._path is None:
+                fd, path = tempfile.mkstemp(suffix=".pdf", dir=directory)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(self._source)
+                self._path = path
+                self._spilled = True
+            return self._path
+
+    def _remember(self, key: Tuple[int, ...], pdf_bytes: bytes):
+        """Guardar el rango generado descartando los menos recientes si se excede el límite"""
+        if len(pdf_bytes) > self.cache_bytes:
+            return
+        self._ranges[key] = pdf_bytes
+        self._cached_size += len(pdf_bytes)
+        while self._cached_size > self.cache_bytes:
+            _, old = self._ranges.popitem(last=False)
+            self._cached_size -= len(old)
+
+    def close(self):
+        self._ranges.clear()
+        self._cached_size = 0
+        if not self.doc.is_closed:
+            self.doc.close()
+        if self._spilled:
+            self._spilled = False
+            try:
+                os.remove(self._path)
+            except FileNotFoundError:
+                pass
+
+
+class LazyPages(Sequence):
+    """Páginas de una sesión como secuencia, sin generarlas todas a la vez"""
+
+    def __init__(self, session: PdfSession):
+        self.session = session
+
+    def __len__(self):
+        return self.session.page_count
+
+    def __getitem__(self, page_num):
+        if isinstance(page_num, slice):
+            return [self.session.page_bytes(i) for i in range(*page_num.indices(len(self)))]
+        if page_num < 0:
+            page_num += len(self)
+        if not 0 <= page_num < len(self):
+            raise IndexError(page_num)
+        return self.session.page_bytes(page_num)
+
+
+def build_range(doc: "fitz.Document", page_numbers: Tuple[int, ...]) -> bytes:
+    """PDF con las páginas indicadas de doc"""
+    new_doc = fitz.open()
+    try:
+        for start, end in _contiguous_runs(page_numbers):
+            new_doc.insert_pdf(doc, from_page=start, to_page=end)
+        # Sin /ID nuevo la salida es determinista para las mismas páginas
+        return new_doc.write(no_new_id=True)
+    finally:
+        new_doc.close()
+
+
+def _contiguous_runs(page_numbers: Tuple[int, ...]) -> List[Tuple[int, int]]:
+    """Agrupar números de página en tramos consecutivos (inicio, fin)"""
+    runs = []
+    for page_num in page_numbers:
+        if runs and page_num == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], page_num)
+        else:
+            runs.append((page_num, page_num))
+    return runs
@@ -0,0 +1,214 @@
+# api-docs/pdf_workers.py
+"""Pool de procesos para el trabajo de CPU con fitz
+
+PyMuPDF retiene el GIL mientras arma PDFs y renderiza escaneos, así que con
+varios despachos a la vez los hilos se turnan en un solo núcleo. Con
+PDF_PROCESS_POOL_SIZE > 0 la reducción de páginas y el armado de grupos
+corren en procesos aparte. Los bytes no viajan por el pipe: el original se
+pasa por ruta (la subida volcada a disco, o un temporal si llegó en
+memoria), las páginas sueltas por memoria compartida, y el resultado vuelve
+como un archivo en el directorio de trabajo que el proceso principal lee y
+borra.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple, Union
+
+import fitz  # pymupdf
+
+import payload_slimming
+from pdf_session import build_range
+
+# Procesos del pool (0 = el trabajo de fitz corre en los hilos del workflow)
+PDF_PROCESS_POOL_SIZE = int(os.getenv('PDF_PROCESS_POOL_SIZE', '0'))
+# Cada proceso se reemplaza tras este número de tareas para acotar la memoria de fitz
+PDF_POOL_MAX_TASKS_PER_CHILD = int(os.getenv('PDF_POOL_MAX_TASKS_PER_CHILD', '500'))
+PDF_WORK_DIR = os.getenv('PDF_WORK_DIR', os.path.join(tempfile.gettempdir(), 'api-docs-pdf'))
+
+# Entrada de una tarea: ruta de un PDF o (nombre, tamaño) de un bloque de memoria compartida
+Source = Union[str, Tuple[str, int]]
+
+
+# Tareas (corren en los procesos del pool)
+
+def _load(source: Source) -> Union[str, bytes]:
+    if isinstance(source, str):
+        return source
+    name, size = source
+    # El bloque pertenece al proceso principal, que lo libera al terminar la tarea
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return bytes(shm.buf[:size])
+    finally:
+        shm.close()
+
+
+def _write(work_dir: str, data: bytes) -> str:
+    fd, path = tempfile.mkstemp(suffix=".pdf", dir=work_dir)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    return path
+
+
+def _slim_task(source: Source, purpose: str, work_dir: str) -> Tuple[Optional[str], int, int]:
+    slim, original_size, rendered = payload_slimming.render_scanned(_load(source), purpose)
+    return (_write(work_dir, slim) if slim is not None else None), original_size, rendered
+
+
+def _assemble_task(
+    source_path: str, page_numbers: List[int], purpose: Optional[str], work_dir: str
+) -> Tuple[str, Optional[str], int, int]:
+    doc = fitz.open(source_path)
+    try:
+        pdf_bytes = build_range(doc, tuple(page_numbers))
+    finally:
+        doc.close()
+    pdf_path = _write(work_dir, pdf_bytes)
+    if purpose is None:
+        return pdf_path, None, len(pdf_bytes), 0
+    slim, original_size, rendered = payload_slimming.render_scanned(pdf_bytes, purpose)
+    return pdf_path, (_write(work_dir, slim) if slim is not None else None), original_size, rendered
+
+
+def _read_and_remove(path: str) -> bytes:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+class PdfWorkerPool:
+    """Procesos para reducir y armar PDFs, recreados si uno termina de forma abrupta"""
+
+    def __init__(self, size: int, max_tasks_per_child: int = PDF_POOL_MAX_TASKS_PER_CHILD,
+                 work_dir: str = PDF_WORK_DIR):
+        self.size = size
+        self.max_tasks_per_child = max_tasks_per_child
+        self.base_dir = work_dir
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._work_dir: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stats = {"tareas": 0, "errores": 0, "reinicios": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    @property
+    def work_dir(self) -> str:
+        """Directorio propio de este pool (varios workers de uvicorn comparten PDF_WORK_DIR)"""
+        with self._lock:
+            if self._work_dir is None:
+                os.makedirs(self.base_dir, exist_ok=True)
+                self._work_dir = tempfile.mkdtemp(prefix="pool-", dir=self.base_dir)
+            return self._work_dir
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: el proceso principal tiene hilos y fork podría copiar locks tomados
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.size,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    max_tasks_per_child=self.max_tasks_per_child or None
+                )
+            return self._executor
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            # Varias tareas ven el mismo pool roto: sólo la primera lo reemplaza
+            if self._executor is not broken:
+                return
+            self._executor = None
+            self._stats["reinicios"] += 1
+        print("   ⚠️ Un proceso del pool de PDF terminó de forma abrupta, se reinicia el pool")
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, fn, *args):
+        """Ejecutar una tarea; si el pool se rompe se reintenta una vez en uno nuevo"""
+        work_dir = self.work_dir
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                result = executor.submit(fn, *args, work_dir).result()
+                with self._lock:
+                    self._stats["tareas"] += 1
+                return result
+            except BrokenProcessPool:
+                self._restart(executor)
+                if attempt:
+                    with self._lock:
+                        self._stats["errores"] += 1
+                    raise
+            except Exception:
+                with self._lock:
+                    self._stats["errores"] += 1
+                raise
+
+    def slim(self, pdf: Union[bytes, str], purpose: str) -> Union[bytes, str]:
+        """Equivalente a payload_slimming.slim_pdf ejecutado en el pool"""
+        if payload_slimming.PROFILES[purpose].dpi <= 0:
+            return pdf
+        if isinstance(pdf, str):
+            slim_path, original_size, rendered = self._run(_slim_task, pdf, purpose)
+        else:
+            shm = shared_memory.SharedMemory(create=True, size=max(1, len(pdf)))
+            try:
+                shm.buf[:len(pdf)] = pdf
+                slim_path, original_size, rendered = self._run(_slim_task, (shm.name, len(pdf)), purpose)
+            finally:
+                shm.close()
+                shm.unlink()
+        return self._slim_result(pdf, purpose, slim_path, original_size, rendered)
+
+    def assemble(
+        self, source_path: str, page_numbers: List[int], purpose: Optional[str] = None
+    ) -> Tuple[bytes, Union[bytes, None]]:
+        """PDF con las páginas indicadas del original y, si hay purpose, su versión reducida"""
+        if purpose is not None and payload_slimming.PROFILES[purpose].dpi <= 0:
+            purpose = None
+        pdf_path, slim_path, original_size, rendered = self._run(
+            _assemble_task, source_path, list(page_numbers), purpose
+        )
+        pdf_bytes = _read_and_remove(pdf_path)
+        if purpose is None:
+            return pdf_bytes, None
+        return pdf_bytes, self._slim_result(pdf_bytes, purpose, slim_path, original_size, rendered)
+
+    def _slim_result(self, pdf: Union[bytes, str], purpose: str, slim_path: Optional[str],
+                     original_size: int, rendered: int) -> Union[bytes, str]:
+        # Las estadísticas de reducción viven en el proceso principal
+        slim = _read_and_remove(slim_path) if slim_path is not None else None
+        reduced = payload_slimming.record_slimming(
+            purpose, original_size, len(slim) if slim is not None else None, rendered
+        )
+        return slim if reduced else pdf
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({
+            "habilitado": self.enabled,
+            "procesos": self.size,
+            "tareas_por_proceso": self.max_tasks_per_child,
+        })
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            work_dir, self._work_dir = self._work_dir, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if work_dir is not None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+pdf_pool = PdfWorkerPool(PDF_PROCESS_POOL_SIZE)
@@ -0,0 +1,292 @@
+# api-docs/result_store.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple, Iterable
+from disk_cache import CACHE_DIR
+
+# Resultados de procesos y documentos servidos por /download y /jobs
+RESULT_STORE_TTL = int(os.getenv('RESULT_STORE_TTL', str(24 * 3600)))
+RESULT_STORE_MAX_BYTES = int(os.getenv('RESULT_STORE_MAX_BYTES', str(4 * 1024 ** 3)))
+# Presupuesto de memoria por proceso para resultados recientes (su JSON, sin pasar por SQLite)
+RESULT_STORE_MEMORY_BYTES = int(os.getenv('RESULT_STORE_MEMORY_BYTES', str(256 * 1024 ** 2)))
+# Los resultados mayores se guardan como archivo aparte en vez de dentro de SQLite
+RESULT_STORE_SPILL_BYTES = int(os.getenv('RESULT_STORE_SPILL_BYTES', str(256 * 1024)))
+
+
+class ResultStore:
+    """Resultados compartidos entre los workers de un host en CACHE_DIR, con TTL y límites de memoria y disco
+
+    SQLite y archivos en un volumen local: varias réplicas en distintos
+    hosts no ven los resultados de las otras.
+
+    La memoria guarda el JSON de cada resultado y get lo decodifica en cada
+    llamada: quien llama recibe su propio objeto. Los namespaces de
+    volatile_namespaces se reescriben desde otros workers (el estado de un
+    trabajo) y se leen siempre de disco; el resto se escribe una sola vez
+    por clave y su copia en memoria es válida hasta el TTL.
+    """
+
+    def __init__(self, name: str, ttl_seconds: int, max_bytes: int, memory_bytes: int, spill_bytes: int,
+                 volatile_namespaces: Iterable[str] = ()):
+        self.name = name
+        self.volatile_namespaces = frozenset(volatile_namespaces)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.spill_bytes = spill_bytes
+        self.path = os.path.join(CACHE_DIR, f"{name}.sqlite3")
+        self.spill_dir = os.path.join(CACHE_DIR, name)
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[str, int, float]]" = OrderedDict()
+        self._memory_size = 0
+        self._counters = {
+            "puts": 0, "hits_memory": 0, "hits_disk": 0, "misses": 0,
+            "spilled": 0, "evictions": 0, "expired": 0, "memory_evictions": 0
+        }
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(self.spill_dir, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT,
+                    file TEXT,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results(accessed_at)")
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def _remember(self, mem_key: Tuple[str, str], payload: str, size: int, created_at: float):
+        """Guardar el JSON en la LRU de memoria respetando el presupuesto del proceso"""
+        if size > self.memory_bytes or mem_key[0] in self.volatile_namespaces:
+            return
+        with self._lock:
+            previous = self._memory.pop(mem_key, None)
+            if previous is not None:
+                self._memory_size -= previous[1]
+            self._memory[mem_key] = (payload, size, created_at)
+            self._memory_size += size
+            while self._memory_size > self.memory_bytes:
+                _, (_, old_size, _) = self._memory.popitem(last=False)
+                self._memory_size -= old_size
+                self._counters["memory_evictions"] += 1
+
+    def _forget(self, mem_key: Tuple[str, str]):
+        with self._lock:
+            previous = self._memory.pop(mem_key, None)
+            if previous is not None:
+                self._memory_size -= previous[1]
+
+    def _spill_path(self, namespace: str, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{namespace}-{key}.json")
+
+    def put(self, namespace: str, key: str, value: Any):
+        """Guardar un resultado serializable como JSON"""
+        now = time.time()
+        spill_file = self._spill_path(namespace, key)
+        os.makedirs(self.spill_dir, exist_ok=True)
+        tmp_path = f"{spill_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        # Se codifica por trozos directamente al archivo: resultados grandes no
+        # se copian a un único texto en memoria. Con ensure_ascii, caracteres = bytes.
+        with open(tmp_path, "w", encoding="ascii") as f:
+            json.dump(value, f, default=str)
+            size = f.tell()
+
+        payload = None
+        if size > self.spill_bytes:
+            os.replace(tmp_path, spill_file)
+            self._count("spilled")
+        else:
+            with open(tmp_path, encoding="ascii") as f:
+                payload = f.read()
+            os.remove(tmp_path)
+            spill_file = None
+
+        conn = self._connect()
+        try:
+            previous = conn.execute(
+                "SELECT file FROM results WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO results (namespace, key, value, file, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (namespace, key, payload, spill_file, size, now, now)
+            )
+            self._evict(conn, now)
+            conn.commit()
+        finally:
+            conn.close()
+
+        # La versión anterior estaba en archivo y la nueva cabe en SQLite: el
+        # archivo (misma ruta para la clave) no lo reemplazó nadie
+        if previous and previous[0] and spill_file is None:
+            try:
+                os.remove(previous[0])
+            except FileNotFoundError:
+                pass
+
+        self._count("puts")
+        # Los resultados en archivo se cargan en memoria con el primer get
+        if payload is not None:
+            self._remember((namespace, key), payload, size, now)
+        else:
+            self._forget((namespace, key))
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Resultado vigente o None, desde memoria o desde disco"""
+        mem_key = (namespace, key)
+        now = time.time()
+
+        with self._lock:
+            cached = self._memory.get(mem_key)
+            if cached is not None and now - cached[2] <= self.ttl_seconds:
+                self._memory.move_to_end(mem_key)
+                self._counters["hits_memory"] += 1
+        if cached is not None:
+            if now - cached[2] <= self.ttl_seconds:
+                return json.loads(cached[0])
+            self._forget(mem_key)
+
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT value, file, size, created_at FROM results WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row and now - row[3] > self.ttl_seconds:
+                self._delete_row(conn, namespace, key, row[1])
+                conn.commit()
+                self._count("expired")
+                row = None
+            if row:
+                conn.execute(
+                    "UPDATE results SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, key)
+                )
+                conn.commit()
+        finally:
+            conn.close()
+
+        if not row:
+            self._count("misses")
+            return None
+
+        payload, spill_file, size, created_at = row
+        if spill_file:
+            try:
+                with open(spill_file, encoding="utf-8") as f:
+                    payload = f.read()
+            except FileNotFoundError:
+                self._count("misses")
+                return None
+
+        value = json.loads(payload)
+        self._count("hits_disk")
+        self._remember(mem_key, payload, size, created_at)
+        return value
+
+    def __contains__(self, item: Tuple[str, str]) -> bool:
+        return self.get(*item) is not None
+
+    def delete(self, namespace: str, key: str):
+        self._forget((namespace, key))
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT file FROM results WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            if row:
+                self._delete_row(conn, namespace, key, row[0])
+                conn.commit()
+        finally:
+            conn.close()
+
+    def _delete_row(self, conn: sqlite3.Connection, namespace: str, key: str, spill_file: Optional[str]):
+        conn.execute("DELETE FROM results WHERE namespace = ? AND key = ?", (namespace, key))
+        self._forget((namespace, key))
+        if spill_file:
+            try:
+                os.remove(spill_file)
+            except FileNotFoundError:
+                pass
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Eliminar expirados y, si se excede el límite de disco, los menos usados recientemente"""
+        expired = conn.execute(
+            "SELECT namespace, key, file FROM results WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).fetchall()
+        for namespace, key, spill_file in expired:
+            self._delete_row(conn, namespace, key, spill_file)
+        if expired:
+            self._count("expired", len(expired))
+
+        total_size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if not self.max_bytes or total_size <= self.max_bytes:
+            return
+
+        evicted = 0
+        rows = conn.execute("SELECT namespace, key, file, size FROM results ORDER BY accessed_at ASC").fetchall()
+        for namespace, key, spill_file, size in rows:
+            if total_size <= self.max_bytes:
+                break
+            self._delete_row(conn, namespace, key, spill_file)
+            total_size -= size
+            evicted += 1
+        if evicted:
+            self._count("evictions", evicted)
+
+    def stats(self) -> Dict:
+        """Contadores del proceso, ocupación de memoria y tamaño en disco"""
+        with self._lock:
+            counters = dict(self._counters)
+            counters["memory_entries"] = len(self._memory)
+            counters["memory_bytes"] = self._memory_size
+        counters["memory_budget_bytes"] = self.memory_bytes
+        counters["max_bytes"] = self.max_bytes
+        counters["ttl_seconds"] = self.ttl_seconds
+
+        try:
+            conn = self._connect()
+            try:
+                counters["entries"], counters["bytes"], counters["spilled_entries"] = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0), COUNT(file) FROM results"
+                ).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
+
+        return counters
+
+
+result_store = ResultStore(
+    "results",
+    ttl_seconds=RESULT_STORE_TTL,
+    max_bytes=RESULT_STORE_MAX_BYTES,
+    memory_bytes=RESULT_STORE_MEMORY_BYTES,
+    spill_bytes=RESULT_STORE_SPILL_BYTES,
+    # jobs.JobManager publica aquí el estado de cada trabajo a medida que avanza
+    volatile_namespaces=("job",)
+)
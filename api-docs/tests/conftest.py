@@ -0,0 +1,18 @@
+# api-docs/tests/conftest.py
+"""Entorno de las pruebas: módulos de api-docs importables, caché temporal y Azure ficticio
+
+Uso: cd api-docs && python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Antes de importar los módulos: CACHE_DIR y el cliente de Azure se leen al importar
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="api-docs-tests-"))
+os.environ.setdefault("AZURE_FORM_RECOGNIZER_ENDPOINT", "https://localhost")
+os.environ.setdefault("AZURE_FORM_RECOGNIZER_KEY", "test")
+
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
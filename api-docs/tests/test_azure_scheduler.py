@@ -0,0 +1,104 @@
+# api-docs/tests/test_azure_scheduler.py
+"""AzureScheduler: orden por prioridad en la cola de un modelo y pausa tras 429/503"""
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from azure.core.exceptions import HttpResponseError
+
+import azure_scheduler
+from azure_scheduler import BULK, INTERACTIVE, AzureScheduler
+
+MODEL = "modelo"
+
+
+def http_error(status_code, headers=None):
+    error = HttpResponseError(message=f"HTTP {status_code}")
+    error.status_code = status_code
+    error.response = SimpleNamespace(headers=headers or {})
+    return error
+
+
+def drain(scheduler, model_id=MODEL):
+    """Dejar el bucket sin tokens: cada llamada siguiente espera 1 / tps"""
+    with scheduler._cond:
+        bucket = scheduler._bucket(model_id)
+        bucket.tokens = 0.0
+        bucket.updated = time.monotonic()
+
+
+def wait_for_queue(scheduler, expected, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if sum(scheduler.queue_depth().values()) >= expected:
+            return
+        time.sleep(0.005)
+    raise AssertionError("las llamadas no llegaron a la cola")
+
+
+def test_interactive_overtakes_queued_bulk():
+    scheduler = AzureScheduler(tps=10, model_tps={})
+    drain(scheduler)
+    granted = []
+
+    def call(name, level):
+        scheduler.acquire(MODEL, level)
+        granted.append(name)
+
+    threads = [threading.Thread(target=call, args=(f"bulk-{i}", BULK)) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    wait_for_queue(scheduler, 3)
+    interactive = threading.Thread(target=call, args=("interactive", INTERACTIVE))
+    interactive.start()
+    for thread in threads + [interactive]:
+        thread.join(timeout=5)
+
+    assert granted[0] == "interactive"
+    assert sorted(granted[1:]) == ["bulk-0", "bulk-1", "bulk-2"]
+    assert scheduler.stats()["modelos"][MODEL]["concedidas"] == 4
+
+
+def test_models_have_independent_buckets():
+    scheduler = AzureScheduler(tps=1, model_tps={"rapido": 100})
+    drain(scheduler, "lento")
+    started = time.monotonic()
+    scheduler.acquire("rapido", BULK)
+    assert time.monotonic() - started < 0.5
+    assert scheduler.stats()["modelos"]["rapido"]["tps"] == 100
+
+
+def test_backoff_honours_retry_after():
+    scheduler = AzureScheduler(tps=100, model_tps={})
+    delay = scheduler.backoff(MODEL, http_error(429, {"retry-after-ms": "300"}), attempt=0)
+    assert delay == pytest.approx(0.3)
+
+    started = time.monotonic()
+    scheduler.acquire(MODEL, INTERACTIVE)
+    assert time.monotonic() - started >= 0.25
+    assert scheduler.stats()["modelos"][MODEL]["reintentos"] == 1
+
+
+def test_backoff_is_exponential_and_capped(monkeypatch):
+    monkeypatch.setattr(azure_scheduler, "AZURE_BACKOFF_BASE", 1.0)
+    monkeypatch.setattr(azure_scheduler, "AZURE_BACKOFF_MAX", 4.0)
+    scheduler = AzureScheduler(tps=100, model_tps={})
+    for attempt, upper in ((0, 1.0), (1, 2.0), (2, 4.0), (6, 4.0)):
+        delay = scheduler.backoff(MODEL, http_error(503), attempt)
+        # Jitter entre la mitad y el total del escalón
+        assert upper / 2 <= delay <= upper
+
+
+def test_async_acquire_respects_pause():
+    scheduler = AzureScheduler(tps=100, model_tps={})
+    scheduler.backoff(MODEL, http_error(429, {"Retry-After": "0.2"}), attempt=0)
+
+    async def acquire():
+        started = time.monotonic()
+        await scheduler.acquire_async(MODEL, BULK)
+        return time.monotonic() - started
+
+    assert asyncio.run(acquire()) >= 0.15
+    assert sum(scheduler.queue_depth().values()) == 0
@@ -0,0 +1,88 @@
+# api-docs/tests/test_dispatch_manifest.py
+"""DispatchManifest: qué páginas y documentos se reutilizan al resubir un despacho"""
+import uuid
+
+import fitz  # pymupdf
+import pytest
+
+from benchmarks.synthetic import build_dispatch_pdf
+from dispatch_manifest import PRINCIPAL, DispatchManifest
+from pdf_session import PdfSession
+
+CLASSIFIER = "clasificador-v1"
+MODELS = {"invoice": "factura-v1", "bill_of_lading": "transporte-v1"}
+
+
+def extraction_model(doc_type):
+    return MODELS.get(doc_type)
+
+
+def first_upload():
+    """Despacho de 3 páginas (factura, factura, transporte) ya procesado y guardado"""
+    numero = f"T-{uuid.uuid4().hex[:8]}"
+    pdf = build_dispatch_pdf(["factura", "factura", "transporte"])
+    session = PdfSession(pdf)
+    manifest = DispatchManifest.load(numero, PRINCIPAL, session, CLASSIFIER, extraction_model)
+    groups = [
+        {'start_page': 0, 'end_page': 1, 'doc_type': 'invoice', 'pages': [0, 1]},
+        {'start_page': 2, 'end_page': 2, 'doc_type': 'bill_of_lading', 'pages': [2]},
+    ]
+    documentos = [
+        {"procesado": True, "datos_extraidos": {"InvoiceId": "1"}},
+        {"procesado": False, "datos_extraidos": None},
+    ]
+    manifest.save(groups, documentos)
+    session.close()
+    return numero, pdf, groups
+
+
+@pytest.fixture
+def reupload():
+    """El mismo despacho con la página 2 (transporte) reemplazada"""
+    numero, pdf, groups = first_upload()
+    src = fitz.open("pdf", pdf)
+    other = fitz.open("pdf", build_dispatch_pdf(["transporte"] * 2))
+    doc = fitz.open()
+    doc.insert_pdf(src, from_page=0, to_page=1)
+    doc.insert_pdf(other, from_page=1, to_page=1)
+    session = PdfSession(doc.tobytes())
+    for d in (src, other, doc):
+        d.close()
+    yield numero, session, groups
+    session.close()
+
+
+def test_unchanged_pages_reuse_type(reupload):
+    numero, session, _ = reupload
+    manifest = DispatchManifest.load(numero, PRINCIPAL, session, CLASSIFIER, extraction_model)
+    assert manifest.previous is not None
+    assert manifest.known_type(0) == "invoice"
+    assert manifest.known_type(1) == "invoice"
+    assert manifest.known_type(2) is None
+    assert manifest.report()["paginas_reutilizadas"] == 2
+
+
+def test_only_successful_documents_are_carried(reupload):
+    numero, session, groups = reupload
+    manifest = DispatchManifest.load(numero, PRINCIPAL, session, CLASSIFIER, extraction_model)
+    carried = manifest.carried_document(groups[0])
+    assert carried["datos_extraidos"] == {"InvoiceId": "1"}
+    # El transporte falló en la primera subida (y además cambió): se vuelve a extraer
+    assert manifest.carried_document(groups[1]) is None
+    # Mismas páginas con otro tipo: no es el mismo documento
+    assert manifest.carried_document(dict(groups[0], doc_type="bill_of_lading")) is None
+
+
+def test_model_change_discards_previous(reupload):
+    numero, session, groups = reupload
+    manifest = DispatchManifest.load(numero, PRINCIPAL, session, "clasificador-v2",
+                                     lambda doc_type: "factura-v2" if doc_type == "invoice" else extraction_model(doc_type))
+    assert manifest.known_type(0) is None
+    assert manifest.carried_document(groups[0]) is None
+
+
+def test_other_document_does_not_share_manifest(reupload):
+    numero, session, _ = reupload
+    manifest = DispatchManifest.load(numero, "adicional", session, CLASSIFIER, extraction_model)
+    assert manifest.previous is None
+    assert manifest.known_type(0) is None
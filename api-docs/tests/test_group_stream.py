@@ -0,0 +1,56 @@
+# api-docs/tests/test_group_stream.py
+"""GroupStream: mismos grupos que group_consecutive_pages, entregados en orden"""
+import random
+
+from document_processor import DocumentProcessor, GroupStream
+
+TYPES = ["invoice", "invoice", "bill_of_lading", "invoice", "packing_list", "packing_list", "invoice", "invoice"]
+SKIPPED = {1, 5}
+
+
+def stream_groups(order):
+    delivered = []
+    stream = GroupStream(len(TYPES), lambda index, group: delivered.append((index, dict(group, pages=list(group['pages'])))))
+    for page_num in order:
+        if page_num in SKIPPED:
+            stream.skip(page_num)
+        else:
+            stream.add(page_num, TYPES[page_num])
+    return stream, delivered
+
+
+def expected_groups():
+    classified = [(page_num, doc_type) for page_num, doc_type in enumerate(TYPES) if page_num not in SKIPPED]
+    return DocumentProcessor().group_consecutive_pages(classified, sorted(SKIPPED))
+
+
+def test_out_of_order_matches_batch_grouping():
+    expected = expected_groups()
+    for seed in range(20):
+        order = list(range(len(TYPES)))
+        random.Random(seed).shuffle(order)
+        stream, delivered = stream_groups(order)
+        assert stream.groups == expected
+        assert [index for index, _ in delivered] == list(range(len(expected)))
+        assert [group for _, group in delivered] == expected
+
+
+def test_group_closes_when_next_type_arrives():
+    stream, delivered = stream_groups([0])
+    assert delivered == []
+    # La página 1 se omite y no corta: el grupo sigue abierto hasta la página 2
+    stream.skip(1)
+    assert delivered == []
+    stream.add(2, TYPES[2])
+    assert delivered == [(0, {'start_page': 0, 'end_page': 0, 'doc_type': 'invoice', 'pages': [0]})]
+
+
+def test_waits_for_missing_page():
+    stream, delivered = stream_groups([2, 3, 4, 6, 7])
+    assert delivered == []
+    stream.add(0, TYPES[0])
+    stream.skip(1)
+    # Hasta la página 4 se resolvió todo: se cierran los grupos anteriores a packing_list
+    assert [group['doc_type'] for _, group in delivered] == ["invoice", "bill_of_lading", "invoice"]
+    stream.skip(5)
+    assert stream.groups == expected_groups()
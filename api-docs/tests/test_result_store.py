@@ -0,0 +1,102 @@
+# api-docs/tests/test_result_store.py
+"""ResultStore: desalojo de memoria y disco, TTL y archivos de resultados grandes"""
+import os
+
+import pytest
+
+import result_store as result_store_module
+from result_store import ResultStore
+
+VALUE = {"datos": "x" * 100}
+# Tamaño del JSON de VALUE
+SIZE = len('{"datos": "' + "x" * 100 + '"}')
+
+
+@pytest.fixture
+def make_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_store_module, "CACHE_DIR", str(tmp_path))
+
+    def make(**limits):
+        options = dict(ttl_seconds=3600, max_bytes=0, memory_bytes=10 * SIZE, spill_bytes=10 * SIZE)
+        options.update(limits)
+        return ResultStore("results", **options)
+    return make
+
+
+def test_memory_lru_evicts_least_recent(make_store):
+    store = make_store(memory_bytes=2 * SIZE)
+    store.put("ns", "a", VALUE)
+    store.put("ns", "b", VALUE)
+    store.get("ns", "a")
+    store.put("ns", "c", VALUE)
+
+    stats = store.stats()
+    assert stats["memory_entries"] == 2
+    assert stats["memory_evictions"] == 1
+    # b salió de memoria pero sigue en disco
+    assert store.get("ns", "b") == VALUE
+    assert store.stats()["hits_disk"] == 1
+
+
+def test_disk_limit_evicts_least_recently_accessed(make_store):
+    store = make_store(max_bytes=3 * SIZE)
+    for key in ("a", "b", "c"):
+        store.put("ns", key, VALUE)
+    store.get("ns", "a")
+    # Tocar a en disco: la memoria no actualiza accessed_at
+    store._forget(("ns", "a"))
+    store.get("ns", "a")
+    store.put("ns", "d", VALUE)
+
+    assert store.stats()["evictions"] == 1
+    assert store.get("ns", "b") is None
+    for key in ("a", "c", "d"):
+        assert store.get("ns", key) == VALUE
+
+
+def test_expired_entries_are_dropped(make_store):
+    store = make_store(ttl_seconds=0)
+    store.put("ns", "a", VALUE)
+    assert store.get("ns", "a") is None
+    stats = store.stats()
+    assert stats["entries"] == 0
+    assert stats["expired"] == 1
+
+
+def test_spilled_files_follow_their_entry(make_store):
+    store = make_store(max_bytes=3 * SIZE, spill_bytes=SIZE // 2)
+    store.put("ns", "a", VALUE)
+    spill_file = store._spill_path("ns", "a")
+    assert os.path.exists(spill_file)
+    assert store.get("ns", "a") == VALUE
+
+    # Reemplazado por un valor pequeño que cabe en SQLite: el archivo se borra
+    store.put("ns", "a", {"ok": True})
+    assert not os.path.exists(spill_file)
+    assert store.get("ns", "a") == {"ok": True}
+
+    # Desalojado por el límite de disco: el archivo también se borra
+    store.put("ns", "b", VALUE)
+    for key in ("c", "d", "e"):
+        store.put("ns", key, VALUE)
+    assert not os.path.exists(store._spill_path("ns", "b"))
+    assert sorted(os.listdir(store.spill_dir)) == sorted(
+        os.path.basename(store._spill_path("ns", key)) for key in ("c", "d", "e")
+    )
+
+
+def test_volatile_namespace_reads_other_writers(make_store):
+    # Dos workers del mismo host sobre el mismo CACHE_DIR
+    store = make_store(volatile_namespaces=("job",))
+    other_worker = make_store(volatile_namespaces=("job",))
+    store.put("job", "1", {"estado": "en_proceso"})
+    assert store.get("job", "1") == {"estado": "en_proceso"}
+    other_worker.put("job", "1", {"estado": "completado"})
+    assert store.get("job", "1") == {"estado": "completado"}
+
+
+def test_callers_get_independent_copies(make_store):
+    store = make_store()
+    store.put("ns", "a", {"lista": [1]})
+    store.get("ns", "a")["lista"].append(2)
+    assert store.get("ns", "a") == {"lista": [1]}
@@ -0,0 +1,24 @@
+# api-docs/tests/test_upload_memory.py
+"""Pico de memoria de un trabajo de despacho contra el límite documentado (cliente fake_azure)"""
+from benchmarks import bench_upload_memory
+from benchmarks.synthetic import build_dispatch_pdf, mixed_page_types
+from conftest import API_DIR
+
+PAGES = 150
+
+
+def test_dispatch_job_stays_under_rss_ceiling(tmp_path, monkeypatch):
+    pdf_path = tmp_path / "despacho.pdf"
+    pdf_path.write_bytes(build_dispatch_pdf(mixed_page_types(PAGES), scanned=True))
+    size = pdf_path.stat().st_size
+    ceiling = bench_upload_memory.JOB_MEMORY_BASE_MB * 1024 ** 2 + bench_upload_memory.JOB_MEMORY_FACTOR * size
+
+    # El subproceso se lanza con python -m benchmarks... desde api-docs
+    monkeypatch.chdir(API_DIR)
+    result = bench_upload_memory.measure(str(pdf_path), from_path=True)
+
+    assert result["error"] is None
+    assert result["documentos"] > 0
+    assert result["peak_bytes"] <= ceiling, (
+        f"pico +{result['peak_bytes'] / 1024 ** 2:.1f} MB, límite {ceiling / 1024 ** 2:.1f} MB"
+    )
@@ -0,0 +1,186 @@
+# api-docs/text_classifier.py
+import fitz  # pymupdf
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Clasificación local por capa de texto; bajo el umbral se consulta a Azure
+LOCAL_CLASSIFIER_ENABLED = os.getenv('LOCAL_CLASSIFIER_ENABLED', 'true').lower() == 'true'
+LOCAL_CLASSIFIER_THRESHOLD = float(os.getenv('LOCAL_CLASSIFIER_THRESHOLD', '0.8'))
+
+# Mínimo de caracteres para considerar que la página tiene capa de texto real
+MIN_TEXT_CHARS = 40
+
+# Fracción superior de la página considerada cabecera
+HEADER_FRACTION = 0.25
+HEADER_BOOST = 2.0
+TITLE_BOOST = 1.5
+
+# Suavizado de la confianza: evita decisiones seguras con pocas evidencias
+CONFIDENCE_SMOOTHING = 1.0
+
+# (frase, peso) por tipo interno
+KEYWORD_RULES: Dict[str, List[Tuple[str, float]]] = {
+    "factura": [
+        ("commercial invoice", 3.0),
+        ("invoice", 1.5),
+        ("factura comercial", 3.0),
+        ("factura", 2.0),
+        ("invoice no", 1.0),
+        ("unit price", 0.5),
+    ],
+    "transporte": [
+        ("bill of lading", 3.0),
+        ("air waybill", 3.0),
+        ("airway bill", 3.0),
+        ("conocimiento de embarque", 3.0),
+        ("guia aerea", 2.5),
+        ("b/l", 1.5),
+        ("awb", 1.5),
+        ("port of loading", 1.0),
+        ("port of discharge", 1.0),
+        ("vessel", 0.5),
+        ("shipper", 0.5),
+        ("consignee", 0.5),
+    ],
+    "packing_list": [
+        ("packing list", 3.0),
+        ("lista de empaque", 3.0),
+        ("gross weight", 0.5),
+        ("net weight", 0.5),
+        ("cartons", 0.5),
+    ],
+    "certificado": [
+        ("certificate of origin", 3.0),
+        ("certificado de origen", 3.0),
+    ],
+}
+
+
+def _compile(phrase: str) -> re.Pattern:
+    words = [re.escape(w) for w in phrase.split()]
+    return re.compile(r"(?<![a-z0-9])" + r"\s+".join(words) + r"(?![a-z0-9])")
+
+
+_COMPILED_RULES = {
+    doc_type: [(_compile(phrase), weight) for phrase, weight in rules]
+    for doc_type, rules in KEYWORD_RULES.items()
+}
+
+_ACCENTS = str.maketrans("áéíóúü", "aeiouu")
+
+# Contadores de decisiones locales vs. consultas remotas
+_stats_lock = threading.Lock()
+_stats = {"local": 0, "remoto": 0, "sin_evidencia": 0}
+
+
+def _normalize(text: str) -> str:
+    return text.lower().translate(_ACCENTS)
+
+
+def _page_regions(page: "fitz.Page") -> Tuple[str, str, str]:
+    """Texto completo, texto de cabecera y texto de títulos (fuente grande)"""
+    header_limit = page.rect.height * HEADER_FRACTION
+    spans = []
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                if span["text"].strip():
+                    spans.append(span)
+
+    if not spans:
+        return "", "", ""
+
+    sizes = sorted(span["size"] for span in spans)
+    median_size = sizes[len(sizes) // 2]
+
+    full_text = " ".join(span["text"] for span in spans)
+    header_text = " ".join(span["text"] for span in spans if span["bbox"][1] < header_limit)
+    title_text = " ".join(span["text"] for span in spans if span["size"] >= median_size * 1.3)
+    return _normalize(full_text), _normalize(header_text), _normalize(title_text)
+
+
+def score_page(page: "fitz.Page") -> Optional[Dict[str, float]]:
+    """Puntaje por tipo; None si la página no tiene capa de texto útil"""
+    full_text, header_text, title_text = _page_regions(page)
+    if len(full_text.strip()) < MIN_TEXT_CHARS:
+        return None
+
+    scores = {}
+    for doc_type, rules in _COMPILED_RULES.items():
+        score = 0.0
+        for pattern, weight in rules:
+            if not pattern.search(full_text):
+                continue
+            boost = 1.0
+            if pattern.search(header_text):
+                boost *= HEADER_BOOST
+            if pattern.search(title_text):
+                boost *= TITLE_BOOST
+            score += weight * boost
+        scores[doc_type] = score
+    return scores
+
+
+def classify_text_layer(page_bytes: bytes) -> Tuple[Optional[str], float]:
+    """Clasificar una página de un PDF por su texto. Devuelve (tipo, confianza)"""
+    doc = fitz.open("pdf", page_bytes)
+    try:
+        scores = score_page(doc[0]) if len(doc) else None
+    finally:
+        doc.close()
+
+    if not scores:
+        return None, 0.0
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    best_type, best_score = ranked[0]
+    second_score = ranked[1][1] if len(ranked) > 1 else 0.0
+
+    if best_score <= 0:
+        return None, 0.0
+
+    confidence = best_score / (best_score + second_score + CONFIDENCE_SMOOTHING)
+    return best_type, confidence
+
+
+def local_classification(page_bytes: bytes) -> Optional[str]:
+    """Tipo decidido localmente si supera el umbral; None para consultar a Azure"""
+    if not LOCAL_CLASSIFIER_ENABLED:
+        return None
+
+    try:
+        doc_type, confidence = classify_text_layer(page_bytes)
+    except Exception as e:
+        print(f"   ⚠️ Error en clasificación local: {e}")
+        doc_type, confidence = None, 0.0
+
+    if doc_type is None:
+        _count("sin_evidencia")
+        return None
+
+    if confidence >= LOCAL_CLASSIFIER_THRESHOLD:
+        print(f"   📝 Clasificación local: {doc_type} (confianza: {confidence:.2%})")
+        _count("local")
+        return doc_type
+
+    _count("remoto")
+    return None
+
+
+def _count(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def local_classifier_stats() -> Dict:
+    """Decisiones locales y llamadas a Azure evitadas en este proceso"""
+    with _stats_lock:
+        stats = dict(_stats)
+    total = sum(stats.values())
+    stats["total"] = total
+    stats["llamadas_evitadas_pct"] = round(stats["local"] / total * 100, 2) if total else 0.0
+    stats["umbral"] = LOCAL_CLASSIFIER_THRESHOLD
+    stats["habilitado"] = LOCAL_CLASSIFIER_ENABLED
+    return stats
@@ -0,0 +1,62 @@
+# api-docs/upload_spool.py
+import os
+import hashlib
+import tempfile
+from typing import BinaryIO
+from fastapi import UploadFile
+
+# Los PDFs subidos se copian aquí por bloques en vez de leerse completos en memoria
+UPLOAD_DIR = os.getenv('UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'api-docs-uploads'))
+UPLOAD_CHUNK_BYTES = int(os.getenv('UPLOAD_CHUNK_BYTES', str(1024 * 1024)))
+
+
+class SpooledPdf:
+    """Archivo subido volcado a disco, con su tamaño y hash calculados al copiarlo"""
+
+    def __init__(self, path: str, size: int, sha256: str, header: bytes):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.is_pdf = header.startswith(b'%PDF')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.delete()
+
+    def open(self) -> BinaryIO:
+        """Archivo abierto en modo binario, para enviarlo a Azure por streaming"""
+        return open(self.path, "rb")
+
+    def delete(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+async def spool_upload(file: UploadFile) -> SpooledPdf:
+    """Copiar la subida a un archivo temporal por bloques"""
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=".pdf", dir=UPLOAD_DIR)
+    digest = hashlib.sha256()
+    header = b""
+    size = 0
+
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                if len(header) < 4:
+                    header += chunk[:4 - len(header)]
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except Exception:
+        os.remove(path)
+        raise
+
+    return SpooledPdf(path, size, digest.hexdigest(), header)
@@ -313,6 +313,59 @@ def api_documento_pdf(numero, doc_id):
     except Exception as e:
         return jsonify({"error": "Error interno"}), 500
 
+@app.route('/api/despachos/<numero>/documento/<int:doc_id>/paginas')
+@login_required
+def api_documento_paginas(numero, doc_id):
+    """Número de páginas de un documento"""
+    try:
+        response = requests.get(
+            f"{DESPACHOS_API_URL}/despachos/{numero}/documento/{doc_id}/paginas",
+            timeout=60
+        )
+        
+        if response.status_code == 200:
+            return jsonify(response.json())
+        else:
+            return jsonify({"error": "Documento no encontrado"}), response.status_code
+            
+    except requests.exceptions.RequestException as e:
+        return jsonify({"error": "Error de conexión"}), 503
+    except Exception as e:
+        return jsonify({"error": "Error interno"}), 500
+
+@app.route('/api/despachos/<numero>/documento/<int:doc_id>/pagina/<int:pagina>/preview')
+@login_required
+def api_documento_preview(numero, doc_id, pagina):
+    """Vista previa JPEG de una página; el ETag viaja en ambos sentidos para responder 304"""
+    headers = {}
+    if request.headers.get('If-None-Match'):
+        headers['If-None-Match'] = request.headers['If-None-Match']
+    try:
+        response = requests.get(
+            f"{DESPACHOS_API_URL}/despachos/{numero}/documento/{doc_id}/pagina/{pagina}/preview",
+            params={"ancho": request.args.get('ancho', 600)},
+            headers=headers,
+            timeout=60
+        )
+        
+        if response.status_code in (200, 304):
+            return Response(
+                response.content if response.status_code == 200 else b'',
+                status=response.status_code,
+                mimetype='image/jpeg' if response.status_code == 200 else None,
+                headers={
+                    "ETag": response.headers.get("ETag", ""),
+                    "Cache-Control": response.headers.get("Cache-Control", "private, no-cache")
+                }
+            )
+        else:
+            return jsonify({"error": "Vista previa no disponible"}), response.status_code
+            
+    except requests.exceptions.RequestException as e:
+        return jsonify({"error": "Error de conexión"}), 503
+    except Exception as e:
+        return jsonify({"error": "Error interno"}), 500
+
 @app.route('/api/despachos/crear', methods=['POST'])
 @login_required
 def api_crear_despacho():
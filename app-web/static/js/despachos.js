@@ -289,6 +289,9 @@ function mostrarDetalleDocumentos(documentos) {
                                 <button class="btn btn-sm btn-primary btn-sm-corporate" onclick="verDocumento(${doc.id})">
                                     <i class="bi bi-eye me-1"></i>Ver PDF
                                 </button>
+                                <button class="btn btn-sm btn-outline-secondary btn-sm-corporate" onclick="verPaginas(${doc.id})">
+                                    <i class="bi bi-images me-1"></i>Vista previa
+                                </button>
                                 ${!doc.procesado ? `
                                     <button class="btn btn-sm btn-success btn-sm-corporate" onclick="procesarDocumentoIndividual(${doc.id})">
                                         <i class="bi bi-gear me-1"></i>Procesar
@@ -340,14 +343,29 @@ function mostrarDetalleDatos(datos) {
         `;
         
         if (datosDoc.all_fields) {
-            html += '<div class="table-responsive table-responsive-mobile">';
-            html += '<table class="table table-sm table-mobile">';
-            for (const [key, value] of Object.entries(datosDoc.all_fields)) {
-                if (value) {
-                    html += `<tr><td class="fw-bold">${key}:</td><td>${value}</td></tr>`;
+            html += tablaCampos(datosDoc.all_fields);
+        }
+        
+        // Documento principal: los documentos separados por el workflow de API-DOCS
+        if (Array.isArray(datosDoc.documentos)) {
+            datosDoc.documentos.forEach(doc => {
+                const paginas = doc.paginas ? `páginas ${doc.paginas}` : '';
+                html += `
+                    <div class="d-flex justify-content-between align-items-center mt-3 mb-2">
+                        <h6 class="text-corporate-secondary mb-0">${doc.tipo.replace(/_/g, ' ').toUpperCase()}
+                            <small class="text-muted ms-2">${paginas}</small></h6>
+                        <span class="badge ${doc.procesado ? 'bg-success' : 'bg-danger'}">
+                            ${doc.procesado ? 'Procesado' : 'Error'}
+                        </span>
+                    </div>
+                `;
+                const extraidos = doc.datos_extraidos || {};
+                if (extraidos.error) {
+                    html += `<p class="text-muted small">${extraidos.error}</p>`;
+                } else {
+                    html += tablaCampos(camposPorCategoria(extraidos));
                 }
-            }
-            html += '</table></div>';
+            });
         }
         
         html += '</div></div></div>';
@@ -358,6 +376,37 @@ function mostrarDetalleDatos(datos) {
     document.getElementById('datos').innerHTML = html;
 }
 
+// Campos de los datos por categoría de API-DOCS ({categoria: {campo: valor}} o
+// {categoria: [{campo: valor}]}); los valores sueltos son metadatos del modelo
+function camposPorCategoria(extraidos) {
+    const campos = {};
+    for (const valor of Object.values(extraidos)) {
+        if (Array.isArray(valor)) {
+            // Ítems de una lista: el mismo campo puede repetirse
+            valor.forEach((item, i) => {
+                for (const [key, v] of Object.entries(item || {})) {
+                    campos[valor.length > 1 ? `${key} (${i + 1})` : key] = v;
+                }
+            });
+        } else if (valor && typeof valor === 'object') {
+            Object.assign(campos, valor);
+        }
+    }
+    return campos;
+}
+
+function tablaCampos(campos) {
+    let html = '<div class="table-responsive table-responsive-mobile">';
+    html += '<table class="table table-sm table-mobile">';
+    for (const [key, value] of Object.entries(campos)) {
+        if (value) {
+            html += `<tr><td class="fw-bold">${key}:</td><td>${value}</td></tr>`;
+        }
+    }
+    html += '</table></div>';
+    return html;
+}
+
 // ==================== ACTIONS ====================
 function volverALista() {
     document.getElementById('despachosList').classList.remove('d-none');
@@ -375,6 +424,37 @@ function verDocumento(docId) {
     window.open(`/api/despachos/${despachoSeleccionado}/documento/${docId}/pdf`, '_blank');
 }
 
+// Vistas previas por página: sólo se pide el número de páginas y cada imagen
+// se descarga cuando entra en pantalla (loading="lazy"), sin bajar el PDF
+async function verPaginas(docId) {
+    if (!despachoSeleccionado) return;
+    
+    const contenedor = document.getElementById('previewPaginas');
+    contenedor.innerHTML = '<div class="text-center py-4"><div class="spinner-border text-corporate-primary"></div></div>';
+    bootstrap.Modal.getOrCreateInstance(document.getElementById('previewModal')).show();
+    
+    try {
+        const response = await fetch(`/api/despachos/${despachoSeleccionado}/documento/${docId}/paginas`);
+        if (!response.ok) throw new Error('Error obteniendo páginas');
+        const data = await response.json();
+        
+        let html = '';
+        for (let pagina = 1; pagina <= data.paginas; pagina++) {
+            html += `
+                <figure class="text-center mb-4">
+                    <img src="/api/despachos/${despachoSeleccionado}/documento/${docId}/pagina/${pagina}/preview?ancho=600"
+                         loading="lazy" width="600" class="img-fluid border shadow-corporate" alt="Página ${pagina}">
+                    <figcaption class="text-muted small mt-1">Página ${pagina} de ${data.paginas}</figcaption>
+                </figure>
+            `;
+        }
+        contenedor.innerHTML = html;
+    } catch (error) {
+        console.error('Error:', error);
+        contenedor.innerHTML = '<p class="text-muted text-center">No se pudo cargar la vista previa</p>';
+    }
+}
+
 async function procesarDocumentoIndividual(docId) {
     if (!despachoSeleccionado) return;
     
@@ -207,6 +207,7 @@ CREATE TABLE operaciones.documentos (
     tipo_documento VARCHAR(50),
     nombre_archivo VARCHAR(255),
     contenido_base64 TEXT,
+    contenido BYTEA,
     procesado BOOLEAN DEFAULT false,
     datos_extraidos JSONB,
     fecha_carga TIMESTAMP DEFAULT NOW(),